@@ -1,20 +1,180 @@
-import requests
+import time
+
+# Marco zero da medição da inicialização, antes das importações pesadas
+INICIO = time.perf_counter()
+
 import cv2
 import os
-import time
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
 from config import ClientConfig
-import time
+from inicializacao import MedidorInicializacao
+from local_manifest import ManifestLocal
+from play_log import EnviadorExibicoes, RegistroExibicoes
+from player import FIM, Decodificador, Escalonador, detectar_resolucao
+from telemetria import Telemetria, hash_playlist
 import sys
 
+# O downloader (que importa o requests) e o peer_cache só são importados
+# depois do primeiro quadro, em iniciar_rede() e nos métodos de download:
+# a partida só precisa do OpenCV e dos arquivos já em disco
+
+WINDOW_NAME = "Propaganda"
+# Limite de espera pelo primeiro quadro antes de começar a sincronização
+# (um arquivo em cache que não abre não pode segurar a rede para sempre)
+ESPERA_PRIMEIRO_QUADRO = 30
+
 
 class PropagandaClient:
-    def __init__(self, url=None):
+    def __init__(self, url=None, medidor=None):
+        self.medidor = medidor or MedidorInicializacao()
         self.config = ClientConfig()
         self.last_timestamp = self.load_last_timestamp()
-        self.current_videos = []
+        # Playlist publicada pela sincronização (tupla de (arquivo, peso):
+        # trocada por inteiro, nunca alterada no lugar), vídeo em exibição e
+        # o seguinte, já aberto pelo player
+        self.playlist = ()
+        self.reproduzindo = None
+        self.proximo_video = None
+        self.parar = threading.Event()
+        self.janela_aberta = False
         if url:
             self.config.SERVER_URL = url
+        if not (self.config.DISPLAY_WIDTH and self.config.DISPLAY_HEIGHT):
+            # Detectada uma única vez; usada na escolha da variante e no
+            # redimensionamento dos quadros
+            (
+                self.config.DISPLAY_WIDTH,
+                self.config.DISPLAY_HEIGHT,
+            ) = detectar_resolucao() or (1920, 1080)
+        self.device_id = self.load_device_id()
+        self.headers = {"X-Device-Id": self.device_id}
+        self.medidor.marcar("configuração")
+        self.manifest_local = ManifestLocal(
+            self.config.LOCAL_MANIFEST_FILE, self.config.DOWNLOAD_FOLDER
+        )
+        # Exibições gravadas localmente e enviadas em lotes (consomem os créditos)
+        self.registro_exibicoes = RegistroExibicoes(self.config.PLAY_LOG_FILE)
+        self.medidor.marcar("manifest local")
+        # Sessão HTTP, downloader, pares, envio de exibições e telemetria:
+        # criados em iniciar_rede(), depois do primeiro quadro
+        self.session = None
+        self.banda = None
+        self.downloader = None
+        self.pares = None
+        self.servidor_pares = None
+        self.enviador_exibicoes = None
+        self.telemetria = None
+        self.primeiro_quadro = threading.Event()
+        # Um download por arquivo de cada vez (sincronização e pré-download
+        # podem pedir o mesmo vídeo)
+        self.download_locks = {}
+        self.download_locks_lock = threading.Lock()
+        # Momento (time.time()) em que o servidor libera o próximo vídeo novo para esta tela
+        self.proxima_liberacao = None
+        # Vídeos agendados (ainda não exibíveis) a baixar fora do horário de pico
+        self.prefetch = []
+        self.prefetch_thread = None
+        # Algum vídeo da playlist ficou sem baixar (pausa, falha): repetir
+        self.downloads_incompletos = False
+        # Telemetria enviada nos heartbeats
+        self.quadros_descartados = 0
+        self.sincronizado_em = None
+
+    def iniciar_rede(self):
+        """Cria a sessão HTTP, o downloader e os serviços que usam a rede"""
+        from downloader import ChunkedDownloader, ControleBanda, criar_sessao
+        from peer_cache import RedePares, ServidorPares
+
+        # Uma Session para todas as requisições: conexões reaproveitadas
+        # entre vídeos e blocos (importante em links com latência alta)
+        self.session = criar_sessao(
+            pool_size=self.config.DOWNLOAD_PARALLEL * self.config.DOWNLOAD_WORKERS + 2
+        )
+        # Limite de banda por horário, compartilhado por todos os downloads
+        self.banda = ControleBanda(
+            self.config.DOWNLOAD_LIMITS, self.config.DOWNLOAD_MAX_KBPS
+        )
+        # Modo pares: telas da mesma rede local compartilham os downloads
+        if self.config.PEER_MODE:
+            self.pares = RedePares(
+                self.device_id,
+                self.config.PEER_PORT,
+                self.config.PEER_DISCOVERY_PORT,
+                fixos=self.config.PEERS,
+                intervalo=self.config.PEER_ANNOUNCE_INTERVAL,
+            )
+            self.servidor_pares = ServidorPares(
+                self.manifest_local,
+                self.config.PEER_PORT,
+                max_envios=self.config.PEER_MAX_UPLOADS,
+            )
+        self.downloader = ChunkedDownloader(
+            self.config.SERVER_URL,
+            workers=self.config.DOWNLOAD_WORKERS,
+            timeout=self.config.DOWNLOAD_TIMEOUT,
+            headers=self.headers,
+            max_wait=self.config.MAX_RETRY_WAIT,
+            session=self.session,
+            banda=self.banda,
+            pares=self.pares,
+            timeout_pares=self.config.PEER_TIMEOUT,
+        )
+        self.enviador_exibicoes = EnviadorExibicoes(
+            self.registro_exibicoes,
+            self.session,
+            self.config.SERVER_URL,
+            headers=self.headers,
+            lote=self.config.PLAY_LOG_BATCH,
+            intervalo=self.config.PLAY_LOG_INTERVAL,
+            espera_maxima=self.config.PLAY_LOG_MAX_BACKOFF,
+        )
+        self.telemetria = Telemetria(
+            self.session,
+            self.config.SERVER_URL,
+            self.headers,
+            self.config.DEVICE_TOKEN_FILE,
+            self.dados_heartbeat,
+            dados_registro={
+                "tipo": "desktop",
+                "nome": self.config.DEVICE_NAME,
+                "latitude": self.config.CLIENT_LATITUDE,
+                "longitude": self.config.CLIENT_LONGITUDE,
+            },
+            chave_registro=self.config.DEVICE_REGISTRATION_KEY,
+            intervalo=self.config.HEARTBEAT_INTERVAL,
+        )
+
+    def load_device_id(self):
+        """Id desta tela: DEVICE_ID ou um id aleatório persistido no primeiro uso"""
+        if self.config.DEVICE_ID:
+            return self.config.DEVICE_ID
+        if os.path.exists(self.config.DEVICE_ID_FILE):
+            with open(self.config.DEVICE_ID_FILE, "r") as f:
+                device_id = f.read().strip()
+            if device_id:
+                return device_id
+        device_id = uuid.uuid4().hex
+        with open(self.config.DEVICE_ID_FILE, "w") as f:
+            f.write(device_id)
+        return device_id
+
+    def dados_heartbeat(self):
+        """Telemetria desta tela para o heartbeat"""
+        video_ids = []
+        for filepath, _ in self.playlist:
+            entrada = self.manifest_local.entradas.get(os.path.basename(filepath))
+            if entrada and entrada.get("video_id") is not None:
+                video_ids.append(entrada["video_id"])
+        return {
+            "versao": self.config.CLIENT_VERSION,
+            "playlist": hash_playlist(video_ids),
+            "cache_bytes": self.manifest_local.bytes_ocupados(),
+            "quadros_descartados": self.quadros_descartados,
+            "sincronizado_em": int(self.sincronizado_em) if self.sincronizado_em else None,
+        }
 
     def load_last_timestamp(self):
         """Carrega o último timestamp salvo"""
@@ -32,7 +192,7 @@ class PropagandaClient:
     def check_for_updates(self):
         """Verifica se há atualizações no servidor"""
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.config.SERVER_URL}/api/timestamp", timeout=10
             )
             if response.status_code == 200:
@@ -54,147 +214,578 @@ class PropagandaClient:
             return False, None
 
     def get_available_videos(self):
-        """Busca vídeos disponíveis para a localização do cliente"""
+        """
+        Busca vídeos disponíveis para a localização do cliente
+        (None se o servidor não respondeu, para não confundir com lista vazia)
+        """
         try:
             params = {
                 "latitude": self.config.CLIENT_LATITUDE,
                 "longitude": self.config.CLIENT_LONGITUDE,
             }
-            response = requests.get(
-                f"{self.config.SERVER_URL}/api/videos", params=params, timeout=10
+            response = self.session.get(
+                f"{self.config.SERVER_URL}/api/videos",
+                params=params,
+                headers=self.headers,
+                timeout=10,
             )
             print(f"{self.config.SERVER_URL}/api/videos", params)
             if response.status_code == 200:
                 data = response.json()
+                # Vídeos recém-aprovados que ainda não foram liberados para esta tela
+                espera = data.get("proxima_liberacao")
+                self.proxima_liberacao = time.time() + espera if espera else None
+                if espera:
+                    print(f"  - Próximo vídeo novo liberado em {espera} s")
+                self.prefetch = data.get("prefetch", [])
                 return data["videos"]
             else:
                 print(f"[ERRO] Falha ao buscar vídeos: {response.status_code}")
-                return []
+                return None
         except Exception as e:
             print(f"[ERRO] Falha ao buscar vídeos: {e}")
-            return []
+            return None
 
-    def download_video(self, video_info):
-        """Baixa um vídeo do servidor"""
-        try:
-            video_id = video_info["id"]
-            filename = video_info["filename"]
-            filepath = os.path.join(self.config.DOWNLOAD_FOLDER, filename)
-
-            # Não baixar se já existe
-            if os.path.exists(filepath):
-                print(f"  - Vídeo já existe: {video_info['original_filename']}")
-                return filepath
-
-            print(f"  - Baixando: {video_info['original_filename']}...", end=" ")
-            response = requests.get(
-                f"{self.config.SERVER_URL}/api/download/{video_id}",
-                stream=True,
-                timeout=30,
+    def escolher_variante(self, video_info):
+        """
+        Escolhe a menor versão do vídeo que cobre a resolução da tela.
+        Retorna None para usar o arquivo original.
+        """
+        largura_tela = self.config.DISPLAY_WIDTH
+        altura_tela = self.config.DISPLAY_HEIGHT
+
+        # Original sem metadados conta como "maior que qualquer variante"
+        candidatos = [
+            (
+                video_info.get("largura") or float("inf"),
+                video_info.get("altura") or float("inf"),
+                None,
             )
+        ]
+        for variant in video_info.get("variants", []):
+            candidatos.append((variant["largura"], variant["altura"], variant))
+        candidatos.sort(key=lambda c: c[0] * c[1])
+
+        for largura, altura, variant in candidatos:
+            if largura >= largura_tela or altura >= altura_tela:
+                return variant
+        # Nenhuma cobre a tela: usar a maior disponível
+        return candidatos[-1][2]
+
+    def arquivo_local(self, video_info):
+        """
+        Caminho local, parâmetros de download e dados (hash, tamanho) da
+        versão escolhida do vídeo
+        """
+        variant = self.escolher_variante(video_info)
+        if variant:
+            filename = os.path.basename(variant["filename"])
+            params = {"variant": variant["id"]}
+        else:
+            filename = video_info["filename"]
+            params = None
+        origem = variant or video_info
+        return os.path.join(self.config.DOWNLOAD_FOLDER, filename), params, origem
+
+    def video_atualizado(self, video_info):
+        """Indica se a versão escolhida do vídeo já está no disco e confere"""
+        filepath, params, origem = self.arquivo_local(video_info)
+        return self.manifest_local.atualizado(
+            os.path.basename(filepath),
+            video_info["id"],
+            params["variant"] if params else None,
+            origem.get("content_hash"),
+            origem.get("file_size"),
+        )
 
-            if response.status_code == 200:
-                with open(filepath, "wb") as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                print("OK")
-                return filepath
-            else:
-                print(f"ERRO ({response.status_code})")
+    def download_video(self, video_info, max_kbps=None, progresso=None):
+        """Baixa um vídeo do servidor"""
+        from downloader import DownloadError, DownloadPausado
+
+        nome = video_info["original_filename"]
+        filepath, params, origem = self.arquivo_local(video_info)
+        filename = os.path.basename(filepath)
+        with self.download_locks_lock:
+            lock = self.download_locks.setdefault(filename, threading.Lock())
+        with lock:
+            try:
+                return self._download_video(
+                    video_info, filepath, params, origem, max_kbps, progresso
+                )
+            except DownloadPausado:
+                print(f"  - Pausado: {nome} (continua quando a janela de pausa acabar)")
                 return None
-        except Exception as e:
-            print(f"ERRO: {e}")
-            return None
+            except DownloadError as e:
+                print(f"  - ERRO ao baixar {nome} ({e})")
+                return None
+            except Exception as e:
+                print(f"  - ERRO ao baixar {nome}: {e}")
+                return None
+
+    def _download_video(self, video_info, filepath, params, origem, max_kbps, progresso):
+        from downloader import DownloadError, hash_arquivo
+
+        video_id = video_info["id"]
+        filename = os.path.basename(filepath)
+        variant_id = params["variant"] if params else None
+        content_hash = origem.get("content_hash")
+
+        # Não baixar de novo o que já está no disco e confere com o servidor
+        if self.video_atualizado(video_info):
+            print(f"  - Vídeo já existe: {video_info['original_filename']}")
+            return filepath
+        if os.path.exists(filepath):
+            os.remove(filepath)  # Conteúdo mudou no servidor
+
+        print(f"  - Baixando: {video_info['original_filename']}...")
+        inicio = time.monotonic()
+        manifest = self.downloader.download(
+            video_id, filepath, params=params, max_kbps=max_kbps, progresso=progresso
+        )
+        if manifest:
+            calculado, verificado = manifest["sha256"], True
+        else:
+            # Servidor sem manifest: conferir o arquivo inteiro aqui
+            calculado = hash_arquivo(filepath)
+            if content_hash and calculado != content_hash:
+                os.remove(filepath)
+                raise DownloadError("hash do arquivo não confere")
+            verificado = bool(content_hash)
+        size = os.path.getsize(filepath)
+        self.manifest_local.registrar(
+            filename, video_id, variant_id, calculado, size, verificado
+        )
+        self.manifest_local.salvar()
+        decorrido = max(time.monotonic() - inicio, 0.001)
+        print(
+            f"  - OK: {video_info['original_filename']} "
+            f"({size / 1024 ** 2:.1f} MB em {decorrido:.1f} s)"
+        )
+        return filepath
 
     def update_videos(self):
-        """Atualiza a lista de vídeos"""
+        """
+        Sincroniza os vídeos com o servidor e publica a playlist nova
+
+        Returns:
+            bool: False se o servidor não respondeu (playlist mantida)
+        """
+        from downloader import Progresso
+
         print(
             f"\n[{datetime.now().strftime('%H:%M:%S')}] Atualizando lista de vídeos..."
         )
 
-        # Limpar pasta de vídeos antigos
-        if os.path.exists(self.config.DOWNLOAD_FOLDER):
-            for file in os.listdir(self.config.DOWNLOAD_FOLDER):
-                filepath = os.path.join(self.config.DOWNLOAD_FOLDER, file)
-                try:
-                    os.remove(filepath)
-                    print(f"  - Removido: {file}")
-                except Exception as e:
-                    print(f"  - Erro ao remover {file}: {e}")
-
         # Buscar vídeos disponíveis
         videos = self.get_available_videos()
+        if videos is None:
+            print("  - Servidor indisponível; mantendo os vídeos atuais")
+            return False
         print(f"  - {len(videos)} vídeo(s) disponível(is) para sua localização")
 
-        # Baixar vídeos
-        self.current_videos = []
+        # Abrir espaço no cache para o que falta baixar
+        atribuidos = videos + self.prefetch
+        reservar = 0
         for video in videos:
-            filepath = self.download_video(video)
-            if filepath:
-                self.current_videos.append(filepath)
+            filepath, _, origem = self.arquivo_local(video)
+            if not os.path.exists(filepath):
+                reservar += origem.get("file_size") or 0
+        self.limpar_cache(atribuidos, reservar)
+
+        # Baixar só o que é novo, DOWNLOAD_PARALLEL vídeos por vez; até o fim
+        # da sincronização a reprodução continua com a lista anterior
+        progresso = Progresso()
+        with ThreadPoolExecutor(max_workers=self.config.DOWNLOAD_PARALLEL) as executor:
+            futures = [
+                executor.submit(self.download_video, video, progresso=progresso)
+                for video in videos
+            ]
+            pendentes = set(futures)
+            while pendentes:
+                _, pendentes = wait(pendentes, timeout=self.config.PROGRESS_INTERVAL)
+                if pendentes and progresso.total:
+                    print(
+                        f"  - Progresso: {progresso.resumo()}, "
+                        f"agora {self.banda.estado()}"
+                    )
+        if progresso.baixados:
+            print(f"  - Baixados {progresso.resumo()}")
+        baixados = [f.result() for f in futures]
+        self.downloads_incompletos = None in baixados
+        # Peso de cada vídeo definido pelo servidor (créditos x prazo da campanha)
+        self.publicar_playlist(
+            (filepath, video.get("peso", 1.0))
+            for filepath, video in zip(baixados, videos)
+            if filepath
+        )
 
-        print(f"  - Total de vídeos baixados: {len(self.current_videos)}")
+        self.limpar_cache(atribuidos)
 
-        if self.current_videos:
+        print(f"  - Total de vídeos baixados: {len(self.playlist)}")
+
+        if self.playlist:
             print(f"\n[INFO] Vídeos prontos para reprodução!")
         else:
             print(f"\n[AVISO] Nenhum vídeo disponível para sua localização.")
+        self.sincronizado_em = time.time()
+        return True
 
-    def play_videos(self):
-        """Reproduz os vídeos em loop fullscreen"""
-        if not self.current_videos:
-            print("[INFO] Nenhum vídeo para reproduzir. Aguardando...")
-            time.sleep(10)
-            return
+    def publicar_playlist(self, videos):
+        """
+        Troca a playlist (pares (arquivo, peso)) de uma vez; o player passa a
+        usá-la a partir do próximo vídeo, sem interromper o que está em exibição.
+        Fica guardada no manifest local para a próxima partida.
+        """
+        self.playlist = tuple(videos)
+        self.manifest_local.guardar_playlist(self.playlist)
+
+    def limpar_cache(self, videos, reservar=0):
+        """
+        Mantém a pasta de vídeos dentro de CACHE_MAX_BYTES
+
+        Os vídeos atribuídos à tela (e seus downloads parciais) ficam
+        fixados. Os demais só saem quando falta espaço, começando pelos que
+        deixaram a playlist há mais tempo. Arquivos fora do manifest local
+        (downloads parciais de vídeos não atribuídos, sobras) são apagados.
+        """
+        fixados = set()
+        for video in videos:
+            filename = os.path.basename(self.arquivo_local(video)[0])
+            fixados.add(filename)
+            fixados.add(filename + ".part")
+        # A playlist publicada, o arquivo em exibição e o seguinte (já aberto
+        # pelo player) ficam até a próxima sincronização: a playlist nova só
+        # é publicada depois dos downloads
+        em_uso = [filepath for filepath, _ in self.playlist]
+        em_uso += [self.reproduzindo, self.proximo_video]
+        for filepath in em_uso:
+            if filepath:
+                fixados.add(os.path.basename(filepath))
+        self.manifest_local.fixar(fixados)
 
-        print(
-            f"\n[{datetime.now().strftime('%H:%M:%S')}] Reproduzindo {len(self.current_videos)} vídeo(s) em loop..."
+        remover = []
+        if os.path.exists(self.config.DOWNLOAD_FOLDER):
+            remover = [
+                file
+                for file in os.listdir(self.config.DOWNLOAD_FOLDER)
+                if file not in fixados and file not in self.manifest_local.entradas
+            ]
+        # Entradas cujo arquivo sumiu do disco
+        for filename in list(self.manifest_local.entradas):
+            if not os.path.exists(self.manifest_local.caminho(filename)):
+                self.manifest_local.remover(filename)
+        remover += self.manifest_local.candidatos_remocao(
+            fixados, self.config.CACHE_MAX_BYTES, reservar
         )
-        print("[INFO] Pressione 'q' para sair ou 's' para pular o vídeo")
 
-        while True:
-            for video_path in self.current_videos:
-                cap = cv2.VideoCapture(video_path)
+        for file in remover:
+            filepath = os.path.join(self.config.DOWNLOAD_FOLDER, file)
+            try:
+                if os.path.exists(filepath):
+                    os.remove(filepath)
+                    print(f"  - Removido: {file}")
+                self.manifest_local.remover(file)
+            except Exception as e:
+                print(f"  - Erro ao remover {file}: {e}")
+        self.manifest_local.salvar()
+
+        ocupado = self.manifest_local.bytes_ocupados()
+        if self.config.CACHE_MAX_BYTES and ocupado + reservar > self.config.CACHE_MAX_BYTES:
+            print(
+                f"[AVISO] Os vídeos atribuídos ({(ocupado + reservar) / 1024 ** 2:.0f} MB) "
+                f"excedem CACHE_MAX_BYTES ({self.config.CACHE_MAX_BYTES / 1024 ** 2:.0f} MB)"
+            )
 
-                if not cap.isOpened():
-                    print(f"[ERRO] Não foi possível abrir: {video_path}")
-                    continue
+    def em_janela_prefetch(self, agora=None):
+        """Indica se o horário atual está em uma das janelas PREFETCH_WINDOWS"""
+        agora = agora or datetime.now()
+        minuto = agora.hour * 60 + agora.minute
+        for janela in self.config.PREFETCH_WINDOWS.split(","):
+            if not janela.strip():
+                continue
+            try:
+                inicio, fim = (
+                    int(h) * 60 + int(m)
+                    for h, m in (p.strip().split(":") for p in janela.split("-"))
+                )
+            except ValueError:
+                print(f"[AVISO] Janela de pré-download inválida: {janela}")
+                continue
+            if inicio <= fim:
+                if inicio <= minuto < fim:
+                    return True
+            elif minuto >= inicio or minuto < fim:  # cruza a meia-noite
+                return True
+        return False
+
+    def prefetch_pendente(self):
+        """Vídeos agendados que ainda não foram baixados"""
+        return [video for video in self.prefetch if not self.video_atualizado(video)]
+
+    def iniciar_prefetch(self):
+        """
+        Baixa em segundo plano, com limite de banda, os vídeos agendados,
+        para que já estejam no disco quando o servidor os liberar
+        """
+        from downloader import Progresso
+
+        if self.prefetch_thread and self.prefetch_thread.is_alive():
+            return
+        pendentes = self.prefetch_pendente()
+        if not pendentes or not self.em_janela_prefetch():
+            return
 
-                # Configurar janela fullscreen
-                window_name = "Propaganda"
-                cv2.namedWindow(window_name, cv2.WND_PROP_FULLSCREEN)
-                cv2.setWindowProperty(
-                    window_name, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN
+        def baixar():
+            print(
+                f"\n[{datetime.now().strftime('%H:%M:%S')}] Pré-download de {len(pendentes)} vídeo(s) agendado(s)"
+            )
+            progresso = Progresso()
+            for video in pendentes:
+                if not self.em_janela_prefetch():
+                    break  # continua na próxima janela, a partir do .part
+                self.download_video(
+                    video,
+                    max_kbps=self.config.PREFETCH_MAX_KBPS or None,
+                    progresso=progresso,
                 )
+            if progresso.baixados:
+                print(f"  - Pré-download: {progresso.resumo()}")
 
-                fps = cap.get(cv2.CAP_PROP_FPS)
-                if fps == 0:
-                    fps = 30
-                delay = int(1000 / fps)
+        self.prefetch_thread = threading.Thread(target=baixar, daemon=True)
+        self.prefetch_thread.start()
 
-                while cap.isOpened():
-                    ret, frame = cap.read()
+    def abrir_janela(self):
+        """Cria a janela fullscreen uma única vez (reaproveitada entre vídeos)"""
+        if self.janela_aberta:
+            return
+        cv2.namedWindow(WINDOW_NAME, cv2.WND_PROP_FULLSCREEN)
+        cv2.setWindowProperty(
+            WINDOW_NAME, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN
+        )
+        self.janela_aberta = True
+
+    def abrir_video(self, video_path):
+        """Começa a decodificar o vídeo, já no tamanho da tela"""
+        return Decodificador(
+            video_path,
+            self.config.FRAME_QUEUE_SIZE,
+            (self.config.DISPLAY_WIDTH, self.config.DISPLAY_HEIGHT),
+        )
 
-                    if not ret:
-                        break
+    def play_videos(self):
+        """
+        Reproduz a playlist em loop fullscreen até o usuário sair. A ordem
+        vem do round-robin ponderado pelos pesos do servidor, sem consultas
+        a cada exibição. A cada troca de vídeo, verifica se a sincronização
+        publicou uma playlist nova. O próximo vídeo é aberto (e começa a ser
+        decodificado) enquanto o atual ainda está na tela.
+        """
+        print("[INFO] Pressione 'q' para sair ou 's' para pular o vídeo")
+        playlist = ()
+        escalonador = None
+        seguinte = None
+        aguardando = False
+        proximo = None
 
-                    cv2.imshow(window_name, frame)
+        try:
+            while not self.parar.is_set():
+                if self.playlist is not playlist:
+                    playlist = self.playlist
+                    escalonador = Escalonador(playlist)
+                    seguinte = None
+                    if playlist:
+                        print(
+                            f"\n[{datetime.now().strftime('%H:%M:%S')}] Reproduzindo {len(playlist)} vídeo(s) em loop..."
+                        )
+
+                if not playlist:
+                    if not aguardando:
+                        print("[INFO] Nenhum vídeo para reproduzir. Aguardando...")
+                        aguardando = True
+                    if self.janela_aberta:
+                        cv2.waitKey(1000)  # mantém a janela respondendo
+                    else:
+                        self.parar.wait(1)
+                    continue
+                aguardando = False
 
-                    key = cv2.waitKey(delay) & 0xFF
-                    if key == ord("q"):  # Sair
-                        cap.release()
-                        cv2.destroyAllWindows()
-                        return False
-                    elif key == ord("s"):  # Pular vídeo
-                        break
+                video_path = seguinte or escalonador.proximo()
+                seguinte = escalonador.proximo()
 
-                cap.release()
-                cv2.destroyAllWindows()
+                if proximo and proximo.video_path == video_path:
+                    atual = proximo
+                else:
+                    # Playlist mudou depois da pré-abertura
+                    if proximo:
+                        proximo.fechar()
+                    atual = self.abrir_video(video_path)
+                proximo = self.abrir_video(seguinte)
+                self.proximo_video = seguinte
+
+                self.reproduzindo = video_path
+                try:
+                    continuar = self.play_video(atual)
+                finally:
+                    atual.fechar()
+                    self.reproduzindo = None
+                if not continuar:
+                    self.parar.set()
+        finally:
+            self.proximo_video = None
+            if proximo:
+                proximo.fechar()
+
+    def play_video(self, decodificador):
+        """
+        Exibe um vídeo no ritmo do fps, com relógio monotônico: se a exibição
+        atrasar mais de um quadro e já houver outro pronto, o quadro atrasado
+        é descartado. Retorna False se o usuário pediu para sair.
+        """
+        frame = decodificador.quadro()
+        if frame is FIM:
+            print(f"[ERRO] Não foi possível abrir: {decodificador.video_path}")
+            time.sleep(0.5)  # evita loop contínuo se nenhum vídeo abrir
+            return True
+
+        primeiro = not self.primeiro_quadro.is_set()
+        if primeiro:
+            self.medidor.marcar("decodificação")
+        self.abrir_janela()
+        if primeiro:
+            self.medidor.marcar("janela")
+        intervalo = 1.0 / decodificador.fps
+        inicio = time.monotonic()
+        numero = 0
+        descartados = 0
+
+        while frame is not FIM:
+            atraso = time.monotonic() - (inicio + numero * intervalo)
+            if atraso > intervalo and decodificador.tem_quadro():
+                descartados += 1
+            else:
+                key = cv2.waitKey(max(1, int(-atraso * 1000))) & 0xFF
+                if key == ord("q"):  # Sair
+                    return False
+                elif key == ord("s"):  # Pular vídeo
+                    return True
+                cv2.imshow(WINDOW_NAME, frame)
+                if primeiro:
+                    primeiro = False
+                    self.primeiro_quadro_exibido()
+            numero += 1
+            frame = decodificador.quadro()
+
+        self.registrar_exibicao(decodificador.video_path)
+
+        if descartados:
+            self.quadros_descartados += descartados
+            print(
+                f"[AVISO] {descartados} quadro(s) descartado(s) em "
+                f"{os.path.basename(decodificador.video_path)} para manter o ritmo"
+            )
+        return True
 
-            # Pequena pausa entre loops
-            time.sleep(0.5)
+    def primeiro_quadro_exibido(self):
+        """Fecha a medição da partida e libera a rede (iniciar_segundo_plano)"""
+        self.medidor.marcar("primeiro quadro")
+        print(f"[INFO] Inicialização: {self.medidor.resumo()}")
+        self.primeiro_quadro.set()
 
-        return True
+    def registrar_exibicao(self, video_path):
+        """Grava no registro local uma exibição completa do vídeo"""
+        entrada = self.manifest_local.entradas.get(os.path.basename(video_path))
+        if not entrada or entrada.get("video_id") is None:
+            return
+        try:
+            self.registro_exibicoes.registrar(
+                entrada["video_id"],
+                self.config.CLIENT_LATITUDE,
+                self.config.CLIENT_LONGITUDE,
+            )
+        except Exception as e:
+            print(f"[ERRO] Falha ao registrar exibição: {e}")
+
+    def sincronizar(self):
+        """
+        Worker de sincronização: consulta o servidor, baixa e verifica os
+        vídeos em segundo plano e publica a playlist nova para o player
+        """
+        last_check = None
+        sincronizado = False
+        primeira = True
+        pausado = self.banda.pausado()
+        while not self.parar.is_set():
+            try:
+                current_time = time.time()
+                # Fim de uma janela de pausa: retomar os downloads interrompidos
+                estava_pausado, pausado = pausado, self.banda.pausado()
+                retomar = estava_pausado and not pausado and self.downloads_incompletos
+                if (
+                    last_check is None
+                    or current_time - last_check >= self.config.CHECK_INTERVAL
+                ):
+                    last_check = current_time
+                    has_update, new_timestamp = self.check_for_updates() or (
+                        False,
+                        None,
+                    )
+                    # A primeira sincronização acontece mesmo sem timestamp
+                    # novo; se falhar (ou faltar baixar algum vídeo fora de
+                    # uma pausa), é repetida na próxima verificação
+                    if (
+                        has_update
+                        or not sincronizado
+                        or (self.downloads_incompletos and not pausado)
+                    ):
+                        sincronizado = self.update_videos()
+                        if sincronizado and new_timestamp:
+                            self.save_last_timestamp(new_timestamp)
+                        if primeira:
+                            primeira = False
+                            self.medidor.marcar("primeira sincronização")
+                            print(f"[INFO] Inicialização: {self.medidor.resumo()}")
+                elif retomar or (
+                    self.proxima_liberacao and current_time >= self.proxima_liberacao
+                ):
+                    # Liberação escalonada (o timestamp não muda de novo, então
+                    # buscar a lista no horário indicado pelo servidor) ou
+                    # downloads interrompidos por uma pausa que acabou
+                    self.update_videos()
+
+                # Pré-download dos vídeos agendados (fora do horário de pico)
+                self.iniciar_prefetch()
+            except Exception as e:
+                print(f"[ERRO] Falha na sincronização: {e}")
+
+            self.parar.wait(1)
+
+    def iniciar_segundo_plano(self):
+        """
+        Rede, sincronização, envio de exibições, telemetria e pares só
+        começam depois do primeiro quadro, para não disputar CPU e disco com
+        a partida. Sem playlist em cache não há o que exibir: começam logo.
+        """
+        if self.playlist:
+            self.primeiro_quadro.wait(ESPERA_PRIMEIRO_QUADRO)
+        if self.parar.is_set():
+            return
+        self.iniciar_rede()
+        self.medidor.marcar("rede")
+
+        threading.Thread(target=self.sincronizar, daemon=True).start()
+        threading.Thread(
+            target=self.enviador_exibicoes.executar, args=(self.parar,), daemon=True
+        ).start()
+        threading.Thread(
+            target=self.telemetria.executar, args=(self.parar,), daemon=True
+        ).start()
+        if self.servidor_pares:
+            try:
+                self.servidor_pares.iniciar()
+            except OSError as e:
+                # Porta ocupada: a tela continua baixando dos pares, só não serve
+                print(f"[AVISO] Cache na rede local indisponível: {e}")
+            self.pares.iniciar(self.parar)
 
     def run(self):
         """Loop principal do cliente"""
@@ -206,54 +797,47 @@ class PropagandaClient:
             f"Localização: Lat {self.config.CLIENT_LATITUDE}, Lon {self.config.CLIENT_LONGITUDE}"
         )
         print(f"Intervalo de verificação: {self.config.CHECK_INTERVAL} segundos")
+        print(f"Limites de banda: {self.config.DOWNLOAD_LIMITS or 'nenhum'}")
+        if self.config.PEER_MODE:
+            print(f"Cache na rede local: porta {self.config.PEER_PORT}")
         print("=" * 60)
 
-        # Primeira atualização
-        self.update_videos()
-        check_result = self.check_for_updates()
-        if check_result:
-            has_update, new_timestamp = check_result
-            if new_timestamp:
-                self.save_last_timestamp(new_timestamp)
+        # Partida rápida: a última playlist, com o que já está no disco, vai
+        # para a tela antes de qualquer acesso à rede
+        self.playlist = self.manifest_local.playlist_em_cache()
+        self.medidor.marcar("playlist em cache")
+        if self.playlist:
+            print(f"[INFO] {len(self.playlist)} vídeo(s) em cache; sincronizando após o primeiro quadro")
 
-        last_check = time.time()
+        # A janela do OpenCV precisa da thread principal: a sincronização
+        # roda em uma thread separada
+        threading.Thread(target=self.iniciar_segundo_plano, daemon=True).start()
 
         try:
-            while True:
-                # Verificar se é hora de checar atualizações
-                current_time = time.time()
-                if current_time - last_check >= self.config.CHECK_INTERVAL:
-                    check_result = self.check_for_updates()
-
-                    if check_result:
-                        has_update, new_timestamp = check_result
-                        if has_update and new_timestamp:
-                            self.save_last_timestamp(new_timestamp)
-                            self.update_videos()
-
-                    last_check = current_time
-
-                # Reproduzir vídeos
-                continue_playing = self.play_videos()
-                if not continue_playing:
-                    break
-
+            self.play_videos()
         except KeyboardInterrupt:
             print("\n\n[INFO] Encerrando cliente...")
         finally:
+            self.parar.set()
+            if self.servidor_pares:
+                self.servidor_pares.parar()
             cv2.destroyAllWindows()
 
 
 if __name__ == "__main__":
+    medidor = MedidorInicializacao(INICIO)
+    medidor.marcar("importações")
     if len(sys.argv) > 1:
         url = sys.argv[1]
     else:
         url = input("Digite a URL do servidor (ou deixe vazio para padrão): ").strip()
+        medidor.descartar()  # tempo de digitação não conta
     while True:
         try:
-            client = PropagandaClient(url=url)
+            client = PropagandaClient(url=url, medidor=medidor)
             client.run()
         except Exception as e:
             print(f"[ERRO] Ocorreu um erro: {e}")
 
+        medidor = None  # reinícios medem só a partir do construtor
         time.sleep(5)
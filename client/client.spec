@@ -10,7 +10,9 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # tkinter só é usado para detectar a resolução fora do Windows; fora do
+    # executável, ele não é extraído a cada partida
+    excludes=['tkinter'],
     noarchive=False,
     optimize=0,
 )
@@ -26,7 +28,9 @@ exe = EXE(
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
+    # Sem UPX: as DLLs do OpenCV comprimidas são descomprimidas a cada
+    # partida, o que atrasa o primeiro quadro nos PCs das telas
+    upx=False,
     upx_exclude=[],
     runtime_tmpdir=None,
     console=True,
@@ -5,6 +5,9 @@ load_dotenv()
 
 
 class ClientConfig:
+    # Versão do cliente (enviada nos heartbeats)
+    CLIENT_VERSION = "1.5.0"
+
     # URL do servidor
     SERVER_URL = os.getenv("SERVER_URL", "http://10.13.24.80:5050")
 
@@ -13,12 +16,86 @@ class ClientConfig:
     CLIENT_LATITUDE = float(os.getenv("CLIENT_LATITUDE", "-23"))
     CLIENT_LONGITUDE = float(os.getenv("CLIENT_LONGITUDE", "-46"))
 
+    # Resolução da tela: usada para escolher a variante transcodificada do vídeo
+    # e para redimensionar os quadros. 0 = detectar automaticamente
+    DISPLAY_WIDTH = int(os.getenv("DISPLAY_WIDTH", "0"))
+    DISPLAY_HEIGHT = int(os.getenv("DISPLAY_HEIGHT", "0"))
+
+    # Quadros decodificados com antecedência por vídeo (memória: ~6 MB por quadro 1080p)
+    FRAME_QUEUE_SIZE = int(os.getenv("FRAME_QUEUE_SIZE", "8"))
+
     # Intervalo de verificação de atualizações (em segundos)
     CHECK_INTERVAL = int(os.getenv("CHECK_INTERVAL", "300"))  # 5 minutos
 
+    # Downloads em blocos verificados (HTTP Range em paralelo)
+    DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "4"))
+    DOWNLOAD_TIMEOUT = int(os.getenv("DOWNLOAD_TIMEOUT", "30"))
+    # Vídeos baixados ao mesmo tempo (cada um com DOWNLOAD_WORKERS blocos em paralelo)
+    DOWNLOAD_PARALLEL = int(os.getenv("DOWNLOAD_PARALLEL", "3"))
+    # Intervalo (segundos) entre os relatórios de progresso durante a sincronização
+    PROGRESS_INTERVAL = int(os.getenv("PROGRESS_INTERVAL", "10"))
+
+    # Limite de banda de todos os downloads conforme o horário (quando a rede
+    # da loja é dividida com os caixas): "HH:MM-HH:MM=kbps", separados por
+    # vírgula; "=pausa" suspende os downloads na janela (retomados depois, do
+    # ponto em que pararam). Vale a primeira janela que contém o horário.
+    # Ex: "12:00-14:00=pausa,08:00-22:00=4000". Vazio (padrão): nenhuma janela.
+    # Fora das janelas vale DOWNLOAD_MAX_KBPS (0 = sem limite)
+    DOWNLOAD_LIMITS = os.getenv("DOWNLOAD_LIMITS", "")
+    DOWNLOAD_MAX_KBPS = int(os.getenv("DOWNLOAD_MAX_KBPS", "0"))
+
+    # Pré-download de campanhas agendadas: só nas janelas fora do pico
+    # ("HH:MM-HH:MM", separadas por vírgula; podem cruzar a meia-noite)
+    # e com limite de banda em kbit/s (0 = sem limite)
+    PREFETCH_WINDOWS = os.getenv("PREFETCH_WINDOWS", "01:00-06:00")
+    PREFETCH_MAX_KBPS = int(os.getenv("PREFETCH_MAX_KBPS", "2000"))
+
+    # Espera máxima ao servidor ocupado (503 + Retry-After) antes de desistir
+    MAX_RETRY_WAIT = int(os.getenv("MAX_RETRY_WAIT", "600"))
+
+    # Cache compartilhado na rede local: a tela serve os vídeos verificados
+    # às outras (PEER_PORT) e baixa delas antes de recorrer ao servidor.
+    # Pares descobertos por broadcast UDP em PEER_DISCOVERY_PORT e/ou
+    # listados em PEERS ("ip:porta", separados por vírgula)
+    PEER_MODE = os.getenv("PEER_MODE", "false").lower() == "true"
+    PEER_PORT = int(os.getenv("PEER_PORT", "8765"))
+    PEER_DISCOVERY_PORT = int(os.getenv("PEER_DISCOVERY_PORT", "8766"))
+    PEERS = os.getenv("PEERS", "")
+    PEER_ANNOUNCE_INTERVAL = int(os.getenv("PEER_ANNOUNCE_INTERVAL", "30"))
+    PEER_TIMEOUT = int(os.getenv("PEER_TIMEOUT", "5"))
+    PEER_MAX_UPLOADS = int(os.getenv("PEER_MAX_UPLOADS", "4"))
+
+    # Identificador desta tela (liberação escalonada de vídeos novos).
+    # Sem DEVICE_ID, um id aleatório é gerado uma vez e guardado em DEVICE_ID_FILE
+    DEVICE_ID = os.getenv("DEVICE_ID", "")
+    DEVICE_ID_FILE = os.path.join(os.path.dirname(__file__), "device_id.txt")
+
+    # Registro no servidor: token da tela (recebido no primeiro uso), chave de
+    # registro exigida pelo servidor (se houver) e nome exibido no admin
+    DEVICE_TOKEN_FILE = os.path.join(os.path.dirname(__file__), "device_token.txt")
+    DEVICE_REGISTRATION_KEY = os.getenv("DEVICE_REGISTRATION_KEY", "")
+    DEVICE_NAME = os.getenv("DEVICE_NAME", "")
+    # Intervalo inicial dos heartbeats (o servidor pode pedir outro)
+    HEARTBEAT_INTERVAL = int(os.getenv("HEARTBEAT_INTERVAL", "300"))
+
     # Pasta para salvar vídeos baixados
     DOWNLOAD_FOLDER = os.path.join(os.path.dirname(__file__), "videos")
     os.makedirs(DOWNLOAD_FOLDER, exist_ok=True)
 
+    # Manifest local dos vídeos baixados (id, hash, tamanho, verificado, último uso)
+    LOCAL_MANIFEST_FILE = os.path.join(os.path.dirname(__file__), "videos.json")
+
+    # Limite do cache de vídeos em bytes (0 = sem limite). Os vídeos da
+    # playlist nunca são removidos; os que saíram dela ficam até faltar espaço
+    CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(10 * 1024 ** 3)))
+
+    # Registro local das exibições (SQLite), enviado em lotes ao servidor:
+    # até PLAY_LOG_BATCH por envio, a cada PLAY_LOG_INTERVAL segundos; sem
+    # conexão, a espera dobra a cada falha até PLAY_LOG_MAX_BACKOFF
+    PLAY_LOG_FILE = os.path.join(os.path.dirname(__file__), "exibicoes.db")
+    PLAY_LOG_BATCH = int(os.getenv("PLAY_LOG_BATCH", "200"))
+    PLAY_LOG_INTERVAL = int(os.getenv("PLAY_LOG_INTERVAL", "60"))
+    PLAY_LOG_MAX_BACKOFF = int(os.getenv("PLAY_LOG_MAX_BACKOFF", "3600"))
+
     # Arquivo para armazenar o último timestamp
     TIMESTAMP_FILE = os.path.join(os.path.dirname(__file__), "last_timestamp.txt")
@@ -0,0 +1,573 @@
+"""
+Download verificável de vídeos por blocos (manifest + HTTP Range)
+
+O servidor publica em /api/manifest/<id> o hash SHA-256 de cada bloco de
+tamanho fixo e do arquivo inteiro. Os blocos que faltam (ou que estão
+corrompidos) são baixados em paralelo para um arquivo temporário ".part";
+o arquivo final só aparece, via rename atômico, depois de verificado.
+Se o download for interrompido, a próxima tentativa reaproveita os blocos
+válidos que já estão no ".part".
+
+Se o servidor estiver ocupado (503), a requisição é repetida após o tempo
+indicado em Retry-After.
+
+Todas as requisições passam por uma única requests.Session (conexões
+keep-alive reaproveitadas entre threads e entre vídeos), com retentativa e
+backoff exponencial para falhas de rede e erros 500/502/504.
+
+Os bytes recebidos passam por um ControleBanda compartilhado por todos os
+downloads, com limite conforme o horário (a rede da loja é dividida com os
+caixas). Em uma janela de pausa o download é interrompido com
+DownloadPausado e continua depois do ponto em que parou: pelos blocos já
+verificados no ".part" ou, sem manifest, por Range a partir do tamanho dele.
+
+Com `pares` (peer_cache.RedePares), cada bloco é pedido antes às outras
+telas da rede local, pelo hash do arquivo, e conferido com o manifest do
+servidor como qualquer outro; o tráfego local não passa pelo limite de
+banda nem pela pausa, que existem por causa do link externo.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+PART_SUFFIX = ".part"
+
+
+class DownloadError(Exception):
+    """Falha ao baixar ou verificar um arquivo"""
+
+
+class DownloadPausado(DownloadError):
+    """Download interrompido por uma janela de pausa (será retomado)"""
+
+
+def criar_sessao(pool_size=10, retries=3, backoff=0.5):
+    """
+    Session HTTP compartilhada com pool de conexões e retentativa com backoff
+
+    503 fica de fora: é tratado em ChunkedDownloader._get, que respeita o
+    Retry-After do servidor.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=(500, 502, 504),
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=2, pool_maxsize=pool_size, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class ChunkedDownloader:
+    def __init__(
+        self,
+        server_url,
+        workers=4,
+        timeout=30,
+        retries=3,
+        headers=None,
+        max_wait=600,
+        session=None,
+        banda=None,
+        pares=None,
+        timeout_pares=5,
+    ):
+        self.server_url = server_url
+        self.workers = workers
+        self.timeout = timeout
+        self.retries = retries
+        self.headers = headers or {}
+        self.max_wait = max_wait
+        self.session = session or criar_sessao(pool_size=workers, retries=retries)
+        self.banda = banda
+        self.pares = pares
+        self.timeout_pares = timeout_pares
+        # Sem retentativa: um par fora do ar só faz passar para a próxima fonte
+        self.session_pares = requests.Session() if pares else None
+
+    def _consumir(self, data, limitador=None):
+        """Aplica o limite global (por horário) e o do download aos bytes recebidos"""
+        if self.banda:
+            self.banda.consumir(data)
+        if limitador:
+            limitador.consumir(data)
+        return data
+
+    def _verificar_pausa(self):
+        if self.banda and self.banda.pausado():
+            raise DownloadPausado("downloads pausados neste horário")
+
+    def _get(self, url, headers=None, **kwargs):
+        """GET que aguarda e repete enquanto o servidor responder 503 (ocupado)"""
+        headers = dict(self.headers, **(headers or {}))
+        esperado = 0
+        while True:
+            response = self.session.get(
+                url, headers=headers, timeout=self.timeout, **kwargs
+            )
+            if response.status_code != 503 or esperado >= self.max_wait:
+                return response
+            try:
+                espera = int(response.headers.get("Retry-After", "30"))
+            except ValueError:
+                espera = 30
+            espera = max(1, min(espera, self.max_wait - esperado))
+            response.close()
+            time.sleep(espera)
+            esperado += espera
+
+    def get_manifest(self, video_id, params=None):
+        """Busca o manifest do vídeo (None se o servidor não suportar)"""
+        response = self._get(
+            f"{self.server_url}/api/manifest/{video_id}", params=params
+        )
+        if response.status_code == 200:
+            return response.json()
+        if response.status_code == 404:
+            return None  # Servidor sem manifest: download simples
+        raise DownloadError(f"Manifest indisponível ({response.status_code})")
+
+    def download(self, video_id, filepath, params=None, max_kbps=None, progresso=None):
+        """
+        Baixa o vídeo para `filepath` verificando os hashes do manifest
+
+        Args:
+            max_kbps: int (opcional) - limite de banda do download, em kbit/s
+            progresso: Progresso (opcional) - acumula os bytes baixados
+
+        Returns:
+            dict: manifest usado (ou None no modo sem manifest)
+        """
+        # Pares consultados neste download (os que falham saem da lista)
+        pares = self.pares.lista() if self.pares else []
+        if not pares:
+            self._verificar_pausa()
+        manifest = self.get_manifest(video_id, params)
+        part_path = filepath + PART_SUFFIX
+        limitador = LimitadorBanda(max_kbps) if max_kbps else None
+
+        if manifest is None:
+            self._download_simples(
+                video_id, part_path, params, limitador, progresso
+            )
+            os.replace(part_path, filepath)
+            return None
+
+        pendentes = self._blocos_pendentes(part_path, manifest)
+        if pendentes:
+            if progresso:
+                progresso.planejar(
+                    sum(
+                        min(manifest["chunk_size"], manifest["size"] - i * manifest["chunk_size"])
+                        for i in pendentes
+                    )
+                )
+            self._baixar_blocos(
+                video_id,
+                part_path,
+                manifest,
+                pendentes,
+                params,
+                limitador,
+                progresso,
+                pares,
+            )
+
+        if hash_arquivo(part_path) != manifest["sha256"]:
+            os.remove(part_path)
+            raise DownloadError("Hash do arquivo não confere")
+
+        os.replace(part_path, filepath)
+        return manifest
+
+    def _blocos_pendentes(self, part_path, manifest):
+        """Índices dos blocos ausentes ou corrompidos no arquivo parcial"""
+        size = manifest["size"]
+        chunk_size = manifest["chunk_size"]
+
+        # Pré-alocar o arquivo parcial com o tamanho final
+        mode = "r+b" if os.path.exists(part_path) else "w+b"
+        with open(part_path, mode) as f:
+            f.truncate(size)
+            pendentes = []
+            for index, expected in enumerate(manifest["chunks"]):
+                f.seek(index * chunk_size)
+                data = f.read(chunk_size)
+                if hashlib.sha256(data).hexdigest() != expected:
+                    pendentes.append(index)
+        return pendentes
+
+    def _baixar_blocos(
+        self,
+        video_id,
+        part_path,
+        manifest,
+        pendentes,
+        params,
+        limitador=None,
+        progresso=None,
+        pares=(),
+    ):
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {
+                executor.submit(
+                    self._baixar_bloco,
+                    video_id,
+                    part_path,
+                    manifest,
+                    index,
+                    params,
+                    limitador,
+                    progresso,
+                    pares,
+                ): index
+                for index in pendentes
+            }
+            erros = []
+            pausado = None
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except DownloadPausado as e:
+                    pausado = e
+                except Exception as e:
+                    erros.append(f"bloco {futures[future]}: {e}")
+        if pausado:
+            raise pausado  # Blocos já gravados ficam no .part
+        if erros:
+            raise DownloadError(
+                f"{len(erros)} bloco(s) falharam; serão retomados na próxima tentativa ({erros[0]})"
+            )
+
+    def _baixar_bloco(
+        self,
+        video_id,
+        part_path,
+        manifest,
+        index,
+        params,
+        limitador=None,
+        progresso=None,
+        pares=(),
+    ):
+        """Baixa um bloco com Range, confere o hash e grava na posição certa"""
+        chunk_size = manifest["chunk_size"]
+        start = index * chunk_size
+        end = min(start + chunk_size, manifest["size"]) - 1
+        expected = manifest["chunks"][index]
+
+        data = self._bloco_de_par(pares, manifest["sha256"], start, end, expected)
+        if data is not None:
+            with open(part_path, "r+b") as f:
+                f.seek(start)
+                f.write(data)
+            if progresso:
+                progresso.adicionar(len(data), par=True)
+            return
+
+        ultimo_erro = None
+        for tentativa in range(self.retries):
+            if tentativa:
+                time.sleep(min(0.5 * 2 ** tentativa, 10))  # backoff
+            self._verificar_pausa()
+            try:
+                response = self._get(
+                    f"{self.server_url}/api/download/{video_id}",
+                    params=params,
+                    headers={"Range": f"bytes={start}-{end}"},
+                    stream=True,
+                )
+                # Fechar a resposta também no erro: libera a conexão e a vaga
+                # de download no servidor
+                with response:
+                    if response.status_code != 206:
+                        raise DownloadError(f"HTTP {response.status_code}")
+                    data = b"".join(
+                        self._consumir(parte, limitador)
+                        for parte in response.iter_content(chunk_size=65536)
+                    )
+                if hashlib.sha256(data).hexdigest() != expected:
+                    raise DownloadError("hash do bloco não confere")
+
+                with open(part_path, "r+b") as f:
+                    f.seek(start)
+                    f.write(data)
+                if progresso:
+                    progresso.adicionar(len(data))
+                return
+            except DownloadPausado:
+                raise
+            except (requests.RequestException, DownloadError) as e:
+                ultimo_erro = e
+        raise DownloadError(str(ultimo_erro))
+
+    def _bloco_de_par(self, pares, content_hash, start, end, expected):
+        """Bloco vindo de um par da rede local, já conferido (None se nenhum tiver)"""
+        for par in list(pares):
+            try:
+                response = self.session_pares.get(
+                    f"{par}/conteudo/{content_hash}",
+                    headers={"Range": f"bytes={start}-{end}"},
+                    timeout=self.timeout_pares,
+                )
+                if response.status_code == 206:
+                    if hashlib.sha256(response.content).hexdigest() == expected:
+                        return response.content
+                    print(f"[AVISO] Bloco inválido recebido de {par}; ignorando o par")
+                elif response.status_code == 503:
+                    continue  # Par ocupado, mas tem o arquivo
+            except requests.RequestException:
+                pass
+            # Sem o arquivo, fora do ar ou com conteúdo errado: não perguntar
+            # de novo neste download
+            try:
+                pares.remove(par)
+            except ValueError:
+                pass  # Outra thread já removeu
+        return None
+
+    def _download_simples(
+        self, video_id, part_path, params, limitador=None, progresso=None
+    ):
+        """
+        Download sequencial para servidores sem manifest
+
+        Continua um ".part" existente com Range; se o servidor responder o
+        arquivo inteiro (200), começa do zero.
+        """
+        existente = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        response = self._get(
+            f"{self.server_url}/api/download/{video_id}",
+            params=params,
+            headers={"Range": f"bytes={existente}-"} if existente else None,
+            stream=True,
+        )
+        if response.status_code == 416:
+            # .part maior que o arquivo atual: descartar e tentar de novo depois
+            response.close()
+            os.remove(part_path)
+            raise DownloadError("download parcial inválido")
+        if response.status_code not in (200, 206):
+            response.close()
+            raise DownloadError(f"HTTP {response.status_code}")
+        if progresso:
+            progresso.planejar(int(response.headers.get("Content-Length", 0)))
+        with response, open(part_path, "ab" if response.status_code == 206 else "wb") as f:
+            for chunk in response.iter_content(chunk_size=65536):
+                # Uma pausa no meio deixa o .part com o que já chegou
+                f.write(self._consumir(chunk, limitador))
+                if progresso:
+                    progresso.adicionar(len(chunk))
+
+
+class Progresso:
+    """Bytes baixados e taxa média de um lote de downloads (compartilhado entre threads)"""
+
+    def __init__(self):
+        self.inicio = time.monotonic()
+        self.total = 0
+        self.baixados = 0
+        self.de_pares = 0
+        self._lock = threading.Lock()
+
+    def planejar(self, n):
+        with self._lock:
+            self.total += n
+
+    def adicionar(self, n, par=False):
+        with self._lock:
+            self.baixados += n
+            if par:
+                self.de_pares += n
+
+    def resumo(self):
+        decorrido = max(time.monotonic() - self.inicio, 0.001)
+        resumo = (
+            f"{self.baixados / 1024 ** 2:.1f}/{self.total / 1024 ** 2:.1f} MB "
+            f"em {decorrido:.0f} s ({self.baixados / 1024 ** 2 / decorrido:.2f} MB/s)"
+        )
+        if self.de_pares:
+            resumo += f", {self.de_pares / 1024 ** 2:.1f} MB da rede local"
+        return resumo
+
+
+class LimitadorBanda:
+    """
+    Token bucket compartilhado pelas threads de um ou mais downloads
+
+    Os tokens (bytes) se acumulam na taxa configurada até `rajada` segundos
+    de tráfego. Quem consome mais do que há no balde fica devendo e espera
+    a dívida ser paga, então a taxa média nunca passa do limite, mas um
+    link ocioso pode mandar uma rajada curta sem espera.
+    """
+
+    def __init__(self, max_kbps, rajada=1.0):
+        self.rajada = rajada
+        self._definir_taxa(max_kbps)
+        self._tokens = self.capacidade
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _definir_taxa(self, max_kbps):
+        self.max_kbps = max_kbps
+        self.bytes_por_segundo = max_kbps * 1000 / 8
+        # Cabe pelo menos uma leitura de 64 KB, mesmo em taxas baixas
+        self.capacidade = max(self.bytes_por_segundo * self.rajada, 65536)
+
+    def ajustar(self, max_kbps):
+        """Muda a taxa (kbit/s) sem perder os tokens já acumulados"""
+        with self._lock:
+            self._reabastecer()
+            self._definir_taxa(max_kbps)
+            self._tokens = min(self._tokens, self.capacidade)
+
+    def _reabastecer(self):
+        agora = time.monotonic()
+        self._tokens = min(
+            self.capacidade,
+            self._tokens + (agora - self._ultimo) * self.bytes_por_segundo,
+        )
+        self._ultimo = agora
+
+    def consumir(self, data):
+        """Espera até que `data` caiba na taxa e devolve os próprios bytes"""
+        with self._lock:
+            self._reabastecer()
+            self._tokens -= len(data)
+            espera = -self._tokens / self.bytes_por_segundo if self._tokens < 0 else 0
+        if espera > 0:
+            time.sleep(espera)
+        return data
+
+
+def ler_limites(texto):
+    """
+    Lê limites por horário no formato "HH:MM-HH:MM=kbps" (separados por
+    vírgula; o intervalo pode cruzar a meia-noite). No lugar de kbps,
+    "pausa" suspende os downloads e 0 deixa sem limite.
+
+    Returns:
+        list: [(inicio, fim, kbps)] em minutos do dia; kbps None = pausa
+    """
+    limites = []
+    for item in texto.split(","):
+        if not item.strip():
+            continue
+        try:
+            janela, valor = item.split("=")
+            inicio, fim = (
+                int(h) * 60 + int(m)
+                for h, m in (p.strip().split(":") for p in janela.split("-"))
+            )
+            valor = valor.strip().lower()
+            kbps = None if valor == "pausa" else int(valor)
+        except ValueError:
+            print(f"[AVISO] Limite de banda inválido: {item}")
+            continue
+        limites.append((inicio, fim, kbps))
+    return limites
+
+
+class ControleBanda:
+    """
+    Limite de banda global dos downloads, conforme o horário
+
+    Aplica o limite da primeira janela que contém o horário atual (ou
+    `padrao_kbps` fora delas; 0 = sem limite) a todos os bytes recebidos e
+    mede a taxa real dos últimos `janela_medicao` segundos para o status.
+    """
+
+    def __init__(self, limites="", padrao_kbps=0, janela_medicao=5):
+        self.limites = ler_limites(limites)
+        self.padrao_kbps = padrao_kbps
+        self.janela_medicao = janela_medicao
+        self._balde = None
+        self._amostras = deque()
+        self._lock = threading.Lock()
+
+    def limite(self, agora=None):
+        """Limite atual em kbit/s (0 = sem limite, None = pausa)"""
+        agora = agora or datetime.now()
+        minuto = agora.hour * 60 + agora.minute
+        for inicio, fim, kbps in self.limites:
+            if inicio <= fim:
+                dentro = inicio <= minuto < fim
+            else:
+                dentro = minuto >= inicio or minuto < fim  # cruza a meia-noite
+            if dentro:
+                return kbps
+        return self.padrao_kbps
+
+    def pausado(self):
+        return self.limite() is None
+
+    def consumir(self, data):
+        """Conta e limita os bytes recebidos (DownloadPausado em janela de pausa)"""
+        kbps = self.limite()
+        if kbps is None:
+            raise DownloadPausado("downloads pausados neste horário")
+        if kbps:
+            with self._lock:
+                # Um único balde: a troca de janela só muda a taxa
+                if self._balde is None:
+                    self._balde = LimitadorBanda(kbps)
+                elif self._balde.max_kbps != kbps:
+                    self._balde.ajustar(kbps)
+            self._balde.consumir(data)
+        self._registrar(len(data))
+        return data
+
+    def _registrar(self, n):
+        agora = time.monotonic()
+        with self._lock:
+            self._amostras.append((agora, n))
+            while self._amostras and self._amostras[0][0] < agora - self.janela_medicao:
+                self._amostras.popleft()
+
+    def taxa_atual(self):
+        """Taxa de download real (kbit/s) nos últimos segundos"""
+        agora = time.monotonic()
+        with self._lock:
+            recebidos = sum(
+                n for t, n in self._amostras if t >= agora - self.janela_medicao
+            )
+        return recebidos * 8 / 1000 / self.janela_medicao
+
+    def estado(self):
+        """Resumo para o status: taxa atual e limite em vigor"""
+        kbps = self.limite()
+        if kbps is None:
+            limite = "pausado"
+        elif kbps:
+            limite = f"limite {kbps} kbit/s"
+        else:
+            limite = "sem limite"
+        return f"{self.taxa_atual():.0f} kbit/s ({limite})"
+
+
+def hash_arquivo(filepath, buffer_size=1024 * 1024):
+    """SHA-256 de um arquivo"""
+    hasher = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        while True:
+            data = f.read(buffer_size)
+            if not data:
+                break
+            hasher.update(data)
+    return hasher.hexdigest()
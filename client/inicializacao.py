@@ -0,0 +1,41 @@
+"""
+Medição do tempo de inicialização do cliente
+
+Cada etapa da partida (importações, configuração, manifest local, janela,
+primeiro quadro, rede, primeira sincronização) é marcada com o relógio
+monotônico, e o resumo é impresso no console para acompanhar regressões
+entre versões. O tempo do executável antes do Python começar (extração do
+PyInstaller) não aparece aqui.
+"""
+
+import threading
+import time
+
+
+class MedidorInicializacao:
+    def __init__(self, inicio=None):
+        self.inicio = inicio if inicio is not None else time.perf_counter()
+        self._ultimo = self.inicio
+        self._lock = threading.Lock()
+        self.etapas = []  # [(nome, segundos)]
+
+    def marcar(self, etapa):
+        """Encerra a etapa atual (tempo desde a marca anterior)"""
+        with self._lock:
+            agora = time.perf_counter()
+            self.etapas.append((etapa, agora - self._ultimo))
+            self._ultimo = agora
+
+    def descartar(self):
+        """Ignora o tempo desde a marca anterior (ex.: espera por digitação)"""
+        with self._lock:
+            self._ultimo = time.perf_counter()
+
+    def total(self):
+        with self._lock:
+            return sum(segundos for _, segundos in self.etapas)
+
+    def resumo(self):
+        with self._lock:
+            partes = ", ".join(f"{nome} {segundos:.2f} s" for nome, segundos in self.etapas)
+        return f"{partes} (total {self.total():.2f} s)"
@@ -0,0 +1,178 @@
+"""
+Manifest local dos vídeos já baixados
+
+Guarda, para cada arquivo da pasta de vídeos, o id do vídeo (e da variante),
+o hash SHA-256, o tamanho e se o conteúdo foi verificado. A sincronização
+compara esse manifest com a lista do servidor: só baixa o que é novo (ou
+mudou) e só apaga o que deixou de ser atribuído à tela, sem precisar
+recalcular o hash de arquivos que já foram verificados.
+
+O arquivo é gravado de forma atômica (arquivo temporário + os.replace),
+então uma queda de energia no meio da gravação não o corrompe.
+
+A pasta funciona como um cache com limite de bytes: os vídeos atribuídos à
+tela ficam fixados, e os que saíram da playlist continuam no disco (podem
+voltar quando a campanha recebe créditos) até o limite exigir espaço; aí
+saem primeiro os usados há mais tempo (LRU, pelo campo "ultimo_uso").
+
+O manifest também guarda a última playlist publicada (arquivos e pesos):
+na partida, a tela volta a exibir o que já tem no disco sem esperar pela
+rede nem pela primeira sincronização.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+
+class ManifestLocal:
+    def __init__(self, path, folder):
+        self.path = path
+        self.folder = folder
+        self._lock = threading.Lock()
+        dados = self._carregar()
+        self.entradas = dados.get("arquivos", {})
+        self.playlist = dados.get("playlist", [])  # [[arquivo, peso]]
+
+    def _carregar(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            # Manifest ilegível: os arquivos existentes serão conferidos de novo
+            print(f"[AVISO] Manifest local inválido ({e}); será reconstruído")
+            return {}
+
+    def salvar(self):
+        with self._lock:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"arquivos": self.entradas, "playlist": self.playlist}, f, indent=2
+                )
+            os.replace(tmp_path, self.path)
+
+    def caminho(self, filename):
+        return os.path.join(self.folder, filename)
+
+    def registrar(self, filename, video_id, variant_id, content_hash, size, verificado):
+        entrada = {
+            "video_id": video_id,
+            "variant_id": variant_id,
+            "content_hash": content_hash,
+            "size": size,
+            "verificado": verificado,
+            "baixado_em": datetime.now().isoformat(timespec="seconds"),
+            "ultimo_uso": time.time(),
+        }
+        with self._lock:
+            self.entradas[filename] = entrada
+
+    def remover(self, filename):
+        with self._lock:
+            self.entradas.pop(filename, None)
+
+    def fixar(self, filenames):
+        """Marca os arquivos atribuídos à tela como usados agora (LRU)"""
+        agora = time.time()
+        with self._lock:
+            for filename in filenames:
+                if filename in self.entradas:
+                    self.entradas[filename]["ultimo_uso"] = agora
+
+    def guardar_playlist(self, videos):
+        """Guarda a playlist publicada (pares (caminho, peso)) para a próxima partida"""
+        with self._lock:
+            self.playlist = [[os.path.basename(path), peso] for path, peso in videos]
+
+    def playlist_em_cache(self):
+        """
+        Última playlist publicada, só com os arquivos que ainda constam no
+        manifest e estão no disco: pares (caminho, peso) prontos para o player
+        """
+        with self._lock:
+            guardada = [
+                (filename, peso)
+                for filename, peso in self.playlist
+                if filename in self.entradas
+            ]
+        return tuple(
+            (self.caminho(filename), peso)
+            for filename, peso in guardada
+            if os.path.exists(self.caminho(filename))
+        )
+
+    def bytes_ocupados(self):
+        with self._lock:
+            return sum(entrada["size"] or 0 for entrada in self.entradas.values())
+
+    def candidatos_remocao(self, fixados, limite_bytes, reservar=0):
+        """
+        Arquivos não fixados a remover, do uso mais antigo para o mais
+        recente, até que o cache mais `reservar` bytes caiba em `limite_bytes`
+        (0 = sem limite)
+        """
+        ocupado = self.bytes_ocupados() + reservar
+        if not limite_bytes or ocupado <= limite_bytes:
+            return []
+        with self._lock:
+            livres = sorted(
+                (entrada.get("ultimo_uso", 0), filename, entrada["size"] or 0)
+                for filename, entrada in self.entradas.items()
+                if filename not in fixados
+            )
+        remover = []
+        for _, filename, size in livres:
+            if ocupado <= limite_bytes:
+                break
+            remover.append(filename)
+            ocupado -= size
+        return remover
+
+    def por_hash(self, content_hash):
+        """Caminho de um arquivo verificado com esse hash (None se não houver)"""
+        with self._lock:
+            filenames = [
+                filename
+                for filename, entrada in self.entradas.items()
+                if entrada["verificado"] and entrada["content_hash"] == content_hash
+            ]
+        for filename in filenames:
+            filepath = self.caminho(filename)
+            if os.path.exists(filepath):
+                return filepath
+        return None
+
+    def atualizado(self, filename, video_id, variant_id, content_hash, size):
+        """
+        Indica se o arquivo local corresponde ao conteúdo esperado
+
+        Arquivos já verificados só têm o tamanho conferido. Arquivos sem
+        registro (baixados por uma versão anterior do cliente) têm o hash
+        recalculado uma vez e, se conferirem, passam a constar no manifest.
+        """
+        filepath = self.caminho(filename)
+        if not os.path.exists(filepath):
+            return False
+        tamanho_local = os.path.getsize(filepath)
+        if size is not None and tamanho_local != size:
+            return False
+
+        entrada = self.entradas.get(filename)
+        if entrada and entrada["verificado"]:
+            return not content_hash or entrada["content_hash"] == content_hash
+        if not content_hash:
+            return True  # Servidor não informou o hash: nada a conferir
+
+        # Importado só aqui: o downloader traz o requests, que a partida não usa
+        from downloader import hash_arquivo
+
+        calculado = hash_arquivo(filepath)
+        if calculado != content_hash:
+            return False
+        self.registrar(filename, video_id, variant_id, calculado, tamanho_local, True)
+        return True
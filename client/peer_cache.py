@@ -0,0 +1,181 @@
+"""
+Cache compartilhado entre as telas da mesma rede local
+
+Em shoppings, dezenas de telas dividem o mesmo link externo e baixariam os
+mesmos arquivos do servidor. No modo pares (PEER_MODE), cada tela:
+
+- serve por HTTP, na rede local, os arquivos já verificados do seu cache,
+  endereçados pelo hash SHA-256 do conteúdo (GET /conteudo/<sha256>, com
+  suporte a Range, para que os blocos do manifest possam vir de pares);
+- anuncia a própria porta por broadcast UDP e escuta os anúncios das
+  outras telas, além de usar a lista fixa PEERS.
+
+O ChunkedDownloader pede cada bloco primeiro aos pares e só então ao
+servidor. O manifest (com os hashes) sempre vem do servidor e todo bloco
+recebido de um par é conferido, então um par com arquivo corrompido ou
+desatualizado só custa uma requisição perdida.
+"""
+
+import json
+import os
+import re
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HASH_RE = re.compile(r"^/conteudo/([0-9a-f]{64})$")
+RANGE_RE = re.compile(r"^bytes=(\d+)-(\d*)$")
+APP_ID = "propaganda"
+
+
+class ServidorPares:
+    """Servidor HTTP que entrega aos pares os arquivos verificados do cache"""
+
+    def __init__(self, manifest_local, porta, max_envios=4):
+        self.manifest_local = manifest_local
+        self.porta = porta
+        # Envios simultâneos: não competir com a reprodução pela CPU e disco
+        self.envios = threading.BoundedSemaphore(max_envios)
+        self._http = None
+
+    def iniciar(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_HEAD(self):
+                self._responder(corpo=False)
+
+            def do_GET(self):
+                self._responder(corpo=True)
+
+            def _responder(self, corpo):
+                match = HASH_RE.match(self.path)
+                filepath = match and servidor.manifest_local.por_hash(match.group(1))
+                if not filepath:
+                    self.send_error(404)
+                    return
+                if not servidor.envios.acquire(blocking=False):
+                    self.send_error(503)  # O cliente passa para outra fonte
+                    return
+                try:
+                    self._enviar(filepath, corpo)
+                except (OSError, ConnectionError):
+                    pass  # Par desconectou ou arquivo removido do cache
+                finally:
+                    servidor.envios.release()
+
+            def _enviar(self, filepath, corpo):
+                with open(filepath, "rb") as f:
+                    size = os.fstat(f.fileno()).st_size
+                    inicio, fim = 0, size - 1
+                    faixa = RANGE_RE.match(self.headers.get("Range", ""))
+                    if faixa:
+                        inicio = int(faixa.group(1))
+                        if faixa.group(2):
+                            fim = min(int(faixa.group(2)), size - 1)
+                        if inicio > fim:
+                            self.send_error(416)
+                            return
+                        self.send_response(206)
+                        self.send_header("Content-Range", f"bytes {inicio}-{fim}/{size}")
+                    else:
+                        self.send_response(200)
+                    self.send_header("Content-Length", str(fim - inicio + 1))
+                    self.send_header("Accept-Ranges", "bytes")
+                    self.end_headers()
+                    if not corpo:
+                        return
+                    f.seek(inicio)
+                    restante = fim - inicio + 1
+                    while restante > 0:
+                        data = f.read(min(65536, restante))
+                        if not data:
+                            break
+                        self.wfile.write(data)
+                        restante -= len(data)
+
+            def log_message(self, format, *args):
+                pass  # Sem log por requisição
+
+        self._http = ThreadingHTTPServer(("", self.porta), Handler)
+        self._http.daemon_threads = True
+        threading.Thread(target=self._http.serve_forever, daemon=True).start()
+
+    def parar(self):
+        if self._http:
+            self._http.shutdown()
+            self._http.server_close()
+
+
+class RedePares:
+    """
+    Lista de pares da rede local: fixos (PEERS) e descobertos por broadcast
+
+    Cada tela anuncia {"app", "device_id", "porta"} a cada `intervalo`
+    segundos; pares sem anúncio por 3 intervalos saem da lista.
+    """
+
+    def __init__(self, device_id, porta, porta_descoberta, fixos="", intervalo=30):
+        self.device_id = device_id
+        self.porta = porta
+        self.porta_descoberta = porta_descoberta
+        self.intervalo = intervalo
+        self.fixos = [
+            par.strip() if "://" in par else f"http://{par.strip()}"
+            for par in fixos.split(",")
+            if par.strip()
+        ]
+        self.descobertos = {}  # url -> último anúncio (time.monotonic())
+        self._lock = threading.Lock()
+
+    def lista(self):
+        """URLs base dos pares conhecidos (fixos primeiro)"""
+        limite = time.monotonic() - 3 * self.intervalo
+        with self._lock:
+            for url in [u for u, visto in self.descobertos.items() if visto < limite]:
+                del self.descobertos[url]
+            descobertos = [u for u in self.descobertos if u not in self.fixos]
+        return self.fixos + descobertos
+
+    def iniciar(self, parar):
+        """Threads de anúncio e de escuta até `parar` (threading.Event)"""
+        threading.Thread(target=self._escutar, args=(parar,), daemon=True).start()
+        threading.Thread(target=self._anunciar, args=(parar,), daemon=True).start()
+
+    def _anunciar(self, parar):
+        mensagem = json.dumps(
+            {"app": APP_ID, "device_id": self.device_id, "porta": self.porta}
+        ).encode()
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            while True:
+                try:
+                    sock.sendto(mensagem, ("<broadcast>", self.porta_descoberta))
+                except OSError as e:
+                    print(f"[AVISO] Falha ao anunciar na rede local: {e}")
+                if parar.wait(self.intervalo):
+                    return
+
+    def _escutar(self, parar):
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            try:
+                sock.bind(("", self.porta_descoberta))
+            except OSError as e:
+                print(f"[AVISO] Descoberta de pares indisponível: {e}")
+                return
+            sock.settimeout(1)
+            while not parar.is_set():
+                try:
+                    data, (ip, _) = sock.recvfrom(1024)
+                    anuncio = json.loads(data)
+                    if anuncio.get("app") != APP_ID or anuncio.get("device_id") == self.device_id:
+                        continue
+                    url = f"http://{ip}:{int(anuncio['porta'])}"
+                except socket.timeout:
+                    continue
+                except (OSError, ValueError, KeyError, TypeError):
+                    continue  # Pacote de outro programa ou malformado
+                with self._lock:
+                    self.descobertos[url] = time.monotonic()
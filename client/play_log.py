@@ -0,0 +1,151 @@
+"""
+Registro local das exibições, enviado ao servidor em lotes
+
+Cada exibição completa vira uma linha em um banco SQLite local, com um id
+único gerado na tela. Uma thread envia as linhas pendentes em lotes para
+/api/visualizacoes e só as apaga depois da confirmação do servidor; como o
+servidor ignora ids repetidos, reenviar um lote (queda no meio do envio,
+reinício do cliente) não conta a exibição duas vezes.
+
+O envio exige o token da tela (cabeçalhos compartilhados com telemetria.py);
+até a tela se registrar, as exibições ficam na fila.
+
+Sem conexão, as exibições continuam sendo gravadas e o envio é tentado de
+novo com espera exponencial, então dias sem rede não perdem nada.
+"""
+
+import random
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+
+
+class RegistroExibicoes:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        # Acesso pela thread do player (gravação) e do envio (leitura)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS exibicoes (
+                    id TEXT PRIMARY KEY,
+                    video_id INTEGER NOT NULL,
+                    visualizado_em TEXT NOT NULL,
+                    latitude REAL,
+                    longitude REAL
+                )
+                """
+            )
+
+    def registrar(self, video_id, latitude=None, longitude=None):
+        """Grava uma exibição (só disco local, sem rede)"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO exibicoes VALUES (?, ?, ?, ?, ?)",
+                (
+                    uuid.uuid4().hex,
+                    video_id,
+                    datetime.utcnow().isoformat(timespec="seconds"),
+                    latitude,
+                    longitude,
+                ),
+            )
+
+    def pendentes(self, limite):
+        """Exibições mais antigas ainda não confirmadas pelo servidor"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, video_id, visualizado_em, latitude, longitude "
+                "FROM exibicoes ORDER BY visualizado_em LIMIT ?",
+                (limite,),
+            ).fetchall()
+        return [
+            {
+                "id": row[0],
+                "video_id": row[1],
+                "visualizado_em": row[2],
+                "latitude": row[3],
+                "longitude": row[4],
+            }
+            for row in rows
+        ]
+
+    def remover(self, ids):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM exibicoes WHERE id = ?", [(i,) for i in ids]
+            )
+
+    def total(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM exibicoes").fetchone()[0]
+
+
+class EnviadorExibicoes:
+    """Thread que envia o registro local ao servidor"""
+
+    def __init__(
+        self,
+        registro,
+        session,
+        server_url,
+        headers=None,
+        lote=200,
+        intervalo=60,
+        espera_maxima=3600,
+        timeout=30,
+    ):
+        self.registro = registro
+        self.session = session
+        self.server_url = server_url
+        self.headers = headers or {}
+        self.lote = lote
+        self.intervalo = intervalo
+        self.espera_maxima = espera_maxima
+        self.timeout = timeout
+
+    def executar(self, parar):
+        """Loop de envio até `parar` (threading.Event) ser sinalizado"""
+        espera = self.intervalo
+        while not parar.wait(espera):
+            try:
+                while self.enviar_lote() and not parar.is_set():
+                    pass  # Lote cheio: ainda há pendentes, enviar o próximo já
+                espera = self.intervalo
+            except Exception as e:
+                # Backoff exponencial com jitter (várias telas voltando juntas)
+                espera = min(espera * 2, self.espera_maxima) * random.uniform(0.8, 1.2)
+                print(
+                    f"[AVISO] Falha ao enviar exibições ({e}); "
+                    f"{self.registro.total()} pendente(s), nova tentativa em {espera:.0f} s"
+                )
+
+    def enviar_lote(self):
+        """
+        Envia um lote de exibições pendentes
+
+        Returns:
+            bool: True se o lote estava cheio (pode haver mais pendentes)
+        """
+        eventos = self.registro.pendentes(self.lote)
+        if not eventos:
+            return False
+
+        response = self.session.post(
+            f"{self.server_url}/api/visualizacoes",
+            json={"eventos": eventos},
+            headers=self.headers,
+            timeout=self.timeout,
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}")
+
+        # ok/duplicado: registrado; recusado: definitivo (sem crédito, vídeo
+        # removido...). Em todos os casos não há o que reenviar
+        confirmados = [r["id"] for r in response.json()["resultados"]]
+        self.registro.remover(confirmados)
+        return len(eventos) == self.lote
@@ -0,0 +1,167 @@
+"""
+Decodificação antecipada dos vídeos
+
+Cada vídeo é lido por uma thread própria (Decodificador), que mantém até
+`tamanho_fila` quadros prontos em uma fila limitada. Assim a exibição não
+espera pelo decodificador, e o próximo vídeo pode ser aberto e ter os
+primeiros quadros decodificados enquanto o atual ainda está na tela.
+
+Com `tamanho_tela`, o Decodificador também entrega os quadros já no tamanho
+da tela (proporção mantida, com barras pretas), para que a janela não
+precise escalar nada na thread de exibição. O redimensionamento grava
+direto (cv2.resize com dst=) em um anel de buffers alocados uma única vez
+por vídeo: a fila tem no máximo `tamanho_fila` quadros, mais um na tela e
+um sendo gravado, então `tamanho_fila + 2` buffers nunca se sobrepõem.
+"""
+
+import queue
+import threading
+
+import cv2
+import numpy as np
+
+# Marca de fim do vídeo na fila de quadros
+FIM = None
+
+
+def detectar_resolucao():
+    """Resolução do monitor principal, ou None se não for possível detectar"""
+    try:
+        import ctypes
+
+        user32 = ctypes.windll.user32
+        user32.SetProcessDPIAware()  # resolução real, sem a escala do Windows
+        return user32.GetSystemMetrics(0), user32.GetSystemMetrics(1)
+    except (AttributeError, OSError):
+        pass
+    try:
+        import tkinter
+
+        root = tkinter.Tk()
+        root.withdraw()
+        tamanho = root.winfo_screenwidth(), root.winfo_screenheight()
+        root.destroy()
+        return tamanho
+    except Exception:
+        return None
+
+
+class Escalonador:
+    """
+    Round-robin ponderado suave: em cada escolha, todo vídeo acumula o seu
+    peso e o de maior acúmulo é exibido (e perde a soma dos pesos). Os
+    vídeos aparecem na proporção dos pesos, intercalados em vez de em
+    sequência, e pesos iguais viram o round-robin comum na ordem da lista.
+    """
+
+    def __init__(self, itens):
+        # itens: [(chave, peso)]; peso inválido ou <= 0 conta como mínimo
+        self.itens = [(chave, peso if peso and peso > 0 else 0.001) for chave, peso in itens]
+        self.total = sum(peso for _, peso in self.itens)
+        self.acumulado = [0.0] * len(self.itens)
+
+    def proximo(self):
+        melhor = 0
+        for i, (_, peso) in enumerate(self.itens):
+            self.acumulado[i] += peso
+            if self.acumulado[i] > self.acumulado[melhor]:
+                melhor = i
+        self.acumulado[melhor] -= self.total
+        return self.itens[melhor][0]
+
+
+class Decodificador:
+    def __init__(self, video_path, tamanho_fila=8, tamanho_tela=None):
+        self.video_path = video_path
+        self.tamanho_fila = tamanho_fila
+        self.tamanho_tela = tamanho_tela
+        self.fila = queue.Queue(maxsize=tamanho_fila)
+        self.fps = 30.0
+        self.aberto = False
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._decodificar, daemon=True)
+        self._thread.start()
+
+    def _decodificar(self):
+        cap = cv2.VideoCapture(self.video_path)
+        try:
+            if not cap.isOpened():
+                return
+            self.fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+            self.aberto = True
+            redimensionar = self._preparar(
+                int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            )
+            origem = None
+            posicao = 0
+            while not self._parar.is_set():
+                if not redimensionar:
+                    ret, frame = cap.read()
+                else:
+                    # Buffer de leitura e de saída reaproveitados a cada quadro
+                    ret, origem = cap.read(origem)
+                    if ret:
+                        frame = self._anel[posicao]
+                        cv2.resize(
+                            origem,
+                            self._dsize,
+                            dst=self._areas[posicao],
+                            interpolation=self._interpolacao,
+                        )
+                        posicao = (posicao + 1) % len(self._anel)
+                if not ret:
+                    break
+                self._colocar(frame)
+        finally:
+            cap.release()
+            self._colocar(FIM)
+
+    def _preparar(self, largura, altura):
+        """
+        Aloca os buffers de saída do tamanho da tela
+
+        Returns:
+            bool: False se os quadros já estão no tamanho da tela (ou se o
+                tamanho não é conhecido) e podem ser exibidos como vieram
+        """
+        if not self.tamanho_tela or not largura or not altura:
+            return False
+        largura_tela, altura_tela = self.tamanho_tela
+        if (largura, altura) == (largura_tela, altura_tela):
+            return False
+
+        escala = min(largura_tela / largura, altura_tela / altura)
+        w = max(1, round(largura * escala))
+        h = max(1, round(altura * escala))
+        x = (largura_tela - w) // 2
+        y = (altura_tela - h) // 2
+        self._dsize = (w, h)
+        self._interpolacao = cv2.INTER_AREA if escala < 1 else cv2.INTER_LINEAR
+        self._anel = [
+            np.zeros((altura_tela, largura_tela, 3), np.uint8)
+            for _ in range(self.tamanho_fila + 2)
+        ]
+        self._areas = [buffer[y : y + h, x : x + w] for buffer in self._anel]
+        return True
+
+    def _colocar(self, item):
+        # Fila cheia: espera o player consumir, sem travar o fechar()
+        while not self._parar.is_set():
+            try:
+                self.fila.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def quadro(self):
+        """Próximo quadro decodificado (FIM no fim do vídeo)"""
+        return self.fila.get()
+
+    def tem_quadro(self):
+        """Indica se já há outro quadro pronto na fila"""
+        return not self.fila.empty()
+
+    def fechar(self):
+        self._parar.set()
+        self._thread.join(timeout=2)
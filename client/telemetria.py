@@ -0,0 +1,121 @@
+"""
+Registro da tela no servidor e heartbeat periódico
+
+No primeiro uso a tela se registra em /api/dispositivos e guarda o token
+recebido. Depois, a cada intervalo (definido pelo servidor), envia um
+heartbeat pequeno para /api/heartbeat: versão do cliente, hash da playlist,
+bytes em cache, quadros descartados e momento da última sincronização.
+
+O token vai no cabeçalho X-Device-Token de todas as requisições da tela
+(o dicionário `headers` é compartilhado). Se o servidor exige chave de
+registro, o token também dá à tela um limite de requisições próprio, em vez
+do limite do IP do local.
+"""
+
+import os
+
+
+def hash_playlist(video_ids):
+    """
+    Hash curto (FNV-1a de 32 bits) dos ids da playlist, igual ao do
+    cliente web: telas com a mesma playlist têm o mesmo hash
+    """
+    h = 0x811C9DC5
+    for byte in ",".join(str(i) for i in sorted(video_ids)).encode():
+        h = ((h ^ byte) * 0x01000193) & 0xFFFFFFFF
+    return f"{h:08x}"
+
+
+class Telemetria:
+    def __init__(
+        self,
+        session,
+        server_url,
+        headers,
+        token_file,
+        coletar,
+        dados_registro=None,
+        chave_registro="",
+        intervalo=300,
+        timeout=30,
+    ):
+        self.session = session
+        self.server_url = server_url
+        self.headers = headers
+        self.token_file = token_file
+        self.coletar = coletar  # função que devolve o dict do heartbeat
+        self.dados_registro = dados_registro or {}
+        self.chave_registro = chave_registro
+        self.intervalo = intervalo
+        self.timeout = timeout
+        self._carregar_token()
+
+    def _carregar_token(self):
+        if os.path.exists(self.token_file):
+            with open(self.token_file, "r") as f:
+                token = f.read().strip()
+            if token:
+                self.headers["X-Device-Token"] = token
+
+    def _esquecer_token(self):
+        self.headers.pop("X-Device-Token", None)
+        if os.path.exists(self.token_file):
+            os.remove(self.token_file)
+
+    def registrar(self):
+        """
+        Registra a tela e guarda o token
+
+        Returns:
+            bool: True se a tela ficou registrada
+        """
+        headers = {"X-Registration-Key": self.chave_registro} if self.chave_registro else {}
+        response = self.session.post(
+            f"{self.server_url}/api/dispositivos",
+            json=dict(self.dados_registro, device_id=self.headers["X-Device-Id"]),
+            headers=headers,
+            timeout=self.timeout,
+        )
+        if response.status_code == 409:
+            print(
+                "[AVISO] Tela já registrada no servidor e sem token local; "
+                "remova-a na página Telas do admin para registrar de novo"
+            )
+            return False
+        if response.status_code != 201:
+            raise RuntimeError(f"registro recusado (HTTP {response.status_code})")
+
+        data = response.json()
+        with open(self.token_file, "w") as f:
+            f.write(data["token"])
+        self.headers["X-Device-Token"] = data["token"]
+        self.intervalo = data.get("heartbeat_interval") or self.intervalo
+        print("[INFO] Tela registrada no servidor")
+        return True
+
+    def enviar(self):
+        """Envia um heartbeat (registrando a tela antes, se preciso)"""
+        if "X-Device-Token" not in self.headers and not self.registrar():
+            return
+        response = self.session.post(
+            f"{self.server_url}/api/heartbeat",
+            json=self.coletar(),
+            headers=self.headers,
+            timeout=self.timeout,
+        )
+        if response.status_code == 401:
+            # Tela removida no admin (token revogado): registrar de novo
+            self._esquecer_token()
+            raise RuntimeError("token recusado; a tela será registrada de novo")
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}")
+        self.intervalo = response.json().get("heartbeat_interval") or self.intervalo
+
+    def executar(self, parar):
+        """Loop de heartbeats até `parar` (threading.Event) ser sinalizado"""
+        while not parar.is_set():
+            try:
+                self.enviar()
+            except Exception as e:
+                print(f"[AVISO] Falha no heartbeat: {e}")
+            parar.wait(self.intervalo)
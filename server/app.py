@@ -1,21 +1,63 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, current_app
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from config import Config
 from models import db, SystemStatus
 from routes import main_bp, admin_bp, api_bp, cliente_bp
+from routes import api as rotas_api
+from commands import register_commands
+from utils.schema import atualizar_esquema
 import logging
 from logging.handlers import RotatingFileHandler
 import os
 import time
 
+
+def chave_limite():
+    """
+    Chave do rate limit: com DEVICE_REGISTRATION_KEY, telas registradas (token
+    válido) têm limite próprio, já que várias podem sair pelo mesmo IP de um
+    shopping; os demais, por IP. Sem a chave qualquer um registra telas, e
+    cada tela nova seria um limite novo: tudo fica por IP
+    """
+    from services import DispositivoService
+    if not current_app.config.get('DEVICE_REGISTRATION_KEY'):
+        return get_remote_address()
+    device_id = request.headers.get('X-Device-Id')
+    if DispositivoService.autenticar(device_id, request.headers.get('X-Device-Token')):
+        return f'tela:{device_id}'
+    return get_remote_address()
+
+
+def chave_tela():
+    """Chave do limite por tela (rotas que exigem token): id da tela autenticada, ou o IP"""
+    from services import DispositivoService
+    device_id = request.headers.get('X-Device-Id')
+    if DispositivoService.autenticar(device_id, request.headers.get('X-Device-Token')):
+        return f'tela:{device_id}'
+    return get_remote_address()
+
+
 # Inicializar Flask-Limiter
 limiter = Limiter(
-    key_func=get_remote_address,
+    key_func=chave_limite,
     default_limits=["200 per day", "50 per hour"],
+    headers_enabled=True,  # Retry-After no 429 (usado pelo envio em partes)
     storage_uri="memory://"
 )
 
+# Limites próprios de cada tela (as rotas exigem o token), no lugar do limite
+# global. Criados uma vez, no módulo: o limiter é global e guarda os limites
+# pelo nome da função, então decorar a cada create_app() os acumularia.
+# Exibições em lote consomem créditos
+registrar_visualizacoes_limitado = limiter.limit(
+    lambda: current_app.config['VISUALIZACOES_LOTE_LIMITE'], key_func=chave_tela
+)(rotas_api.registrar_visualizacoes)
+# Heartbeats: várias telas atrás do mesmo NAT não dividem o limite do IP
+heartbeat_limitado = limiter.limit(
+    lambda: current_app.config['HEARTBEAT_LIMITE'], key_func=chave_tela
+)(rotas_api.heartbeat)
+
 
 def create_app():
     app = Flask(__name__)
@@ -60,6 +102,20 @@ def create_app():
     app.register_blueprint(api_bp)
     app.register_blueprint(cliente_bp)
 
+    # Downloads por blocos fazem uma requisição Range por bloco: não contam
+    # no limite global por IP
+    limiter.exempt(app.view_functions['api.download_video'])
+    limiter.exempt(app.view_functions['api.get_manifest'])
+    # Uploads em partes: uma requisição por parte de UPLOAD_CHUNK_SIZE (um
+    # vídeo de 2 GB passa de 250). Exigem login e uma sessão de upload
+    # aberta; início, finalização e cancelamento seguem no limite global
+    limiter.exempt(app.view_functions['api.enviar_parte'])
+    limiter.exempt(app.view_functions['api.status_upload'])
+    app.view_functions['api.registrar_visualizacoes'] = registrar_visualizacoes_limitado
+    app.view_functions['api.heartbeat'] = heartbeat_limitado
+    # Comandos de manutenção (flask --app app verificar-armazenamento)
+    register_commands(app)
+
     # Error Handlers
     @app.errorhandler(404)
     def not_found_error(error):
@@ -97,9 +153,11 @@ def create_app():
             }), 429
         return render_template('errors/429.html'), 429
 
-    # Criar tabelas
+    # Criar tabelas e adicionar colunas/índices novos em bancos existentes
     with app.app_context():
         db.create_all()
+        for alteracao in atualizar_esquema(db.engine, db.metadata):
+            app.logger.info(f'Esquema atualizado: {alteracao}')
         # Inicializar SystemStatus se não existir
         if not SystemStatus.query.first():
             status = SystemStatus()
@@ -0,0 +1,67 @@
+"""
+Comandos de manutenção (flask --app app <comando>)
+"""
+import click
+
+from models import db
+from services.consistency_service import ConsistencyService
+from utils.schema import atualizar_esquema
+
+
+def register_commands(app):
+    """Registra os comandos de linha de comando na aplicação"""
+
+    @app.cli.command('atualizar-banco')
+    def atualizar_banco():
+        """Adiciona ao banco existente as colunas e índices novos dos modelos"""
+        db.create_all()
+        alteracoes = atualizar_esquema(db.engine, db.metadata)
+        for alteracao in alteracoes:
+            click.echo(f"  {alteracao}")
+        click.echo(f"{len(alteracoes)} alteração(ões) no esquema")
+
+    @app.cli.command('verificar-armazenamento')
+    @click.option('--hash', 'verificar_hash', is_flag=True,
+                  help='Recalcula o SHA-256 dos arquivos (lento em acervos grandes)')
+    @click.option('--quarentena', is_flag=True,
+                  help='Move os arquivos órfãos para a pasta _quarentena/')
+    @click.option('--workers', default=8, show_default=True,
+                  help='Threads para o cálculo de hash')
+    @click.option('--idade-minima', default=3600, show_default=True,
+                  help='Segundos; arquivos mais novos não contam como órfãos')
+    @click.option('--limite', default=50, show_default=True,
+                  help='Máximo de itens listados por categoria (0 = todos)')
+    def verificar_armazenamento(verificar_hash, quarentena, workers, idade_minima, limite):
+        """Procura arquivos órfãos, arquivos ausentes e tamanhos/hashes divergentes"""
+        relatorio = ConsistencyService.verificar(
+            verificar_hash=verificar_hash, workers=workers, idade_minima=idade_minima
+        )
+
+        click.echo(
+            f"{relatorio['arquivos']} arquivos ({relatorio['bytes'] / 1024 ** 2:.1f} MB), "
+            f"{relatorio['registros']} referenciados no banco"
+        )
+        categorias = [
+            ('Órfãos (sem registro no banco)', relatorio['orfaos'],
+             lambda item: f"{item['arquivo']} ({item['tamanho']} bytes)"),
+            ('Ausentes (registro sem arquivo)', relatorio['ausentes'],
+             lambda item: f"{item['arquivo']} ({item['registro']})"),
+            ('Divergentes', relatorio['divergentes'],
+             lambda item: f"{item['arquivo']} ({item['registro']}): {item['motivo']}"),
+        ]
+        for titulo, itens, formatar in categorias:
+            click.echo(f"\n{titulo}: {len(itens)}")
+            for item in itens[:limite or None]:
+                click.echo(f"  {formatar(item)}")
+            if limite and len(itens) > limite:
+                click.echo(f"  ... e mais {len(itens) - limite}")
+
+        if quarentena and relatorio['orfaos']:
+            movidos, destino = ConsistencyService.quarentenar(relatorio['orfaos'])
+            click.echo(f"\n{movidos} arquivo(s) órfão(s) movidos para {destino}")
+
+        # Código de saída 1 quando há problemas (útil em cron/monitoramento)
+        if relatorio['ausentes'] or relatorio['divergentes'] or (
+            relatorio['orfaos'] and not quarentena
+        ):
+            raise SystemExit(1)
@@ -24,6 +24,89 @@ class Config:
         os.path.dirname(__file__), os.getenv("UPLOAD_FOLDER", "uploads")
     )
     MAX_CONTENT_LENGTH = 500 * 1024 * 1024  # 500 MB max file size
+
+    # Upload em partes (resumível): limite por arquivo e tamanho sugerido de cada parte
+    MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", str(2 * 1024 * 1024 * 1024)))  # 2 GB
+    UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))  # 8 MB
+
+    # Armazenamento dos vídeos: "local" (UPLOAD_FOLDER) ou "s3" (S3/MinIO, requer boto3)
+    # Com S3, UPLOAD_FOLDER continua sendo a área de montagem dos uploads em partes
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+    STORAGE_REDIRECT = os.getenv("STORAGE_REDIRECT", "1") == "1"  # downloads via URL pré-assinada
+    STORAGE_URL_EXPIRES = int(os.getenv("STORAGE_URL_EXPIRES", "3600"))
+    S3_BUCKET = os.getenv("S3_BUCKET", "")
+    S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "")  # ex: http://localhost:9000 (MinIO)
+    S3_REGION = os.getenv("S3_REGION", "")
+    S3_ACCESS_KEY = os.getenv("S3_ACCESS_KEY", "")
+    S3_SECRET_KEY = os.getenv("S3_SECRET_KEY", "")
+    S3_PREFIX = os.getenv("S3_PREFIX", "")
+
+    # Liberação escalonada: cada tela recebe um vídeo aprovado em um momento
+    # (determinístico) dentro desta janela, em segundos (0 = todas de uma vez)
+    ROLLOUT_WINDOW = int(os.getenv("ROLLOUT_WINDOW", "1800"))
+    # Downloads simultâneos atendidos pelo servidor (0 = sem limite); os
+    # excedentes recebem 503 com Retry-After entre N e 2N segundos
+    DOWNLOAD_MAX_CONCURRENT = int(os.getenv("DOWNLOAD_MAX_CONCURRENT", "20"))
+    DOWNLOAD_RETRY_AFTER = int(os.getenv("DOWNLOAD_RETRY_AFTER", "15"))
+
+    # Vídeos com início agendado entram na lista de pré-download das telas
+    # até esta quantidade de dias antes do início
+    PREFETCH_HORIZON_DAYS = int(os.getenv("PREFETCH_HORIZON_DAYS", "7"))
+
+    # Ritmo de exibição: campanhas sem fim_em distribuem os créditos neste
+    # prazo (horas); peso mínimo de um vídeo na playlist das telas (0..1)
+    PACING_HORIZON_HOURS = float(os.getenv("PACING_HORIZON_HOURS", "168"))
+    PACING_MIN_WEIGHT = float(os.getenv("PACING_MIN_WEIGHT", "0.05"))
+
+    # Máximo de exibições por lote em POST /api/visualizacoes
+    VISUALIZACOES_LOTE_MAX = int(os.getenv("VISUALIZACOES_LOTE_MAX", "500"))
+    # Lotes por tela (a rota exige o token da tela); um atraso de dias sem
+    # rede é enviado em vários lotes seguidos
+    VISUALIZACOES_LOTE_LIMITE = os.getenv("VISUALIZACOES_LOTE_LIMITE", "240 per hour")
+
+    # Registro de telas: com DEVICE_REGISTRATION_KEY, só telas que enviam a
+    # chave (X-Registration-Key) podem se registrar (vazio = registro livre).
+    # Só com a chave as telas registradas têm rate limit próprio em vez do IP
+    DEVICE_REGISTRATION_KEY = os.getenv("DEVICE_REGISTRATION_KEY", "")
+    # Heartbeat das telas: intervalo pedido às telas (segundos) e intervalo
+    # em que os heartbeats recebidos são gravados no banco, uma linha por tela
+    HEARTBEAT_INTERVAL = int(os.getenv("HEARTBEAT_INTERVAL", "300"))
+    HEARTBEAT_FLUSH_INTERVAL = int(os.getenv("HEARTBEAT_FLUSH_INTERVAL", "60"))
+    # Heartbeats por tela: folga sobre os 3600/HEARTBEAT_INTERVAL esperados
+    # por hora (reinícios, registro de novo)
+    HEARTBEAT_LIMITE = os.getenv(
+        "HEARTBEAT_LIMITE", f"{4 * 3600 // max(HEARTBEAT_INTERVAL, 1) + 10} per hour"
+    )
+
+    # Tamanho dos blocos do manifest de download (hash por bloco)
+    MANIFEST_CHUNK_SIZE = int(os.getenv("MANIFEST_CHUNK_SIZE", str(4 * 1024 * 1024)))  # 4 MB
+
+    # Processamento de mídia em segundo plano (probe/thumbnails com OpenCV)
+    MEDIA_PIPELINE_ENABLED = os.getenv("MEDIA_PIPELINE_ENABLED", "1") == "1"
+    MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", "2"))
+    MEDIA_MAX_WIDTH = int(os.getenv("MEDIA_MAX_WIDTH", "3840"))
+    MEDIA_MAX_HEIGHT = int(os.getenv("MEDIA_MAX_HEIGHT", "2160"))
+    MEDIA_MAX_FPS = float(os.getenv("MEDIA_MAX_FPS", "60"))
+    MEDIA_MAX_DURATION = float(os.getenv("MEDIA_MAX_DURATION", "0"))  # 0 = sem limite
+    THUMBNAIL_COUNT = int(os.getenv("THUMBNAIL_COUNT", "5"))
+    THUMBNAIL_HEIGHT = int(os.getenv("THUMBNAIL_HEIGHT", "90"))
+
+    # Proxy de revisão para o admin (baixa resolução) e sprite para navegação
+    PREVIEW_ENABLED = os.getenv("PREVIEW_ENABLED", "1") == "1"
+    PREVIEW_PROXY = os.getenv("PREVIEW_PROXY", "preview:480x270@15:400")
+    SPRITE_FRAMES = int(os.getenv("SPRITE_FRAMES", "20"))
+    SPRITE_COLUMNS = int(os.getenv("SPRITE_COLUMNS", "5"))
+    SPRITE_TILE_HEIGHT = int(os.getenv("SPRITE_TILE_HEIGHT", "90"))
+
+    # Transcode opcional para as resoluções da frota: "label:LARGURAxALTURA@FPS:KBPS,..."
+    # Usa ffmpeg se estiver no PATH; senão cv2.VideoWriter (sem controle de bitrate/áudio)
+    TRANSCODE_ENABLED = os.getenv("TRANSCODE_ENABLED", "0") == "1"
+    TRANSCODE_LADDER = os.getenv(
+        "TRANSCODE_LADDER", "1080p:1920x1080@30:6000,720p:1280x720@30:3000"
+    )
+    TRANSCODE_FFMPEG = os.getenv("TRANSCODE_FFMPEG", "ffmpeg")
+    # Pool próprio para preview e transcode (não ocupa os MEDIA_WORKERS da análise)
+    TRANSCODE_WORKERS = int(os.getenv("TRANSCODE_WORKERS", "1"))
     ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "admin123")
     PORT = int(os.getenv("PORT", "5000"))
 
@@ -64,15 +64,53 @@ class Video(db.Model):
     creditos = db.Column(db.Integer, default=0, nullable=False)
     pausado = db.Column(db.Boolean, default=False, nullable=False)
     visualizacoes = db.Column(db.Integer, default=0, nullable=False)
+    liberado_em = db.Column(db.DateTime)  # aprovação: início da liberação escalonada às telas
+    inicio_em = db.Column(db.DateTime)  # início agendado (UTC); antes disso só pré-download
+    fim_em = db.Column(db.DateTime)  # fim da campanha (UTC); define o ritmo de exibição
+
+    # Integridade do arquivo (calculada durante o upload)
+    file_size = db.Column(db.BigInteger)
+    content_hash = db.Column(db.String(64))  # SHA-256 hex
+    manifest = db.Column(db.Text)  # JSON com hashes por bloco (ManifestService)
+
+    # Metadados de mídia (preenchidos em segundo plano pelo MediaService)
+    media_status = db.Column(db.String(20), default="pendente")
+    media_erro = db.Column(db.String(255))
+    duracao = db.Column(db.Float)  # segundos
+    fps = db.Column(db.Float)
+    largura = db.Column(db.Integer)
+    altura = db.Column(db.Integer)
+    total_frames = db.Column(db.Integer)
+    thumbnail = db.Column(db.String(255))  # chave relativa no armazenamento
+
+    # Revisão pelo admin: proxy de baixa resolução e sprite de thumbnails
+    preview = db.Column(db.String(255))
+    sprite = db.Column(db.String(255))
+    sprite_frames = db.Column(db.Integer)
 
     # Relacionamento com visualizações
     logs_visualizacao = db.relationship(
         "LogVisualizacao", backref="video", lazy=True, cascade="all, delete-orphan"
     )
 
+    # Versões normalizadas (transcode) para as telas
+    variants = db.relationship(
+        "VideoVariant",
+        backref="video",
+        lazy=True,
+        cascade="all, delete-orphan",
+        order_by="VideoVariant.altura",
+    )
+
     def __repr__(self):
         return f"<Video {self.filename}>"
 
+    def arquivos(self):
+        """Chaves (caminhos relativos no armazenamento) de todos os arquivos do vídeo"""
+        paths = [self.filename, self.thumbnail, self.preview, self.sprite]
+        paths.extend(variant.filename for variant in self.variants)
+        return [path for path in paths if path]
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -88,6 +126,18 @@ class Video(db.Model):
             "creditos": self.creditos,
             "pausado": self.pausado,
             "visualizacoes": self.visualizacoes,
+            "liberado_em": self.liberado_em.isoformat() if self.liberado_em else None,
+            "inicio_em": self.inicio_em.isoformat() if self.inicio_em else None,
+            "fim_em": self.fim_em.isoformat() if self.fim_em else None,
+            "file_size": self.file_size,
+            "content_hash": self.content_hash,
+            "media_status": self.media_status,
+            "duracao": self.duracao,
+            "fps": self.fps,
+            "largura": self.largura,
+            "altura": self.altura,
+            "total_frames": self.total_frames,
+            "variants": [variant.to_dict() for variant in self.variants],
         }
 
     def consumir_credito(self):
@@ -107,6 +157,41 @@ class Video(db.Model):
             self.pausado = False
 
 
+class VideoVariant(db.Model):
+    """Versão transcodificada de um vídeo (resolução/fps/bitrate da frota)"""
+
+    __tablename__ = "video_variants"
+
+    id = db.Column(db.Integer, primary_key=True)
+    video_id = db.Column(db.Integer, db.ForeignKey("videos.id"), nullable=False)
+    label = db.Column(db.String(20), nullable=False)  # ex: "720p"
+    filename = db.Column(db.String(255), nullable=False)  # chave relativa no armazenamento
+    largura = db.Column(db.Integer, nullable=False)
+    altura = db.Column(db.Integer, nullable=False)
+    fps = db.Column(db.Float)
+    bitrate_kbps = db.Column(db.Integer)
+    file_size = db.Column(db.BigInteger)
+    content_hash = db.Column(db.String(64))
+    manifest = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<VideoVariant {self.label} video_id={self.video_id}>"
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "label": self.label,
+            "filename": self.filename,
+            "largura": self.largura,
+            "altura": self.altura,
+            "fps": self.fps,
+            "bitrate_kbps": self.bitrate_kbps,
+            "file_size": self.file_size,
+            "content_hash": self.content_hash,
+        }
+
+
 class LogVisualizacao(db.Model):
     __tablename__ = "logs_visualizacao"
 
@@ -116,11 +201,106 @@ class LogVisualizacao(db.Model):
     client_latitude = db.Column(db.Float)
     client_longitude = db.Column(db.Float)
     visualizado_em = db.Column(db.DateTime, default=datetime.utcnow)
+    # Id gerado pela tela para cada exibição: reenvios do mesmo lote não
+    # contam (nem consomem crédito) duas vezes
+    evento_id = db.Column(db.String(64), unique=True, index=True)
+    device_id = db.Column(db.String(64))
 
     def __repr__(self):
         return f"<LogVisualizacao video_id={self.video_id} em {self.visualizado_em}>"
 
 
+class UploadSession(db.Model):
+    """Upload em partes (chunked) ainda não finalizado"""
+
+    __tablename__ = "upload_sessions"
+
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    filename = db.Column(db.String(255), nullable=False)
+    original_filename = db.Column(db.String(255), nullable=False)
+    total_size = db.Column(db.BigInteger, nullable=False)
+    bytes_recebidos = db.Column(db.BigInteger, default=0, nullable=False)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    radius_km = db.Column(db.Float, nullable=False)
+    cliente_id = db.Column(db.Integer, db.ForeignKey("clientes.id"), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<UploadSession {self.id} {self.bytes_recebidos}/{self.total_size}>"
+
+    @property
+    def progresso(self):
+        """Percentual recebido (0-100)"""
+        if not self.total_size:
+            return 100.0
+        return round(self.bytes_recebidos * 100.0 / self.total_size, 2)
+
+    @property
+    def completo(self):
+        return self.bytes_recebidos >= self.total_size
+
+    def to_dict(self):
+        return {
+            "upload_id": self.id,
+            "original_filename": self.original_filename,
+            "total_size": self.total_size,
+            "offset": self.bytes_recebidos,
+            "progresso": self.progresso,
+            "completo": self.completo,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat(),
+        }
+
+
+class Dispositivo(db.Model):
+    """Tela registrada (cliente desktop ou web) e sua última telemetria"""
+
+    __tablename__ = "dispositivos"
+
+    id = db.Column(db.Integer, primary_key=True)
+    device_id = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    token_hash = db.Column(db.String(64), nullable=False)  # SHA-256 do token
+    nome = db.Column(db.String(100))
+    tipo = db.Column(db.String(20))  # "desktop" ou "web"
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Último heartbeat (gravado em lote, uma linha por tela por intervalo)
+    ultimo_contato = db.Column(db.DateTime)
+    ip = db.Column(db.String(50))
+    versao = db.Column(db.String(20))
+    playlist_hash = db.Column(db.String(64))
+    cache_bytes = db.Column(db.BigInteger)
+    quadros_descartados = db.Column(db.Integer)  # desde o início do player
+    ultima_sincronizacao = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<Dispositivo {self.device_id}>"
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "device_id": self.device_id,
+            "nome": self.nome,
+            "tipo": self.tipo,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "created_at": self.created_at.isoformat(),
+            "ultimo_contato": self.ultimo_contato.isoformat() if self.ultimo_contato else None,
+            "ip": self.ip,
+            "versao": self.versao,
+            "playlist_hash": self.playlist_hash,
+            "cache_bytes": self.cache_bytes,
+            "quadros_descartados": self.quadros_descartados,
+            "ultima_sincronizacao": (
+                self.ultima_sincronizacao.isoformat() if self.ultima_sincronizacao else None
+            ),
+        }
+
+
 class SystemStatus(db.Model):
     __tablename__ = "system_status"
 
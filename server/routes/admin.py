@@ -1,12 +1,14 @@
 """
 Rotas administrativas
 """
-from flask import Blueprint, request, render_template, redirect, url_for, session, send_from_directory, flash, current_app
+from flask import Blueprint, request, render_template, redirect, url_for, session, send_from_directory, flash, current_app, abort
 from models import db, SystemStatus
 from forms import LoginForm, UploadVideoForm
 from utils.decorators import admin_required
-from services import VideoService, AuthService
+from services import VideoService, AuthService, MediaService, StorageService, DispositivoService
+from models import Video
 import os
+from datetime import datetime
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -147,6 +149,33 @@ def adicionar_creditos(video_id):
     return redirect(url_for('admin.dashboard'))
 
 
+@admin_bp.route('/agendar/<int:video_id>', methods=['POST'])
+@admin_required
+def agendar_campanha(video_id):
+    """Agendar (ou remover) o início e o fim de exibição de um vídeo"""
+    datas = {}
+    for campo, nome in (('inicio_em', 'início'), ('fim_em', 'fim')):
+        valor = request.form.get(campo, '').strip()
+        try:
+            datas[campo] = datetime.strptime(valor, '%Y-%m-%dT%H:%M') if valor else None
+        except ValueError:
+            flash(f'Data de {nome} inválida!', 'danger')
+            return redirect(url_for('admin.dashboard'))
+
+    success, message = VideoService.agendar_campanha(
+        video_id, datas['inicio_em'], datas['fim_em']
+    )
+
+    if success:
+        # Telas atualizam a lista de pré-download
+        SystemStatus.update_timestamp()
+        flash(message, 'success')
+    else:
+        flash(message, 'danger')
+
+    return redirect(url_for('admin.dashboard'))
+
+
 @admin_bp.route('/pausar/<int:video_id>', methods=['POST'])
 @admin_required
 def pausar_video(video_id):
@@ -178,6 +207,83 @@ def delete_video(video_id):
     return redirect(url_for('admin.dashboard'))
 
 
+@admin_bp.route('/reprocessar/<int:video_id>', methods=['POST'])
+@admin_required
+def reprocessar_video(video_id):
+    """Reagendar a análise de mídia (probe/thumbnails) de um vídeo"""
+    video = Video.query.get_or_404(video_id)
+    video.media_status = 'pendente'
+    video.media_erro = None
+    db.session.commit()
+    MediaService.agendar_processamento(video.id)
+    flash(f'Análise do vídeo "{video.original_filename}" reagendada', 'info')
+    return redirect(url_for('admin.dashboard'))
+
+
+@admin_bp.route('/telas')
+@admin_required
+def telas():
+    """Frota de telas registradas, com a telemetria do último heartbeat"""
+    dispositivos = DispositivoService.listar()
+    online = {d.id: DispositivoService.online(d) for d in dispositivos}
+    # Playlist mais comum: telas com hash diferente ainda não sincronizaram
+    hashes = [d.playlist_hash for d in dispositivos if d.playlist_hash and online[d.id]]
+    playlist_comum = max(set(hashes), key=hashes.count) if hashes else None
+
+    return render_template(
+        'admin_telas.html',
+        dispositivos=dispositivos,
+        online=online,
+        playlist_comum=playlist_comum,
+        agora=datetime.utcnow(),
+    )
+
+
+@admin_bp.route('/telas/<int:dispositivo_id>/remover', methods=['POST'])
+@admin_required
+def remover_tela(dispositivo_id):
+    """Remover uma tela do registro (revoga o token)"""
+    success, message = DispositivoService.remover(dispositivo_id)
+
+    if success:
+        flash(message, 'success')
+    else:
+        flash(message, 'danger')
+
+    return redirect(url_for('admin.telas'))
+
+
+@admin_bp.route('/thumbnail/<int:video_id>')
+@admin_required
+def thumbnail(video_id):
+    """Tira de thumbnails gerada no processamento de mídia"""
+    video = Video.query.get_or_404(video_id)
+    if not video.thumbnail:
+        abort(404)
+    return StorageService.get_storage().send(video.thumbnail)
+
+
+@admin_bp.route('/preview/<int:video_id>')
+@admin_required
+def preview(video_id):
+    """
+    Proxy de revisão do vídeo, exibido inline com suporte a HTTP Range
+    (o navegador busca só os trechos assistidos). Sem proxy, usa o original.
+    """
+    video = Video.query.get_or_404(video_id)
+    return StorageService.get_storage().send(video.preview or video.filename, max_age=3600)
+
+
+@admin_bp.route('/sprite/<int:video_id>')
+@admin_required
+def sprite(video_id):
+    """Sprite de thumbnails para navegação rápida pelo vídeo"""
+    video = Video.query.get_or_404(video_id)
+    if not video.sprite:
+        abort(404)
+    return StorageService.get_storage().send(video.sprite, max_age=3600)
+
+
 @admin_bp.route('/download-client')
 @admin_required
 def download_client():
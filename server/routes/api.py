@@ -1,9 +1,12 @@
 """
 Rotas da API REST
 """
-from flask import Blueprint, request, jsonify, send_from_directory, current_app
+import os
+from datetime import datetime
+from flask import Blueprint, request, jsonify, current_app, session
 from models import SystemStatus
-from services import VideoService
+from services import VideoService, UploadService, ManifestService, StorageService, RolloutService, PacingService, DispositivoService
+from utils.decorators import api_auth_required
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
@@ -31,6 +34,8 @@ def get_videos():
     Retorna lista de vídeos disponíveis para a localização do cliente
     Apenas vídeos aprovados, pagos e não pausados
     Parâmetros: latitude, longitude
+    Cabeçalho X-Device-Id: identifica a tela para a liberação escalonada
+    prefetch: vídeos com início agendado, para baixar antes
     Rate limit: 30 requests per minute
     """
     try:
@@ -41,10 +46,33 @@ def get_videos():
     
     # Buscar vídeos disponíveis para a localização
     available_videos = VideoService.get_videos_by_location(latitude, longitude)
-    
+
+    # Vídeos recém-aprovados chegam a cada tela em um momento diferente
+    available_videos, proxima_liberacao = RolloutService.filtrar_liberados(
+        available_videos, _device_id()
+    )
+
+    # Campanhas agendadas: baixadas antes, fora do pico, e exibidas no início
+    prefetch = VideoService.get_prefetch_by_location(
+        latitude, longitude, current_app.config['PREFETCH_HORIZON_DAYS']
+    )
+    agora = datetime.utcnow()
+    mudancas = [video.inicio_em for video in prefetch]
+    # Fim de campanha: a tela deve tirar o vídeo da playlist na hora
+    mudancas += [video.fim_em for video in available_videos if video.fim_em]
+    if mudancas:
+        # Um momento que passou entre as consultas e agora vale como imediato
+        espera = max((min(mudancas) - agora).total_seconds(), 0)
+        proxima_liberacao = espera if proxima_liberacao is None else min(proxima_liberacao, espera)
+
+    # Peso de cada vídeo na playlist da tela e meta de ritmo (créditos x prazo)
+    pacing = PacingService.calcular(available_videos, agora)
+
     return jsonify({
-        'videos': [video.to_dict() for video in available_videos],
-        'count': len(available_videos)
+        'videos': [dict(video.to_dict(), **pacing[video.id]) for video in available_videos],
+        'count': len(available_videos),
+        'prefetch': [video.to_dict() for video in prefetch],
+        'proxima_liberacao': round(max(proxima_liberacao, 0)) + 1 if proxima_liberacao is not None else None
     })
 
 
@@ -52,16 +80,69 @@ def get_videos():
 def download_video(video_id):
     """
     Baixa um vídeo específico
+    Parâmetros: variant (opcional) - ID da variante transcodificada
+    Com armazenamento S3, redireciona para uma URL pré-assinada do bucket
+    Acima de DOWNLOAD_MAX_CONCURRENT downloads simultâneos: 503 + Retry-After
     Rate limit: 10 downloads per hour
     """
-    from models import Video
+    from models import Video, VideoVariant
     video = Video.query.get_or_404(video_id)
-    return send_from_directory(
-        current_app.config['UPLOAD_FOLDER'],
-        video.filename,
-        as_attachment=True,
-        download_name=video.original_filename
-    )
+    key = video.filename
+    download_name = video.original_filename
+
+    variant_id = request.args.get('variant', type=int)
+    if variant_id:
+        variant = VideoVariant.query.filter_by(id=variant_id, video_id=video.id).first_or_404()
+        nome, _ = os.path.splitext(video.original_filename)
+        key = variant.filename
+        download_name = f'{nome}_{variant.label}.mp4'
+
+    slots = RolloutService.download_slots()
+    if not slots.adquirir():
+        retry_after = RolloutService.retry_after()
+        response = jsonify({'error': 'Servidor ocupado, tente novamente', 'retry_after': retry_after})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(retry_after)
+        return response
+
+    try:
+        response = StorageService.get_storage().send(key, download_name=download_name)
+    except Exception:
+        slots.liberar()
+        raise
+
+    if response.is_streamed:
+        # O slot fica ocupado até o último byte ser enviado. Com
+        # direct_passthrough o Werkzeug não chama os callbacks de close.
+        response.direct_passthrough = False
+        response.call_on_close(slots.liberar)
+    else:
+        slots.liberar()  # Redirecionamento ou resposta sem corpo de arquivo
+    return response
+
+
+@api_bp.route('/manifest/<int:video_id>', methods=['GET'])
+def get_manifest(video_id):
+    """
+    Manifest de blocos do arquivo: tamanho, hash de cada bloco e do arquivo inteiro
+    Parâmetros: variant (opcional) - ID da variante transcodificada
+    """
+    from models import Video, VideoVariant
+    video = Video.query.get_or_404(video_id)
+
+    variant_id = request.args.get('variant', type=int)
+    item = video
+    if variant_id:
+        item = VideoVariant.query.filter_by(id=variant_id, video_id=video.id).first_or_404()
+
+    manifest = ManifestService.get_manifest(item)
+    if manifest is None:
+        return jsonify({'error': 'Arquivo do vídeo não encontrado'}), 404
+
+    result = dict(manifest)
+    result['video_id'] = video.id
+    result['variant_id'] = variant_id
+    return jsonify(result)
 
 
 @api_bp.route('/visualizacao/<int:video_id>', methods=['POST'])
@@ -93,3 +174,213 @@ def registrar_visualizacao(video_id):
             'creditos': video.creditos if video else 0,
             'pausado': video.pausado if video else True
         }), status_code
+
+
+@api_bp.route('/visualizacoes', methods=['POST'])
+def registrar_visualizacoes():
+    """
+    Registra em lote as exibições feitas por uma tela (fila local da tela)
+    Cabeçalhos X-Device-Id e X-Device-Token: só telas registradas consomem créditos
+    JSON: {"eventos": [{"id", "video_id", "visualizado_em", "latitude", "longitude"}]}
+    """
+    if not _dispositivo_autenticado():
+        return jsonify({'error': 'Dispositivo não registrado ou token inválido'}), 401
+
+    data = request.get_json(silent=True) or {}
+    eventos = data.get('eventos')
+    if not isinstance(eventos, list) or not all(isinstance(e, dict) for e in eventos):
+        return jsonify({'error': 'Informe a lista "eventos"'}), 400
+
+    limite = current_app.config['VISUALIZACOES_LOTE_MAX']
+    if len(eventos) > limite:
+        return jsonify({'error': f'Máximo de {limite} eventos por lote'}), 413
+
+    resultados, error = VideoService.registrar_visualizacoes_lote(
+        eventos, request.remote_addr, request.headers.get('X-Device-Id')
+    )
+    if error:
+        return jsonify({'error': error}), 500
+
+    return jsonify({
+        'resultados': resultados,
+        'aceitos': sum(1 for r in resultados if r['status'] == 'ok'),
+    })
+
+
+@api_bp.route('/dispositivos', methods=['POST'])
+def registrar_dispositivo():
+    """
+    Registra uma tela e devolve o token dela (mostrado só nesta resposta)
+    JSON: device_id, tipo ("desktop"/"web"), nome, latitude, longitude (opcionais, exceto device_id)
+    Com DEVICE_REGISTRATION_KEY configurada, exige o cabeçalho X-Registration-Key
+    """
+    chave = current_app.config.get('DEVICE_REGISTRATION_KEY')
+    if chave and request.headers.get('X-Registration-Key') != chave:
+        return jsonify({'error': 'Chave de registro inválida'}), 403
+
+    data = request.get_json(silent=True) or {}
+    try:
+        latitude = float(data['latitude']) if data.get('latitude') is not None else None
+        longitude = float(data['longitude']) if data.get('longitude') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Latitude e longitude inválidas'}), 400
+
+    token, error = DispositivoService.registrar(
+        data.get('device_id'),
+        tipo=data.get('tipo'),
+        nome=data.get('nome'),
+        latitude=latitude,
+        longitude=longitude,
+    )
+    if not token:
+        status_code = 409 if error == 'Dispositivo já registrado' else 400
+        return jsonify({'error': error}), status_code
+
+    return jsonify({
+        'device_id': data['device_id'].strip(),
+        'token': token,
+        'heartbeat_interval': current_app.config['HEARTBEAT_INTERVAL'],
+    }), 201
+
+
+@api_bp.route('/heartbeat', methods=['POST'])
+def heartbeat():
+    """
+    Telemetria periódica da tela (cabeçalhos X-Device-Id e X-Device-Token)
+    JSON: versao, playlist (hash), cache_bytes, quadros_descartados, sincronizado_em (epoch)
+    """
+    dispositivo_id = _dispositivo_autenticado()
+    if not dispositivo_id:
+        return jsonify({'error': 'Dispositivo não registrado ou token inválido'}), 401
+
+    DispositivoService.receber_heartbeat(
+        dispositivo_id, request.get_json(silent=True) or {}, request.remote_addr
+    )
+    return jsonify({'success': True, 'heartbeat_interval': current_app.config['HEARTBEAT_INTERVAL']})
+
+
+def _dispositivo_autenticado():
+    """Id do Dispositivo se a requisição traz um token válido, senão None"""
+    return DispositivoService.autenticar(
+        request.headers.get('X-Device-Id'), request.headers.get('X-Device-Token')
+    )
+
+
+def _device_id():
+    """Identificador da tela (cabeçalho X-Device-Id), ou o IP se não informado"""
+    return request.headers.get('X-Device-Id') or request.remote_addr
+
+
+def _upload_owner():
+    """Dono dos uploads da sessão atual: None para admin, cliente_id para cliente"""
+    if session.get('admin_logged_in'):
+        return None
+    return session.get('cliente_id')
+
+
+@api_bp.route('/uploads', methods=['POST'])
+@api_auth_required
+def iniciar_upload():
+    """
+    Inicia um upload em partes (resumível)
+    Parâmetros JSON: filename, size, latitude, longitude, radius_km
+    """
+    data = request.get_json(silent=True)
+    if data is None:
+        return jsonify({'error': 'JSON inválido'}), 400
+
+    try:
+        latitude = float(data.get('latitude'))
+        longitude = float(data.get('longitude'))
+        radius_km = float(data.get('radius_km'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Latitude, longitude e raio são obrigatórios'}), 400
+
+    upload, error = UploadService.iniciar_upload(
+        original_filename=data.get('filename'),
+        total_size=data.get('size'),
+        latitude=latitude,
+        longitude=longitude,
+        radius_km=radius_km,
+        cliente_id=_upload_owner()
+    )
+    if not upload:
+        status_code = 413 if error == 'Arquivo muito grande' else 400
+        return jsonify({'error': error}), status_code
+
+    result = upload.to_dict()
+    result['chunk_size'] = current_app.config['UPLOAD_CHUNK_SIZE']
+    return jsonify(result), 201
+
+
+@api_bp.route('/uploads/<upload_id>', methods=['GET'])
+@api_auth_required
+def status_upload(upload_id):
+    """Retorna o progresso do upload (offset para retomar)"""
+    upload = UploadService.get_upload(upload_id, _upload_owner())
+    if not upload:
+        return jsonify({'error': 'Upload não encontrado'}), 404
+
+    result = upload.to_dict()
+    result['chunk_size'] = current_app.config['UPLOAD_CHUNK_SIZE']
+    return jsonify(result)
+
+
+@api_bp.route('/uploads/<upload_id>', methods=['PUT'])
+@api_auth_required
+def enviar_parte(upload_id):
+    """
+    Envia uma parte do arquivo no corpo da requisição (binário)
+    Parâmetros: offset (posição do primeiro byte da parte)
+    """
+    upload = UploadService.get_upload(upload_id, _upload_owner())
+    if not upload:
+        return jsonify({'error': 'Upload não encontrado'}), 404
+
+    offset = request.args.get('offset', type=int)
+    if offset is None:
+        return jsonify({'error': 'Parâmetro offset é obrigatório'}), 400
+
+    success, error = UploadService.receber_parte(upload, offset, request.stream)
+    result = upload.to_dict()
+    if not success:
+        result['error'] = error
+        return jsonify(result), 409
+    return jsonify(result)
+
+
+@api_bp.route('/uploads/<upload_id>/finalizar', methods=['POST'])
+@api_auth_required
+def finalizar_upload(upload_id):
+    """
+    Finaliza o upload e cria o vídeo
+    Parâmetros JSON: sha256 (opcional, conferido com o hash calculado)
+    """
+    upload = UploadService.get_upload(upload_id, _upload_owner())
+    if not upload:
+        return jsonify({'error': 'Upload não encontrado'}), 404
+
+    data = request.get_json(silent=True) or {}
+    video, error = UploadService.finalizar_upload(upload, sha256=data.get('sha256'))
+    if not video:
+        return jsonify({'error': error}), 409
+
+    if video.cliente_id is None:
+        # Vídeos do admin entram direto no ar
+        SystemStatus.update_timestamp()
+
+    return jsonify({'success': True, 'video': video.to_dict()}), 201
+
+
+@api_bp.route('/uploads/<upload_id>', methods=['DELETE'])
+@api_auth_required
+def cancelar_upload(upload_id):
+    """Cancela o upload e remove o arquivo parcial"""
+    upload = UploadService.get_upload(upload_id, _upload_owner())
+    if not upload:
+        return jsonify({'error': 'Upload não encontrado'}), 404
+
+    success, message = UploadService.cancelar_upload(upload)
+    if not success:
+        return jsonify({'error': message}), 500
+    return jsonify({'success': True})
@@ -1,7 +1,9 @@
 """
 Rotas principais do sistema
 """
-from flask import Blueprint, jsonify, render_template
+import os
+
+from flask import Blueprint, current_app, jsonify, render_template, send_from_directory
 
 main_bp = Blueprint('main', __name__)
 
@@ -30,3 +32,19 @@ def index():
 def client_web():
     """Interface web do cliente (visualizador)"""
     return render_template('client.html')
+
+
+@main_bp.route('/client-sw.js')
+def client_service_worker():
+    """
+    Service worker do cliente web: servido na raiz (e não em /static) para
+    que o escopo cubra /client e a API
+    """
+    response = send_from_directory(
+        os.path.join(current_app.static_folder, 'js'),
+        'client-sw.js',
+        mimetype='application/javascript'
+    )
+    # O navegador confere o service worker a cada carga da página
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
@@ -4,5 +4,13 @@ Camada de serviços - Lógica de negócio separada das rotas
 from .video_service import VideoService
 from .cliente_service import ClienteService
 from .auth_service import AuthService
+from .upload_service import UploadService
+from .media_service import MediaService
+from .manifest_service import ManifestService
+from .storage_service import StorageService
+from .consistency_service import ConsistencyService
+from .rollout_service import RolloutService
+from .pacing_service import PacingService
+from .dispositivo_service import DispositivoService
 
-__all__ = ['VideoService', 'ClienteService', 'AuthService']
+__all__ = ['VideoService', 'ClienteService', 'AuthService', 'UploadService', 'MediaService', 'ManifestService', 'StorageService', 'ConsistencyService', 'RolloutService', 'PacingService', 'DispositivoService']
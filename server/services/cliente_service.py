@@ -91,7 +91,7 @@ class ClienteService:
 
         visualizacoes = (
             LogVisualizacao.query.filter_by(video_id=video_id)
-            .order_by(LogVisualizacao.timestamp.desc())
+            .order_by(LogVisualizacao.visualizado_em.desc())
             .limit(100)
             .all()
         )
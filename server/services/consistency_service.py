@@ -0,0 +1,196 @@
+"""
+Verificação de consistência entre o armazenamento e o banco de dados
+
+Compara os arquivos armazenados com os registros de vídeos e variantes e
+aponta:
+    orfaos      -> arquivos sem registro (ocupam espaço, ninguém vê)
+    ausentes    -> registros cujo arquivo não existe (download quebrado)
+    divergentes -> arquivos com tamanho (ou hash, com verificar_hash) diferente
+                   do registrado
+
+A listagem do armazenamento (os.scandir) e a leitura do banco (cursor em
+lotes, sem carregar objetos ORM) rodam em paralelo; o hash dos arquivos
+usa um pool de threads.
+"""
+
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from flask import current_app
+from models import db, Video, VideoVariant, UploadSession
+from .storage_service import StorageService
+
+# Pasta (no armazenamento) para onde os órfãos são movidos
+QUARENTENA_DIR = "_quarentena"
+
+# Linhas lidas por vez do banco
+LOTE_BANCO = 1000
+
+
+class ConsistencyService:
+    """Serviço de verificação e limpeza do armazenamento"""
+
+    @staticmethod
+    def verificar(verificar_hash=False, workers=8, idade_minima=3600):
+        """
+        Compara armazenamento e banco
+
+        Args:
+            verificar_hash: bool - recalcula o SHA-256 dos arquivos com hash registrado
+            workers: int - threads para o cálculo de hash
+            idade_minima: int - segundos; arquivos mais novos não contam como
+                órfãos (podem ser de um upload ainda em andamento)
+
+        Returns:
+            dict: arquivos, registros, bytes, orfaos, ausentes, divergentes
+        """
+        app = current_app._get_current_object()
+        storage = StorageService.get_storage()
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futuro_esperados = executor.submit(
+                ConsistencyService._carregar_esperados, app
+            )
+            encontrados = {}
+            for key, size, mtime in storage.iter_files():
+                if key.split(os.sep, 1)[0] == QUARENTENA_DIR:
+                    continue
+                encontrados[key] = (size, mtime)
+            esperados, em_upload = futuro_esperados.result()
+
+        limite = time.time() - idade_minima
+        orfaos = [
+            {"arquivo": key, "tamanho": size}
+            for key, (size, mtime) in encontrados.items()
+            if key not in esperados and key not in em_upload and mtime < limite
+        ]
+        ausentes = [
+            {"arquivo": key, "registro": registro}
+            for key, (registro, _, _) in esperados.items()
+            if key not in encontrados
+        ]
+
+        divergentes = []
+        para_hash = []
+        for key, (registro, tamanho, content_hash) in esperados.items():
+            if key not in encontrados:
+                continue
+            size = encontrados[key][0]
+            if tamanho is not None and size != tamanho:
+                divergentes.append(
+                    {
+                        "arquivo": key,
+                        "registro": registro,
+                        "motivo": f"tamanho {size} (esperado {tamanho})",
+                    }
+                )
+            elif verificar_hash and content_hash:
+                para_hash.append((key, registro, content_hash))
+
+        if para_hash:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                hashes = executor.map(
+                    lambda item: ConsistencyService._hash(storage, item[0]), para_hash
+                )
+                for (key, registro, content_hash), calculado in zip(para_hash, hashes):
+                    if calculado != content_hash:
+                        divergentes.append(
+                            {"arquivo": key, "registro": registro, "motivo": "hash diferente"}
+                        )
+
+        orfaos.sort(key=lambda item: item["arquivo"])
+        ausentes.sort(key=lambda item: item["arquivo"])
+        divergentes.sort(key=lambda item: item["arquivo"])
+
+        return {
+            "arquivos": len(encontrados),
+            "registros": len(esperados),
+            "bytes": sum(size for size, _ in encontrados.values()),
+            "orfaos": orfaos,
+            "ausentes": ausentes,
+            "divergentes": divergentes,
+        }
+
+    @staticmethod
+    def quarentenar(orfaos):
+        """
+        Move os arquivos órfãos para _quarentena/<data>/ (removê-los de vez
+        fica a cargo do operador, depois de conferir)
+
+        Returns:
+            tuple: (quantidade movida, destino)
+        """
+        storage = StorageService.get_storage()
+        destino = os.path.join(QUARENTENA_DIR, datetime.now().strftime("%Y%m%d_%H%M%S"))
+        movidos = 0
+        for orfao in orfaos:
+            try:
+                storage.move(orfao["arquivo"], os.path.join(destino, orfao["arquivo"]))
+                movidos += 1
+            except Exception as e:
+                current_app.logger.error(
+                    f"Erro ao mover {orfao['arquivo']} para a quarentena: {str(e)}"
+                )
+
+        current_app.logger.info(f"{movidos} arquivo(s) órfão(s) movidos para {destino}")
+        return movidos, destino
+
+    @staticmethod
+    def _carregar_esperados(app):
+        """
+        Arquivos referenciados no banco, lidos em lotes
+
+        Returns:
+            tuple: ({chave: (registro, tamanho, hash)}, {chaves de uploads em andamento})
+        """
+        with app.app_context():
+            esperados = {}
+
+            videos = db.session.execute(
+                db.select(
+                    Video.id,
+                    Video.filename,
+                    Video.file_size,
+                    Video.content_hash,
+                    Video.thumbnail,
+                    Video.preview,
+                    Video.sprite,
+                ).execution_options(yield_per=LOTE_BANCO)
+            )
+            for video_id, filename, size, content_hash, *derivados in videos:
+                registro = f"video {video_id}"
+                esperados[filename] = (registro, size, content_hash)
+                for relpath in derivados:
+                    if relpath:
+                        esperados[relpath] = (registro, None, None)
+
+            variants = db.session.execute(
+                db.select(
+                    VideoVariant.id,
+                    VideoVariant.filename,
+                    VideoVariant.file_size,
+                    VideoVariant.content_hash,
+                ).execution_options(yield_per=LOTE_BANCO)
+            )
+            for variant_id, filename, size, content_hash in variants:
+                esperados[filename] = (f"variante {variant_id}", size, content_hash)
+
+            em_upload = set(db.session.execute(db.select(UploadSession.filename)).scalars())
+            return esperados, em_upload
+
+    @staticmethod
+    def _hash(storage, key):
+        hasher = hashlib.sha256()
+        try:
+            with storage.open(key) as f:
+                while True:
+                    data = f.read(1024 * 1024)
+                    if not data:
+                        break
+                    hasher.update(data)
+        except OSError:
+            return None
+        return hasher.hexdigest()
@@ -0,0 +1,288 @@
+"""
+Registro das telas e telemetria da frota
+
+Cada tela (cliente desktop ou web) se registra uma vez com o seu device_id
+e recebe um token, guardado só como hash no banco. Depois envia, a cada
+HEARTBEAT_INTERVAL, um heartbeat pequeno: versão, hash da playlist, tamanho
+do cache, quadros descartados e última sincronização.
+
+Os heartbeats não são gravados um a um: ficam em um buffer em memória, uma
+entrada por tela (campos do mais recente sobre os anteriores; um campo
+ausente mantém o valor já recebido, como na gravação), e a cada
+HEARTBEAT_FLUSH_INTERVAL o buffer é gravado em uma única transação, com um
+UPDATE por tela. Centenas de telas geram poucas escritas por minuto, e a
+visão da frota no admin lê a tabela de dispositivos.
+"""
+
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import bindparam, func, update
+
+from models import db, Dispositivo
+
+TIPOS = ("desktop", "web")
+# Campos do heartbeat; None mantém o valor anterior da tela
+CAMPOS_HEARTBEAT = (
+    "ultimo_contato",
+    "ip",
+    "versao",
+    "playlist_hash",
+    "cache_bytes",
+    "quadros_descartados",
+    "ultima_sincronizacao",
+)
+
+
+def _hash_token(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class DispositivoService:
+    """Serviço de registro de telas e ingestão de heartbeats"""
+
+    @staticmethod
+    def registrar(device_id, tipo=None, nome=None, latitude=None, longitude=None):
+        """
+        Registra uma tela nova
+
+        Returns:
+            tuple: (token, error) - o token só é devolvido neste momento
+        """
+        device_id = (device_id or "").strip()
+        if not device_id or len(device_id) > 64:
+            return None, "device_id inválido"
+        if Dispositivo.query.filter_by(device_id=device_id).first():
+            return None, "Dispositivo já registrado"
+
+        token = secrets.token_urlsafe(32)
+        try:
+            dispositivo = Dispositivo(
+                device_id=device_id,
+                token_hash=_hash_token(token),
+                tipo=tipo if tipo in TIPOS else None,
+                nome=(nome or "")[:100] or None,
+                latitude=latitude,
+                longitude=longitude,
+            )
+            db.session.add(dispositivo)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Erro ao registrar dispositivo {device_id}: {e}")
+            return None, "Erro ao registrar dispositivo"
+
+        current_app.logger.info(f"Dispositivo registrado: {device_id}")
+        return token, None
+
+    @staticmethod
+    def autenticar(device_id, token):
+        """
+        Confere o token da tela (sem consultar o banco depois da primeira vez)
+
+        Returns:
+            int: id do Dispositivo, ou None se o token não confere
+        """
+        if not device_id or not token:
+            return None
+        buffer = DispositivoService.buffer()
+        registro = buffer.credencial(device_id)
+        if registro is None:
+            dispositivo = Dispositivo.query.filter_by(device_id=device_id).first()
+            if not dispositivo:
+                return None
+            registro = (dispositivo.id, dispositivo.token_hash)
+            buffer.guardar_credencial(device_id, registro)
+        dispositivo_id, token_hash = registro
+        if not hmac.compare_digest(token_hash, _hash_token(token)):
+            return None
+        return dispositivo_id
+
+    @staticmethod
+    def receber_heartbeat(dispositivo_id, dados, ip_address=None):
+        """
+        Guarda o heartbeat no buffer e grava o buffer se o intervalo passou
+
+        Args:
+            dados: dict - versao, playlist, cache_bytes, quadros_descartados
+                e sincronizado_em (epoch), todos opcionais
+        """
+        campos = {
+            "dispositivo_id": dispositivo_id,
+            "ultimo_contato": datetime.utcnow(),
+            "ip": ip_address,
+            "versao": _texto(dados.get("versao"), 20),
+            "playlist_hash": _texto(dados.get("playlist"), 64),
+            "cache_bytes": _inteiro(dados.get("cache_bytes")),
+            "quadros_descartados": _inteiro(dados.get("quadros_descartados")),
+            "ultima_sincronizacao": None,
+        }
+        sincronizado_em = _inteiro(dados.get("sincronizado_em"))
+        if sincronizado_em:
+            try:
+                campos["ultima_sincronizacao"] = datetime.utcfromtimestamp(sincronizado_em)
+            except (OverflowError, OSError, ValueError):
+                pass
+
+        buffer = DispositivoService.buffer()
+        buffer.adicionar(dispositivo_id, campos)
+        if buffer.vencido(current_app.config["HEARTBEAT_FLUSH_INTERVAL"]):
+            DispositivoService.descarregar()
+
+    @staticmethod
+    def descarregar():
+        """
+        Grava os heartbeats acumulados, um UPDATE por tela
+
+        Returns:
+            int: número de telas atualizadas
+        """
+        linhas = DispositivoService.buffer().retirar()
+        if not linhas:
+            return 0
+        tabela = Dispositivo.__table__
+        # Os nomes das colunas são reservados pelo SET: parâmetros com prefixo
+        comando = (
+            update(tabela)
+            .where(tabela.c.id == bindparam("dispositivo_id"))
+            .values(
+                {
+                    campo: func.coalesce(bindparam(f"novo_{campo}"), tabela.c[campo])
+                    for campo in CAMPOS_HEARTBEAT
+                }
+            )
+        )
+        parametros = [
+            dict(
+                {f"novo_{campo}": linha[campo] for campo in CAMPOS_HEARTBEAT},
+                dispositivo_id=linha["dispositivo_id"],
+            )
+            for linha in linhas
+        ]
+        try:
+            # Um único comando executado para todas as linhas (executemany)
+            db.session.execute(comando, parametros)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            # Voltam ao buffer para a próxima gravação (sob os que chegaram depois)
+            DispositivoService.buffer().devolver(linhas)
+            current_app.logger.error(f"Erro ao gravar heartbeats: {e}")
+            return 0
+        return len(linhas)
+
+    @staticmethod
+    def listar():
+        """Telas registradas, com a telemetria mais recente (grava o buffer antes)"""
+        DispositivoService.descarregar()
+        return Dispositivo.query.order_by(Dispositivo.nome, Dispositivo.device_id).all()
+
+    @staticmethod
+    def online(dispositivo, agora=None):
+        """Tela com heartbeat recente (até 3 intervalos de atraso)"""
+        if not dispositivo.ultimo_contato:
+            return False
+        agora = agora or datetime.utcnow()
+        limite = 3 * current_app.config["HEARTBEAT_INTERVAL"]
+        return (agora - dispositivo.ultimo_contato).total_seconds() <= limite
+
+    @staticmethod
+    def remover(dispositivo_id):
+        """
+        Remove a tela do registro (ela pode se registrar de novo e receber
+        outro token)
+
+        Returns:
+            tuple: (success, message)
+        """
+        dispositivo = db.session.get(Dispositivo, dispositivo_id)
+        if not dispositivo:
+            return False, "Dispositivo não encontrado"
+        try:
+            DispositivoService.buffer().esquecer(dispositivo.device_id, dispositivo.id)
+            db.session.delete(dispositivo)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Erro ao remover dispositivo {dispositivo_id}: {e}")
+            return False, "Erro ao remover dispositivo"
+        return True, f"Dispositivo {dispositivo.device_id} removido"
+
+    @staticmethod
+    def buffer():
+        """Buffer de heartbeats e credenciais desta aplicação"""
+        app = current_app._get_current_object()
+        buffer = app.extensions.get("heartbeats")
+        if buffer is None:
+            buffer = app.extensions.setdefault("heartbeats", BufferHeartbeats())
+        return buffer
+
+
+class BufferHeartbeats:
+    """Heartbeats de cada tela ainda não gravados, e tokens já conferidos"""
+
+    def __init__(self):
+        self.pendentes = {}  # id do Dispositivo -> campos do UPDATE
+        self.credenciais = {}  # device_id -> (id, token_hash)
+        self._ultimo_descarregamento = time.monotonic()
+        self._lock = threading.Lock()
+
+    def adicionar(self, dispositivo_id, campos):
+        """Junta o heartbeat à entrada pendente da tela (None mantém o valor anterior)"""
+        with self._lock:
+            pendente = self.pendentes.setdefault(dispositivo_id, {})
+            pendente.update(
+                {campo: valor for campo, valor in campos.items() if valor is not None}
+            )
+            for campo in CAMPOS_HEARTBEAT:
+                pendente.setdefault(campo, None)
+
+    def devolver(self, linhas):
+        """Repõe linhas retiradas cuja gravação falhou; campos mais novos prevalecem"""
+        with self._lock:
+            for linha in linhas:
+                dispositivo_id = linha["dispositivo_id"]
+                pendente = dict(linha)
+                novo = self.pendentes.get(dispositivo_id, {})
+                pendente.update({campo: valor for campo, valor in novo.items() if valor is not None})
+                self.pendentes[dispositivo_id] = pendente
+
+    def vencido(self, intervalo):
+        with self._lock:
+            return time.monotonic() - self._ultimo_descarregamento >= intervalo
+
+    def retirar(self):
+        with self._lock:
+            linhas = list(self.pendentes.values())
+            self.pendentes = {}
+            self._ultimo_descarregamento = time.monotonic()
+        return linhas
+
+    def credencial(self, device_id):
+        with self._lock:
+            return self.credenciais.get(device_id)
+
+    def guardar_credencial(self, device_id, registro):
+        with self._lock:
+            self.credenciais[device_id] = registro
+
+    def esquecer(self, device_id, dispositivo_id):
+        with self._lock:
+            self.credenciais.pop(device_id, None)
+            self.pendentes.pop(dispositivo_id, None)
+
+
+def _texto(valor, tamanho):
+    return str(valor)[:tamanho] if valor is not None else None
+
+
+def _inteiro(valor):
+    try:
+        return max(0, int(valor))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,92 @@
+"""
+Serviço de manifest de chunks para downloads verificáveis
+
+O manifest divide o arquivo em blocos de tamanho fixo e publica o SHA-256
+de cada bloco e do arquivo inteiro. Os clientes baixam os blocos em paralelo
+com HTTP Range, conferem cada um e só então montam o arquivo final.
+"""
+
+import hashlib
+import json
+
+from flask import current_app
+from models import db
+from .storage_service import StorageService
+
+
+class ManifestService:
+    """Serviço para manifests de chunks de vídeos e variantes"""
+
+    @staticmethod
+    def gerar_manifest(f, chunk_size):
+        """
+        Calcula o hash de cada bloco e do arquivo inteiro em uma única leitura
+
+        Args:
+            f: arquivo aberto para leitura binária (local ou do object store)
+            chunk_size: int
+
+        Returns:
+            dict: size, chunk_size, sha256, chunks
+        """
+        file_hasher = hashlib.sha256()
+        chunks = []
+        size = 0
+        while True:
+            data = _read_exact(f, chunk_size)
+            if not data:
+                break
+            file_hasher.update(data)
+            chunks.append(hashlib.sha256(data).hexdigest())
+            size += len(data)
+
+        return {
+            "size": size,
+            "chunk_size": chunk_size,
+            "sha256": file_hasher.hexdigest(),
+            "chunks": chunks,
+        }
+
+    @staticmethod
+    def get_manifest(item):
+        """
+        Retorna o manifest de um Video ou VideoVariant, gerando e guardando
+        no banco se ainda não existir (ou se o tamanho de bloco mudou)
+
+        Returns:
+            dict or None (arquivo não encontrado)
+        """
+        chunk_size = current_app.config["MANIFEST_CHUNK_SIZE"]
+        if item.manifest:
+            manifest = json.loads(item.manifest)
+            if manifest.get("chunk_size") == chunk_size:
+                return manifest
+
+        storage = StorageService.get_storage()
+        if not storage.exists(item.filename):
+            return None
+
+        with storage.open(item.filename) as f:
+            manifest = ManifestService.gerar_manifest(f, chunk_size)
+        item.manifest = json.dumps(manifest)
+        if not item.content_hash:
+            item.content_hash = manifest["sha256"]
+            item.file_size = manifest["size"]
+        db.session.commit()
+
+        current_app.logger.info(
+            f"Manifest gerado para {item.filename}: {len(manifest['chunks'])} blocos"
+        )
+        return manifest
+
+
+def _read_exact(f, size):
+    """Lê `size` bytes (streams de rede podem devolver menos por leitura)"""
+    partes = []
+    while size > 0:
+        data = f.read(size)
+        if not data:
+            break
+        partes.append(data)
+        size -= len(data)
+    return b"".join(partes)
@@ -0,0 +1,575 @@
+"""
+Serviço de processamento de mídia (probe, thumbnails e validação)
+
+Cada upload é enviado para um pool de threads em segundo plano, então a
+requisição de upload nunca espera pela análise do vídeo. O resultado fica
+gravado no próprio registro do vídeo (media_status, duracao, fps, ...).
+
+Os derivados de um vídeo válido (proxy de revisão, sprite e variantes do
+transcode) saem de um segundo pool (TRANSCODE_WORKERS): um transcode longo
+não atrasa a análise dos uploads seguintes.
+"""
+
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from models import db, Video, VideoVariant
+from utils.files import hash_file
+from .manifest_service import ManifestService
+from .storage_service import StorageService
+
+# OpenCV é opcional no servidor: sem ele o processamento é ignorado
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+MEDIA_PENDENTE = "pendente"
+MEDIA_PROCESSANDO = "processando"
+MEDIA_OK = "ok"
+MEDIA_INVALIDO = "invalido"
+MEDIA_INDISPONIVEL = "indisponivel"
+
+# nome do pool ("media", "transcode") -> ThreadPoolExecutor
+_executors = {}
+_executor_lock = threading.Lock()
+
+
+class MediaService:
+    """Serviço para análise de vídeos enviados"""
+
+    @staticmethod
+    def agendar_processamento(video_id):
+        """
+        Agenda o processamento do vídeo no pool em segundo plano
+
+        Returns:
+            Future or None (pipeline desabilitado)
+        """
+        app = current_app._get_current_object()
+        if not app.config.get("MEDIA_PIPELINE_ENABLED", True):
+            return None
+
+        executor = MediaService._get_executor("media", app.config.get("MEDIA_WORKERS", 2))
+        return executor.submit(MediaService._processar_em_contexto, app, video_id)
+
+    @staticmethod
+    def agendar_derivados(video_id):
+        """
+        Agenda o preview e o transcode do vídeo no pool de transcode
+
+        Returns:
+            Future or None (pipeline desabilitado)
+        """
+        app = current_app._get_current_object()
+        if not app.config.get("MEDIA_PIPELINE_ENABLED", True):
+            return None
+
+        executor = MediaService._get_executor(
+            "transcode", app.config.get("TRANSCODE_WORKERS", 1)
+        )
+        return executor.submit(MediaService._derivados_em_contexto, app, video_id)
+
+    @staticmethod
+    def processar_video(video_id):
+        """
+        Analisa o arquivo do vídeo e grava os metadados no banco
+
+        Returns:
+            str: media_status final
+        """
+        video = db.session.get(Video, video_id)
+        if not video:
+            return None
+
+        if cv2 is None:
+            video.media_status = MEDIA_INDISPONIVEL
+            video.media_erro = "OpenCV não instalado no servidor"
+            db.session.commit()
+            return video.media_status
+
+        video.media_status = MEDIA_PROCESSANDO
+        db.session.commit()
+
+        storage = StorageService.get_storage()
+        if not storage.exists(video.filename):
+            video.media_status = MEDIA_INVALIDO
+            video.media_erro = "Arquivo não encontrado"
+            db.session.commit()
+            return video.media_status
+
+        # Com armazenamento remoto, o vídeo é baixado uma vez para todas as etapas
+        with storage.local_file(video.filename) as filepath:
+            info = MediaService.probe(filepath)
+
+            video.duracao = info.get("duracao")
+            video.fps = info.get("fps")
+            video.largura = info.get("largura")
+            video.altura = info.get("altura")
+            video.total_frames = info.get("total_frames")
+
+            erro = info.get("erro") or MediaService.validar_metadados(info)
+            if erro:
+                video.media_status = MEDIA_INVALIDO
+                video.media_erro = erro
+            else:
+                thumbnail = MediaService.thumbnail_filename(video.filename)
+                with storage.output_file(thumbnail) as thumbnail_path:
+                    frames = MediaService.extrair_thumbnails(
+                        filepath,
+                        thumbnail_path,
+                        quantidade=current_app.config.get("THUMBNAIL_COUNT", 5),
+                        altura=current_app.config.get("THUMBNAIL_HEIGHT", 90),
+                        total_frames=video.total_frames,
+                    )
+                if frames:
+                    video.thumbnail = thumbnail
+                video.media_status = MEDIA_OK
+                video.media_erro = None
+
+            db.session.commit()
+            current_app.logger.info(
+                f"Mídia do vídeo {video.filename} processada: {video.media_status}"
+                f" ({video.largura}x{video.altura} @ {video.fps} fps, {video.duracao} s)"
+            )
+
+            # Pipeline desabilitado (processamento chamado diretamente): os
+            # derivados são gerados aqui mesmo, com o arquivo já local
+            if video.media_status == MEDIA_OK and MediaService.agendar_derivados(video.id) is None:
+                MediaService.gerar_derivados(video, filepath)
+
+        # Manifests prontos antes do primeiro download das telas
+        if video.media_status == MEDIA_OK:
+            for item in [video] + list(video.variants):
+                ManifestService.get_manifest(item)
+        return video.media_status
+
+    @staticmethod
+    def gerar_derivados(video, origem=None):
+        """
+        Gera o preview de revisão (PREVIEW_ENABLED) e as variantes do
+        transcode (TRANSCODE_ENABLED), com os manifests das variantes
+
+        Args:
+            video: Video
+            origem: str (opcional) - caminho local do original, se já disponível
+        """
+        config = current_app.config
+        if not (config.get("PREVIEW_ENABLED", True) or config.get("TRANSCODE_ENABLED")):
+            return
+        if origem is None:
+            with StorageService.get_storage().local_file(video.filename) as origem:
+                return MediaService.gerar_derivados(video, origem)
+
+        if config.get("PREVIEW_ENABLED", True):
+            MediaService.gerar_preview(video, origem)
+            db.session.commit()
+        if config.get("TRANSCODE_ENABLED"):
+            for variant in MediaService.transcodificar(video, origem):
+                ManifestService.get_manifest(variant)
+
+    @staticmethod
+    def probe(filepath, amostras=5):
+        """
+        Lê duração, fps, resolução e número de frames e verifica se o
+        arquivo decodifica em vários pontos (início, meio e fim)
+
+        Returns:
+            dict: duracao, fps, largura, altura, total_frames e erro (se houver)
+        """
+        if not os.path.exists(filepath):
+            return {"erro": "Arquivo não encontrado"}
+
+        cap = cv2.VideoCapture(filepath)
+        try:
+            if not cap.isOpened():
+                return {"erro": "Arquivo não pôde ser aberto como vídeo"}
+
+            fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+            largura = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            altura = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+            if total_frames <= 0:
+                # Alguns containers não informam o total: contar decodificando
+                total_frames = 0
+                while cap.grab():
+                    total_frames += 1
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+            info = {
+                "fps": round(fps, 3) if fps else None,
+                "largura": largura,
+                "altura": altura,
+                "total_frames": total_frames,
+                "duracao": round(total_frames / fps, 3) if fps else None,
+            }
+
+            if total_frames <= 0:
+                info["erro"] = "Vídeo sem frames decodificáveis"
+                return info
+
+            for posicao in MediaService._posicoes_amostra(total_frames, amostras):
+                cap.set(cv2.CAP_PROP_POS_FRAMES, posicao)
+                ret, frame = cap.read()
+                if not ret or frame is None:
+                    info["erro"] = f"Falha ao decodificar o frame {posicao}"
+                    break
+
+            return info
+        finally:
+            cap.release()
+
+    @staticmethod
+    def validar_metadados(info):
+        """
+        Confere os metadados contra os limites configurados
+
+        Returns:
+            str or None: mensagem de erro
+        """
+        config = current_app.config
+        if not info.get("fps"):
+            return "FPS não informado pelo arquivo"
+        if info.get("largura", 0) > config.get("MEDIA_MAX_WIDTH", 3840) or info.get(
+            "altura", 0
+        ) > config.get("MEDIA_MAX_HEIGHT", 2160):
+            return (
+                f"Resolução {info['largura']}x{info['altura']} acima do máximo "
+                f"{config.get('MEDIA_MAX_WIDTH', 3840)}x{config.get('MEDIA_MAX_HEIGHT', 2160)}"
+            )
+        if info["fps"] > config.get("MEDIA_MAX_FPS", 60):
+            return f"FPS {info['fps']} acima do máximo {config.get('MEDIA_MAX_FPS', 60)}"
+        max_duracao = config.get("MEDIA_MAX_DURATION", 0)
+        if max_duracao and (info.get("duracao") or 0) > max_duracao:
+            return f"Duração {info['duracao']} s acima do máximo {max_duracao} s"
+        return None
+
+    @staticmethod
+    def extrair_thumbnails(
+        filepath, destino, quantidade=5, altura=90, colunas=None, total_frames=None
+    ):
+        """
+        Gera uma imagem com `quantidade` frames igualmente espaçados: uma tira
+        horizontal ou, com `colunas`, uma grade (sprite) lida da esquerda para
+        a direita, de cima para baixo
+
+        Args:
+            total_frames: int (opcional) - total medido pelo probe, para
+                containers que não informam CAP_PROP_FRAME_COUNT
+
+        Returns:
+            int: número de frames na imagem (0 se falhou)
+        """
+        cap = cv2.VideoCapture(filepath)
+        try:
+            if not total_frames:
+                total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            frames = []
+            for posicao in MediaService._posicoes_amostra(total_frames, quantidade):
+                cap.set(cv2.CAP_PROP_POS_FRAMES, posicao)
+                ret, frame = cap.read()
+                if not ret:
+                    continue
+                h, w = frame.shape[:2]
+                largura = max(1, int(w * altura / h))
+                frames.append(
+                    cv2.resize(frame, (largura, altura), interpolation=cv2.INTER_AREA)
+                )
+        finally:
+            cap.release()
+
+        if not frames:
+            return 0
+
+        if colunas:
+            # Completar a última linha da grade com tiles pretos
+            vazio = frames[0] * 0
+            linhas = [
+                cv2.hconcat(
+                    frames[i:i + colunas] + [vazio] * (colunas - len(frames[i:i + colunas]))
+                )
+                for i in range(0, len(frames), colunas)
+            ]
+            imagem = cv2.vconcat(linhas)
+        else:
+            imagem = cv2.hconcat(frames)
+
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        if not cv2.imwrite(destino, imagem):
+            return 0
+        return len(frames)
+
+    @staticmethod
+    def gerar_preview(video, filepath):
+        """
+        Gera o proxy de revisão (baixa resolução) e o sprite de thumbnails
+        usados pelo admin para aprovar o vídeo sem baixar o original
+        """
+        config = current_app.config
+        storage = StorageService.get_storage()
+        base = os.path.splitext(video.filename)[0]
+
+        sprite = os.path.join("sprites", f"{base}.jpg")
+        with storage.output_file(sprite) as destino:
+            frames = MediaService.extrair_thumbnails(
+                filepath,
+                destino,
+                quantidade=config.get("SPRITE_FRAMES", 20),
+                altura=config.get("SPRITE_TILE_HEIGHT", 90),
+                colunas=config.get("SPRITE_COLUMNS", 5),
+                total_frames=video.total_frames,
+            )
+        if frames:
+            video.sprite = sprite
+            video.sprite_frames = frames
+
+        preview = os.path.join("previews", f"{base}.mp4")
+        try:
+            degraus = MediaService.parse_ladder(config.get("PREVIEW_PROXY"))
+            if not degraus:
+                return  # PREVIEW_PROXY vazio: só o sprite
+            degrau = degraus[0]
+            with storage.output_file(preview) as destino:
+                MediaService._transcodificar_arquivo(
+                    filepath, destino, degrau, fps_origem=video.fps
+                )
+            video.preview = preview
+        except Exception as e:
+            current_app.logger.error(
+                f"Erro ao gerar preview do vídeo {video.filename}: {str(e)}"
+            )
+
+    @staticmethod
+    def parse_ladder(ladder):
+        """
+        Interpreta a escada de transcode "label:LxA@FPS:KBPS,..."
+
+        Returns:
+            list: dicts com label, largura, altura, fps, bitrate_kbps
+        """
+        degraus = []
+        for item in (ladder or "").split(","):
+            item = item.strip()
+            if not item:
+                continue
+            try:
+                label, resolucao, bitrate = item.split(":")
+                dimensoes, _, fps = resolucao.partition("@")
+                largura, altura = dimensoes.lower().split("x")
+                degraus.append(
+                    {
+                        "label": label,
+                        "largura": int(largura),
+                        "altura": int(altura),
+                        "fps": float(fps) if fps else None,
+                        "bitrate_kbps": int(bitrate) if bitrate else None,
+                    }
+                )
+            except ValueError:
+                raise ValueError(f"Degrau de transcode inválido: {item!r}")
+        return degraus
+
+    @staticmethod
+    def transcodificar(video, origem=None):
+        """
+        Gera as variantes normalizadas do vídeo (sem aumentar a resolução)
+
+        Args:
+            video: Video
+            origem: str (opcional) - caminho local do original, se já disponível
+
+        Returns:
+            list: VideoVariant criadas
+        """
+        storage = StorageService.get_storage()
+        if origem is None:
+            with storage.local_file(video.filename) as origem:
+                return MediaService.transcodificar(video, origem)
+
+        existentes = {variant.label for variant in video.variants}
+        criadas = []
+
+        for degrau in MediaService.parse_ladder(current_app.config["TRANSCODE_LADDER"]):
+            if degrau["label"] in existentes:
+                continue
+            if video.altura and video.largura and (
+                degrau["altura"] >= video.altura and degrau["largura"] >= video.largura
+            ):
+                continue  # O original já cabe neste degrau
+
+            relpath = MediaService.variant_filename(video.filename, degrau["label"])
+            try:
+                with storage.output_file(relpath) as destino:
+                    largura, altura = MediaService._transcodificar_arquivo(
+                        origem, destino, degrau, fps_origem=video.fps
+                    )
+                    file_size = os.path.getsize(destino)
+                    content_hash = hash_file(destino).hexdigest()
+            except Exception as e:
+                current_app.logger.error(
+                    f"Erro no transcode {degrau['label']} do vídeo {video.filename}: {str(e)}"
+                )
+                continue
+
+            variant = VideoVariant(
+                video_id=video.id,
+                label=degrau["label"],
+                filename=relpath,
+                largura=largura,
+                altura=altura,
+                fps=degrau["fps"] or video.fps,
+                bitrate_kbps=degrau["bitrate_kbps"],
+                file_size=file_size,
+                content_hash=content_hash,
+            )
+            db.session.add(variant)
+            db.session.commit()
+            criadas.append(variant)
+            current_app.logger.info(
+                f"Variante {variant.label} ({largura}x{altura}) gerada para {video.filename}"
+            )
+
+        return criadas
+
+    @staticmethod
+    def variant_filename(filename, label):
+        """Chave (caminho relativo no armazenamento) de uma variante"""
+        return os.path.join("variants", f"{os.path.splitext(filename)[0]}_{label}.mp4")
+
+    @staticmethod
+    def _dimensoes_alvo(largura, altura, max_largura, max_altura):
+        """Escala preservando a proporção, com dimensões pares (exigência do H.264)"""
+        escala = min(max_largura / largura, max_altura / altura, 1.0)
+        return (
+            max(2, int(largura * escala) // 2 * 2),
+            max(2, int(altura * escala) // 2 * 2),
+        )
+
+    @staticmethod
+    def _transcodificar_arquivo(origem, destino, degrau, fps_origem=None):
+        """
+        Transcodifica com ffmpeg (se disponível) ou OpenCV
+
+        Returns:
+            tuple: (largura, altura) do arquivo gerado
+        """
+        cap = cv2.VideoCapture(origem)
+        largura_origem = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        altura_origem = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps_origem = fps_origem or cap.get(cv2.CAP_PROP_FPS) or 30.0
+        largura, altura = MediaService._dimensoes_alvo(
+            largura_origem, altura_origem, degrau["largura"], degrau["altura"]
+        )
+        fps = min(degrau["fps"] or fps_origem, fps_origem)
+
+        ffmpeg = shutil.which(current_app.config.get("TRANSCODE_FFMPEG", "ffmpeg"))
+        if ffmpeg:
+            cap.release()
+            comando = [
+                ffmpeg, "-y", "-loglevel", "error", "-i", origem,
+                "-vf", f"scale={largura}:{altura}",
+                "-r", f"{fps:g}",
+                "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p",
+                "-movflags", "+faststart",
+                "-c:a", "aac", "-b:a", "128k",
+            ]
+            if degrau["bitrate_kbps"]:
+                kbps = degrau["bitrate_kbps"]
+                comando += ["-b:v", f"{kbps}k", "-maxrate", f"{kbps}k", "-bufsize", f"{kbps * 2}k"]
+            subprocess.run(comando + [destino], check=True, capture_output=True)
+            return largura, altura
+
+        # Fallback OpenCV: reduz resolução e descarta frames para atingir o fps alvo.
+        # H.264 (avc1) toca no navegador; mp4v é o último recurso.
+        for fourcc in ("avc1", "mp4v"):
+            writer = cv2.VideoWriter(
+                destino, cv2.VideoWriter_fourcc(*fourcc), fps, (largura, altura)
+            )
+            if writer.isOpened():
+                break
+            writer.release()
+        try:
+            if not writer.isOpened():
+                raise RuntimeError("cv2.VideoWriter não pôde ser aberto")
+            passo = fps_origem / fps
+            proximo = 0.0
+            indice = 0
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                if indice >= proximo:
+                    writer.write(
+                        cv2.resize(frame, (largura, altura), interpolation=cv2.INTER_AREA)
+                    )
+                    proximo += passo
+                indice += 1
+        finally:
+            writer.release()
+            cap.release()
+        return largura, altura
+
+    @staticmethod
+    def thumbnail_filename(filename):
+        """Chave (caminho relativo no armazenamento) da tira de thumbnails"""
+        return os.path.join("thumbnails", f"{os.path.splitext(filename)[0]}.jpg")
+
+    @staticmethod
+    def _posicoes_amostra(total_frames, quantidade):
+        if total_frames <= 0 or quantidade <= 0:
+            return []
+        if quantidade == 1 or total_frames == 1:
+            return [0]
+        ultimo = total_frames - 1
+        return sorted({round(i * ultimo / (quantidade - 1)) for i in range(quantidade)})
+
+    @staticmethod
+    def _processar_em_contexto(app, video_id):
+        with app.app_context():
+            try:
+                return MediaService.processar_video(video_id)
+            except Exception as e:
+                db.session.rollback()
+                app.logger.error(
+                    f"Erro ao processar mídia do vídeo {video_id}: {str(e)}",
+                    exc_info=True,
+                )
+                video = db.session.get(Video, video_id)
+                if video:
+                    video.media_status = MEDIA_INVALIDO
+                    video.media_erro = f"Erro no processamento: {str(e)}"[:255]
+                    db.session.commit()
+                return MEDIA_INVALIDO
+            finally:
+                db.session.remove()
+
+    @staticmethod
+    def _derivados_em_contexto(app, video_id):
+        with app.app_context():
+            try:
+                video = db.session.get(Video, video_id)
+                if video and video.media_status == MEDIA_OK:
+                    MediaService.gerar_derivados(video)
+            except Exception as e:
+                # O vídeo continua válido: só os derivados ficaram faltando
+                db.session.rollback()
+                app.logger.error(
+                    f"Erro ao gerar derivados do vídeo {video_id}: {str(e)}",
+                    exc_info=True,
+                )
+            finally:
+                db.session.remove()
+
+    @staticmethod
+    def _get_executor(nome, workers):
+        with _executor_lock:
+            if nome not in _executors:
+                _executors[nome] = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix=nome
+                )
+            return _executors[nome]
@@ -0,0 +1,50 @@
+"""
+Peso e ritmo de exibição dos vídeos
+
+Os créditos restantes de cada vídeo precisam ser consumidos até o fim da
+campanha (fim_em). A meta de ritmo é essa razão, em exibições por hora
+somando todas as telas; campanhas sem fim usam PACING_HORIZON_HOURS como
+prazo. O peso enviado às telas é a meta relativa à maior da lista, com um
+mínimo (PACING_MIN_WEIGHT) para que orçamentos pequenos ainda apareçam.
+
+As telas escalonam a playlist localmente com esses pesos (round-robin
+ponderado suave), sem consultar o servidor a cada exibição.
+"""
+
+from datetime import datetime
+
+from flask import current_app
+
+
+class PacingService:
+    """Serviço de peso e ritmo de exibição"""
+
+    @staticmethod
+    def calcular(videos, agora=None):
+        """
+        Calcula o peso e a meta de ritmo de cada vídeo
+
+        Returns:
+            dict: {video_id: {"peso": float (0..1], "meta_hora": float}}
+        """
+        horizonte = current_app.config["PACING_HORIZON_HOURS"]
+        minimo = current_app.config["PACING_MIN_WEIGHT"]
+        agora = agora or datetime.utcnow()
+
+        metas = {}
+        for video in videos:
+            if video.fim_em:
+                # Menos de uma hora para o fim: não deixar a meta explodir
+                horas = max((video.fim_em - agora).total_seconds() / 3600, 1.0)
+            else:
+                horas = horizonte
+            metas[video.id] = max(video.creditos, 0) / horas
+
+        maior = max(metas.values(), default=0)
+        return {
+            video_id: {
+                "peso": round(max(meta / maior, minimo), 4) if maior else 1.0,
+                "meta_hora": round(meta, 2),
+            }
+            for video_id, meta in metas.items()
+        }
@@ -0,0 +1,99 @@
+"""
+Liberação escalonada de vídeos novos e limite de downloads simultâneos
+
+Quando um vídeo é aprovado, todas as telas da região o veriam na próxima
+consulta e baixariam ao mesmo tempo. Em vez disso, cada tela recebe um
+atraso determinístico (hash do id da tela + id do vídeo) dentro da janela
+ROLLOUT_WINDOW: a mesma tela sempre cai no mesmo ponto da janela e as telas
+ficam espalhadas de maneira uniforme.
+
+Além disso, o servidor atende no máximo DOWNLOAD_MAX_CONCURRENT downloads
+ao mesmo tempo; os excedentes recebem 503 com Retry-After.
+"""
+
+import hashlib
+import random
+import threading
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+
+class RolloutService:
+    """Serviço de liberação escalonada e controle de downloads"""
+
+    @staticmethod
+    def atraso(device_id, video_id, janela):
+        """
+        Atraso determinístico (segundos, entre 0 e `janela`) da tela para o vídeo
+        """
+        if not janela or not device_id:
+            return 0.0
+        digest = hashlib.sha256(f"{device_id}:{video_id}".encode()).digest()
+        return int.from_bytes(digest[:8], "big") / 2 ** 64 * janela
+
+    @staticmethod
+    def filtrar_liberados(videos, device_id, agora=None):
+        """
+        Separa os vídeos já liberados para a tela
+
+        Returns:
+            tuple: (vídeos liberados, segundos até a próxima liberação ou None)
+        """
+        janela = current_app.config.get("ROLLOUT_WINDOW", 0)
+        agora = agora or datetime.utcnow()
+        liberados = []
+        proxima = None
+
+        for video in videos:
+            if not janela or not video.liberado_em:
+                liberados.append(video)
+                continue
+            disponivel_em = video.liberado_em + timedelta(
+                seconds=RolloutService.atraso(device_id, video.id, janela)
+            )
+            if disponivel_em <= agora:
+                liberados.append(video)
+            else:
+                espera = (disponivel_em - agora).total_seconds()
+                proxima = espera if proxima is None else min(proxima, espera)
+
+        return liberados, proxima
+
+    @staticmethod
+    def download_slots():
+        """Contador de downloads em andamento desta aplicação"""
+        app = current_app._get_current_object()
+        slots = app.extensions.get("download_slots")
+        if slots is None:
+            slots = app.extensions.setdefault(
+                "download_slots",
+                DownloadSlots(app.config.get("DOWNLOAD_MAX_CONCURRENT", 0)),
+            )
+        return slots
+
+    @staticmethod
+    def retry_after():
+        """Espera sugerida a um cliente recusado, com jitter para não sincronizar retentativas"""
+        base = current_app.config.get("DOWNLOAD_RETRY_AFTER", 15)
+        return random.randint(base, base * 2)
+
+
+class DownloadSlots:
+    """Limite de downloads simultâneos (0 = sem limite)"""
+
+    def __init__(self, limite):
+        self.limite = limite
+        self.ativos = 0
+        self._lock = threading.Lock()
+
+    def adquirir(self):
+        with self._lock:
+            if self.limite and self.ativos >= self.limite:
+                return False
+            self.ativos += 1
+            return True
+
+    def liberar(self):
+        with self._lock:
+            self.ativos = max(0, self.ativos - 1)
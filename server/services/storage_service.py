@@ -0,0 +1,406 @@
+"""
+Armazenamento dos arquivos de vídeo (disco local ou object store S3)
+
+Os arquivos são identificados por chaves relativas, as mesmas gravadas no
+banco (ex: "20251107_174432_video.mp4", "variants/..._720p.mp4"). O backend
+é escolhido por STORAGE_BACKEND:
+
+    local -> diretório UPLOAD_FOLDER (padrão, um único servidor)
+    s3    -> bucket S3 ou compatível (MinIO, Ceph, R2...), permite vários
+             servidores; downloads redirecionam para uma URL pré-assinada
+
+O processamento com OpenCV precisa de arquivos locais: local_file() e
+output_file() dão um caminho no disco e, no S3, fazem o download/upload.
+"""
+
+import mimetypes
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+from flask import Response, current_app, redirect, request, send_from_directory
+from utils.files import BUFFER_SIZE, stream_to_file
+
+# boto3 é opcional: só é necessário com STORAGE_BACKEND=s3
+try:
+    import boto3
+    from botocore.config import Config as BotoConfig
+    from botocore.exceptions import ClientError
+except ImportError:
+    boto3 = None
+
+_s3_lock = threading.Lock()
+
+
+class StorageError(Exception):
+    """Erro de configuração ou acesso ao armazenamento"""
+
+
+class StorageBackend(ABC):
+    """Interface comum dos backends de armazenamento"""
+
+    @abstractmethod
+    def exists(self, key):
+        pass
+
+    @abstractmethod
+    def size(self, key):
+        pass
+
+    @abstractmethod
+    def open(self, key):
+        """Arquivo (somente leitura, binário) com o conteúdo da chave"""
+
+    def read_range(self, key, start, end, buffer_size=BUFFER_SIZE):
+        """Gera os bytes de start a end (inclusive)"""
+        restante = end - start + 1
+        with self.open(key) as f:
+            f.seek(start)
+            while restante > 0:
+                data = f.read(min(buffer_size, restante))
+                if not data:
+                    break
+                restante -= len(data)
+                yield data
+
+    @abstractmethod
+    def save(self, key, stream, hasher=None):
+        """
+        Grava o conteúdo de um stream, atualizando o hash durante a cópia
+
+        Returns:
+            int: bytes gravados
+        """
+
+    @abstractmethod
+    def put_file(self, key, path):
+        """Move um arquivo local para o armazenamento"""
+
+    @abstractmethod
+    def delete(self, key):
+        pass
+
+    @abstractmethod
+    def move(self, key, new_key):
+        pass
+
+    @abstractmethod
+    def iter_files(self):
+        """Gera (chave, tamanho, mtime) de todos os arquivos armazenados"""
+
+    def url(self, key, download_name=None):
+        """URL direta (pré-assinada) para o arquivo, se o backend suportar"""
+        return None
+
+    @contextmanager
+    def local_file(self, key):
+        """Caminho local com o conteúdo da chave (cópia temporária se remoto)"""
+        tmpdir = tempfile.mkdtemp(prefix="storage-")
+        path = os.path.join(tmpdir, os.path.basename(key))
+        try:
+            with self.open(key) as src, open(path, "wb") as dst:
+                stream_to_file(src, dst)
+            yield path
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    @contextmanager
+    def output_file(self, key):
+        """
+        Caminho local para gerar um arquivo; ao sair sem erro, o arquivo (se
+        tiver sido criado) é gravado na chave. Mantém a extensão, que o
+        cv2.VideoWriter usa para escolher o container.
+        """
+        tmpdir = tempfile.mkdtemp(prefix="storage-")
+        path = os.path.join(tmpdir, os.path.basename(key))
+        try:
+            yield path
+            if os.path.exists(path):
+                self.put_file(key, path)
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    def send(self, key, download_name=None, max_age=None):
+        """
+        Resposta HTTP com o arquivo: redireciona para a URL direta se houver,
+        senão transmite o conteúdo respeitando o cabeçalho Range
+        """
+        url = self.url(key, download_name)
+        if url:
+            return redirect(url)
+
+        if not self.exists(key):
+            return Response("Arquivo não encontrado", status=404)
+
+        size = self.size(key)
+        mimetype = mimetypes.guess_type(key)[0] or "application/octet-stream"
+        start, end, status = 0, size - 1, 200
+
+        if request.range:
+            intervalo = request.range.range_for_length(size)
+            if intervalo is None:
+                response = Response(status=416)
+                response.headers["Content-Range"] = f"bytes */{size}"
+                return response
+            start, end, status = intervalo[0], intervalo[1] - 1, 206
+
+        corpo = self.read_range(key, start, end) if size else iter(())
+        response = Response(corpo, status=status, mimetype=mimetype, direct_passthrough=True)
+        response.content_length = end - start + 1
+        response.accept_ranges = "bytes"
+        if status == 206:
+            response.headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        if download_name:
+            response.headers.set("Content-Disposition", "attachment", filename=download_name)
+        if max_age is not None:
+            response.cache_control.max_age = max_age
+        return response
+
+
+class LocalStorage(StorageBackend):
+    """Arquivos em um diretório do servidor"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, key):
+        return os.path.join(self.root, key)
+
+    def exists(self, key):
+        return os.path.isfile(self.path(key))
+
+    def size(self, key):
+        return os.path.getsize(self.path(key))
+
+    def open(self, key):
+        return open(self.path(key), "rb")
+
+    def save(self, key, stream, hasher=None):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            return stream_to_file(stream, f, hasher)
+
+    def put_file(self, key, path):
+        destino = self.path(key)
+        if os.path.abspath(path) == os.path.abspath(destino):
+            return  # Já está no lugar (ex: upload em partes)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        shutil.move(path, destino)
+
+    def delete(self, key):
+        if os.path.exists(self.path(key)):
+            os.remove(self.path(key))
+
+    def move(self, key, new_key):
+        os.makedirs(os.path.dirname(self.path(new_key)), exist_ok=True)
+        os.replace(self.path(key), self.path(new_key))
+
+    def iter_files(self):
+        # os.scandir reaproveita os dados do diretório: sem stat extra por
+        # arquivo no Windows e sem listas gigantes em memória
+        pendentes = [""]
+        while pendentes:
+            prefixo = pendentes.pop()
+            try:
+                entradas = os.scandir(os.path.join(self.root, prefixo))
+            except FileNotFoundError:
+                continue
+            with entradas:
+                for entry in entradas:
+                    key = os.path.join(prefixo, entry.name) if prefixo else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        pendentes.append(key)
+                    elif entry.is_file(follow_symlinks=False):
+                        stat = entry.stat(follow_symlinks=False)
+                        yield key, stat.st_size, stat.st_mtime
+
+    @contextmanager
+    def local_file(self, key):
+        yield self.path(key)
+
+    @contextmanager
+    def output_file(self, key):
+        # Temporário na mesma pasta: o rename final é atômico
+        destino = self.path(key)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        base, ext = os.path.splitext(destino)
+        path = f"{base}.{uuid.uuid4().hex[:8]}.tmp{ext}"
+        try:
+            yield path
+            if os.path.exists(path):
+                os.replace(path, destino)
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def send(self, key, download_name=None, max_age=None):
+        return send_from_directory(
+            self.root,
+            key,
+            as_attachment=download_name is not None,
+            download_name=download_name,
+            conditional=True,
+            max_age=max_age,
+        )
+
+
+class S3Storage(StorageBackend):
+    """Arquivos em um bucket S3 ou compatível (MinIO etc.)"""
+
+    def __init__(
+        self,
+        bucket,
+        endpoint_url=None,
+        region=None,
+        access_key=None,
+        secret_key=None,
+        prefix="",
+        redirect=True,
+        url_expires=3600,
+    ):
+        if boto3 is None:
+            raise StorageError("boto3 não instalado (necessário para STORAGE_BACKEND=s3)")
+        if not bucket:
+            raise StorageError("S3_BUCKET não configurado")
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.redirect = redirect
+        self.url_expires = url_expires
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url or None,
+            region_name=region or None,
+            aws_access_key_id=access_key or None,
+            aws_secret_access_key=secret_key or None,
+            # Path-style e SigV4 funcionam tanto na AWS quanto no MinIO
+            config=BotoConfig(signature_version="s3v4", s3={"addressing_style": "path"}),
+        )
+
+    def _key(self, key):
+        key = key.replace(os.sep, "/")
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def size(self, key):
+        head = self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        return head["ContentLength"]
+
+    def open(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"]
+
+    def read_range(self, key, start, end, buffer_size=BUFFER_SIZE):
+        body = self.client.get_object(
+            Bucket=self.bucket, Key=self._key(key), Range=f"bytes={start}-{end}"
+        )["Body"]
+        try:
+            yield from body.iter_chunks(buffer_size)
+        finally:
+            body.close()
+
+    def save(self, key, stream, hasher=None):
+        reader = _CountingReader(stream, hasher)
+        self.client.upload_fileobj(reader, self.bucket, self._key(key))
+        return reader.count
+
+    def put_file(self, key, path):
+        self.client.upload_file(path, self.bucket, self._key(key))
+        os.remove(path)
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def move(self, key, new_key):
+        self.client.copy_object(
+            Bucket=self.bucket,
+            Key=self._key(new_key),
+            CopySource={"Bucket": self.bucket, "Key": self._key(key)},
+        )
+        self.delete(key)
+
+    def iter_files(self):
+        prefixo = f"{self.prefix}/" if self.prefix else ""
+        paginator = self.client.get_paginator("list_objects_v2")
+        for pagina in paginator.paginate(Bucket=self.bucket, Prefix=prefixo):
+            for obj in pagina.get("Contents", []):
+                key = obj["Key"][len(prefixo):].replace("/", os.sep)
+                yield key, obj["Size"], obj["LastModified"].timestamp()
+
+    def url(self, key, download_name=None):
+        if not self.redirect:
+            return None
+        params = {"Bucket": self.bucket, "Key": self._key(key)}
+        if download_name:
+            params["ResponseContentDisposition"] = f'attachment; filename="{download_name}"'
+        return self.client.generate_presigned_url(
+            "get_object", Params=params, ExpiresIn=self.url_expires
+        )
+
+
+class StorageService:
+    """Acesso ao backend de armazenamento configurado"""
+
+    @staticmethod
+    def get_storage():
+        """
+        Backend configurado em STORAGE_BACKEND
+
+        O backend local é criado a cada chamada (UPLOAD_FOLDER pode mudar,
+        ex: nos testes); o cliente S3 é criado uma vez por aplicação.
+
+        Returns:
+            StorageBackend
+        """
+        config = current_app.config
+        backend = config.get("STORAGE_BACKEND", "local")
+
+        if backend == "local":
+            return LocalStorage(config["UPLOAD_FOLDER"])
+
+        if backend == "s3":
+            with _s3_lock:
+                storage = current_app.extensions.get("storage_s3")
+                if storage is None:
+                    storage = S3Storage(
+                        bucket=config.get("S3_BUCKET"),
+                        endpoint_url=config.get("S3_ENDPOINT_URL"),
+                        region=config.get("S3_REGION"),
+                        access_key=config.get("S3_ACCESS_KEY"),
+                        secret_key=config.get("S3_SECRET_KEY"),
+                        prefix=config.get("S3_PREFIX", ""),
+                        redirect=config.get("STORAGE_REDIRECT", True),
+                        url_expires=config.get("STORAGE_URL_EXPIRES", 3600),
+                    )
+                    current_app.extensions["storage_s3"] = storage
+            return storage
+
+        raise StorageError(f"STORAGE_BACKEND desconhecido: {backend!r}")
+
+
+class _CountingReader:
+    """Conta (e opcionalmente faz o hash) dos bytes lidos de um stream"""
+
+    def __init__(self, stream, hasher=None):
+        self.stream = stream
+        self.hasher = hasher
+        self.count = 0
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        if self.hasher is not None:
+            self.hasher.update(data)
+        self.count += len(data)
+        return data
@@ -0,0 +1,277 @@
+"""
+Serviço para upload de vídeos em partes (chunked), resumível
+
+Protocolo:
+    1. iniciar_upload   -> cria a sessão e reserva o nome final do arquivo
+    2. receber_parte    -> anexa bytes a partir de `offset` no arquivo em UPLOAD_FOLDER
+    3. finalizar_upload -> confere tamanho/hash, grava no armazenamento e cria o vídeo
+
+Com o armazenamento local, o arquivo em UPLOAD_FOLDER já é o definitivo
+(nada é copiado no final); com S3, UPLOAD_FOLDER é só a área de montagem
+e o arquivo completo é enviado ao bucket na finalização.
+
+O SHA-256 é calculado de forma incremental enquanto as partes chegam, então
+cada byte é gravado em disco uma única vez. O estado do hash fica em memória;
+se o processo reiniciar (ou outra instância receber a parte), o hash é
+reconstruído lendo o arquivo parcial já gravado.
+
+Cada upload aceita uma parte por vez: uma segunda parte enviada enquanto a
+anterior ainda está sendo gravada é recusada (o cliente consulta o offset e
+reenvia). O controle é por processo, como o estado do hash.
+"""
+
+import hashlib
+import os
+import threading
+import uuid
+from datetime import datetime
+
+from flask import current_app
+from models import db, UploadSession
+from utils.files import stream_to_file, hash_file
+from .storage_service import StorageService
+from .video_service import VideoService
+
+# upload_id -> (offset, hasher)
+_hashers = {}
+_hashers_lock = threading.Lock()
+# upload_id -> Lock da parte em gravação
+_partes_locks = {}
+
+
+class UploadService:
+    """Serviço para uploads resumíveis"""
+
+    @staticmethod
+    def iniciar_upload(
+        original_filename, total_size, latitude, longitude, radius_km, cliente_id=None
+    ):
+        """
+        Cria uma sessão de upload
+
+        Returns:
+            tuple: (UploadSession, error_message)
+        """
+        try:
+            if not original_filename:
+                return None, "Nenhum arquivo selecionado"
+
+            try:
+                total_size = int(total_size)
+            except (TypeError, ValueError):
+                return None, "Tamanho do arquivo inválido"
+            if total_size <= 0:
+                return None, "Tamanho do arquivo inválido"
+            if total_size > current_app.config["MAX_UPLOAD_SIZE"]:
+                return None, "Arquivo muito grande"
+
+            error = VideoService.validar_upload(
+                original_filename, latitude, longitude, radius_km
+            )
+            if error:
+                return None, error
+
+            upload_id = uuid.uuid4().hex
+            upload = UploadSession(
+                id=upload_id,
+                # Id no nome: envios do mesmo arquivo no mesmo segundo não
+                # gravam no mesmo arquivo parcial
+                filename=VideoService.gerar_nome_arquivo(original_filename, unico=upload_id[:12]),
+                original_filename=original_filename,
+                total_size=total_size,
+                bytes_recebidos=0,
+                latitude=latitude,
+                longitude=longitude,
+                radius_km=radius_km,
+                cliente_id=cliente_id,
+            )
+
+            # Arquivo vazio no destino final; as partes são anexadas a ele
+            filepath = UploadService._filepath(upload)
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            open(filepath, "wb").close()
+
+            db.session.add(upload)
+            db.session.commit()
+
+            with _hashers_lock:
+                _hashers[upload.id] = (0, hashlib.sha256())
+
+            current_app.logger.info(
+                f"Upload {upload.id} iniciado: {original_filename} ({total_size} bytes, Cliente: {cliente_id})"
+            )
+            return upload, None
+
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Erro ao iniciar upload: {str(e)}")
+            return None, f"Erro ao iniciar upload: {str(e)}"
+
+    @staticmethod
+    def get_upload(upload_id, cliente_id=None):
+        """Retorna a sessão se pertencer ao dono informado (None = admin)"""
+        upload = db.session.get(UploadSession, upload_id)
+        if not upload or upload.cliente_id != cliente_id:
+            return None
+        return upload
+
+    @staticmethod
+    def receber_parte(upload, offset, stream):
+        """
+        Anexa uma parte ao arquivo do upload
+
+        Se a conexão cair no meio da parte, os bytes que chegaram são
+        mantidos e o offset da sessão avança até eles.
+
+        Returns:
+            tuple: (success, error_message)
+        """
+        lock = UploadService._lock_parte(upload.id)
+        if not lock.acquire(blocking=False):
+            return False, "Outra parte deste upload está sendo enviada"
+        try:
+            # Offset confirmado por uma parte que terminou depois de a sessão ser lida
+            db.session.refresh(upload)
+            if offset != upload.bytes_recebidos:
+                return False, "Offset não confere com os bytes já recebidos"
+            return UploadService._gravar_parte(upload, offset, stream)
+        finally:
+            lock.release()
+
+    @staticmethod
+    def _gravar_parte(upload, offset, stream):
+        filepath = UploadService._filepath(upload)
+        hasher = UploadService._get_hasher(upload, filepath)
+
+        # Descartar bytes gravados além do último offset confirmado
+        if os.path.getsize(filepath) > offset:
+            os.truncate(filepath, offset)
+
+        restante = upload.total_size - offset
+        completa = False
+        try:
+            with open(filepath, "ab") as f:
+                stream_to_file(_LimitedStream(stream, restante), f, hasher)
+            completa = True
+            if stream.read(1):
+                return False, "Parte excede o tamanho total do arquivo"
+            return True, None
+        finally:
+            # Bytes que chegaram ao disco, mesmo se a conexão caiu no meio
+            upload.bytes_recebidos = min(os.path.getsize(filepath), upload.total_size)
+            upload.updated_at = datetime.utcnow()
+            db.session.commit()
+            with _hashers_lock:
+                if completa:
+                    _hashers[upload.id] = (upload.bytes_recebidos, hasher)
+                else:
+                    # Parte interrompida: o hash é reconstruído do disco na próxima
+                    _hashers.pop(upload.id, None)
+
+    @staticmethod
+    def finalizar_upload(upload, sha256=None):
+        """
+        Finaliza o upload e cria o vídeo
+
+        Args:
+            upload: UploadSession
+            sha256: str (opcional) - hash esperado, calculado pelo navegador
+
+        Returns:
+            tuple: (Video, error_message)
+        """
+        try:
+            if not upload.completo:
+                return None, "Upload incompleto"
+
+            filepath = UploadService._filepath(upload)
+            hasher = UploadService._get_hasher(upload, filepath)
+            content_hash = hasher.hexdigest()
+            if sha256 and sha256.lower() != content_hash:
+                return None, "Hash do arquivo não confere"
+
+            StorageService.get_storage().put_file(upload.filename, filepath)
+
+            video = VideoService.criar_video(
+                filename=upload.filename,
+                original_filename=upload.original_filename,
+                latitude=upload.latitude,
+                longitude=upload.longitude,
+                radius_km=upload.radius_km,
+                cliente_id=upload.cliente_id,
+                file_size=upload.total_size,
+                content_hash=content_hash,
+            )
+
+            db.session.delete(upload)
+            db.session.commit()
+            UploadService._forget(upload.id)
+
+            return video, None
+
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(
+                f"Erro ao finalizar upload {upload.id}: {str(e)}"
+            )
+            return None, f"Erro ao finalizar upload: {str(e)}"
+
+    @staticmethod
+    def cancelar_upload(upload):
+        """Cancela o upload e remove o arquivo parcial"""
+        try:
+            filepath = UploadService._filepath(upload)
+            if os.path.exists(filepath):
+                os.remove(filepath)
+
+            db.session.delete(upload)
+            db.session.commit()
+            UploadService._forget(upload.id)
+
+            current_app.logger.info(f"Upload {upload.id} cancelado")
+            return True, "Upload cancelado"
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Erro ao cancelar upload {upload.id}: {str(e)}")
+            return False, f"Erro ao cancelar upload: {str(e)}"
+
+    @staticmethod
+    def _filepath(upload):
+        return os.path.join(current_app.config["UPLOAD_FOLDER"], upload.filename)
+
+    @staticmethod
+    def _get_hasher(upload, filepath):
+        """Hash incremental em memória ou reconstruído a partir do arquivo parcial"""
+        with _hashers_lock:
+            state = _hashers.get(upload.id)
+        if state and state[0] == upload.bytes_recebidos:
+            return state[1]
+        return hash_file(filepath, limit=upload.bytes_recebidos)
+
+    @staticmethod
+    def _lock_parte(upload_id):
+        with _hashers_lock:
+            return _partes_locks.setdefault(upload_id, threading.Lock())
+
+    @staticmethod
+    def _forget(upload_id):
+        with _hashers_lock:
+            _hashers.pop(upload_id, None)
+            _partes_locks.pop(upload_id, None)
+
+
+class _LimitedStream:
+    """Lê no máximo `limit` bytes do stream original"""
+
+    def __init__(self, stream, limit):
+        self.stream = stream
+        self.remaining = limit
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b""
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.stream.read(size)
+        self.remaining -= len(data)
+        return data
@@ -2,11 +2,16 @@
 Serviço para gerenciamento de vídeos
 """
 
+import hashlib
 import os
 from werkzeug.utils import secure_filename
 from models import db, Video, LogVisualizacao
 from flask import current_app
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from .media_service import MediaService, MEDIA_INVALIDO
+from .storage_service import StorageService
+
+ALLOWED_EXTENSIONS = {".mp4", ".avi", ".mov", ".mkv"}
 
 
 class VideoService:
@@ -32,53 +37,26 @@ class VideoService:
             if not file or file.filename == "":
                 return None, "Nenhum arquivo selecionado"
 
-            # Validar extensão
-            allowed_extensions = {".mp4", ".avi", ".mov", ".mkv"}
-            ext = os.path.splitext(file.filename)[1].lower()
-            if ext not in allowed_extensions:
-                return (
-                    None,
-                    f'Tipo de arquivo não permitido. Use: {", ".join(allowed_extensions)}',
-                )
+            error = VideoService.validar_upload(
+                file.filename, latitude, longitude, radius_km
+            )
+            if error:
+                return None, error
 
-            # Validar coordenadas
-            if not (-90 <= latitude <= 90):
-                return None, "Latitude inválida (-90 a 90)"
-            if not (-180 <= longitude <= 180):
-                return None, "Longitude inválida (-180 a 180)"
-            if radius_km <= 0:
-                return None, "Raio deve ser maior que zero"
-
-            # Salvar arquivo
-            filename = secure_filename(file.filename)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{timestamp}_{filename}"
-
-            upload_folder = current_app.config["UPLOAD_FOLDER"]
-            os.makedirs(upload_folder, exist_ok=True)
-            filepath = os.path.join(upload_folder, filename)
-            file.save(filepath)
-
-            # Criar registro no banco
-            video = Video(
+            # Salvar arquivo calculando o hash durante a cópia
+            filename = VideoService.gerar_nome_arquivo(file.filename)
+            hasher = hashlib.sha256()
+            size = StorageService.get_storage().save(filename, file.stream, hasher)
+
+            video = VideoService.criar_video(
                 filename=filename,
                 original_filename=file.filename,
                 latitude=latitude,
                 longitude=longitude,
                 radius_km=radius_km,
                 cliente_id=cliente_id,
-                aprovado=(cliente_id is None),  # Admin aprova automaticamente
-                pago=(cliente_id is None),
-                creditos=(
-                    0 if cliente_id else 1000
-                ),  # Admin tem créditos ilimitados inicialmente
-            )
-
-            db.session.add(video)
-            db.session.commit()
-
-            current_app.logger.info(
-                f"Vídeo {filename} enviado com sucesso (Cliente: {cliente_id})"
+                file_size=size,
+                content_hash=hasher.hexdigest(),
             )
             return video, None
 
@@ -87,12 +65,94 @@ class VideoService:
             current_app.logger.error(f"Erro ao fazer upload: {str(e)}")
             return None, f"Erro ao fazer upload: {str(e)}"
 
+    @staticmethod
+    def validar_upload(filename, latitude, longitude, radius_km):
+        """
+        Valida extensão e parâmetros de localização de um upload
+
+        Returns:
+            str or None: mensagem de erro
+        """
+        ext = os.path.splitext(filename)[1].lower()
+        if ext not in ALLOWED_EXTENSIONS:
+            return f'Tipo de arquivo não permitido. Use: {", ".join(sorted(ALLOWED_EXTENSIONS))}'
+
+        if not (-90 <= latitude <= 90):
+            return "Latitude inválida (-90 a 90)"
+        if not (-180 <= longitude <= 180):
+            return "Longitude inválida (-180 a 180)"
+        if radius_km <= 0:
+            return "Raio deve ser maior que zero"
+        return None
+
+    @staticmethod
+    def gerar_nome_arquivo(original_filename, unico=None):
+        """
+        Gera o nome do arquivo salvo (timestamp + nome seguro)
+
+        `unico` entra no nome quando vários envios do mesmo arquivo podem
+        começar no mesmo segundo (ex.: id da sessão de upload)
+        """
+        filename = secure_filename(original_filename)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if unico:
+            return f"{timestamp}_{unico}_{filename}"
+        return f"{timestamp}_{filename}"
+
+    @staticmethod
+    def criar_video(
+        filename,
+        original_filename,
+        latitude,
+        longitude,
+        radius_km,
+        cliente_id=None,
+        file_size=None,
+        content_hash=None,
+    ):
+        """
+        Cria o registro do vídeo para um arquivo já gravado no armazenamento
+
+        Returns:
+            Video
+        """
+        video = Video(
+            filename=filename,
+            original_filename=original_filename,
+            latitude=latitude,
+            longitude=longitude,
+            radius_km=radius_km,
+            cliente_id=cliente_id,
+            aprovado=(cliente_id is None),  # Admin aprova automaticamente
+            pago=(cliente_id is None),
+            creditos=(
+                0 if cliente_id else 1000
+            ),  # Admin tem créditos ilimitados inicialmente
+            file_size=file_size,
+            content_hash=content_hash,
+            liberado_em=(datetime.utcnow() if cliente_id is None else None),
+        )
+
+        db.session.add(video)
+        db.session.commit()
+
+        current_app.logger.info(
+            f"Vídeo {filename} enviado com sucesso (Cliente: {cliente_id})"
+        )
+
+        # Probe/thumbnails em segundo plano, sem bloquear o upload
+        MediaService.agendar_processamento(video.id)
+        return video
+
     @staticmethod
     def aprovar_video(video_id):
         """Aprovar vídeo de cliente"""
         try:
             video = Video.query.get_or_404(video_id)
+            if video.media_status == MEDIA_INVALIDO:
+                return False, f"Vídeo inválido: {video.media_erro}"
             video.aprovado = True
+            video.liberado_em = datetime.utcnow()
             db.session.commit()
             current_app.logger.info(f"Vídeo {video.filename} aprovado")
             return True, "Vídeo aprovado com sucesso"
@@ -198,9 +258,9 @@ class VideoService:
             # Registrar visualização
             log = LogVisualizacao(
                 video_id=video_id,
-                ip_address=ip_address,
-                latitude=latitude,
-                longitude=longitude,
+                client_ip=ip_address,
+                client_latitude=latitude,
+                client_longitude=longitude,
             )
             db.session.add(log)
 
@@ -226,22 +286,132 @@ class VideoService:
             )
             return False, f"Erro ao registrar visualização: {str(e)}", None
 
+    @staticmethod
+    def registrar_visualizacoes_lote(eventos, ip_address, device_id=None):
+        """
+        Registra um lote de exibições enviadas por uma tela, em uma única
+        transação. Cada evento tem um id único: eventos já registrados são
+        confirmados de novo sem consumir crédito, então a tela pode reenviar
+        um lote com segurança.
+
+        Args:
+            eventos: list - dicts com id, video_id e, opcionais,
+                visualizado_em (ISO 8601, UTC), latitude e longitude
+
+        Returns:
+            tuple: (resultados, error) - resultados é uma lista de
+                {"id", "status"} com status "ok", "duplicado" ou "recusado"
+                (com "motivo"); "recusado" é definitivo e não deve ser reenviado
+        """
+        try:
+            ids = [str(evento.get("id") or "") for evento in eventos]
+            existentes = set(
+                db.session.execute(
+                    db.select(LogVisualizacao.evento_id).where(
+                        LogVisualizacao.evento_id.in_([i for i in ids if i])
+                    )
+                ).scalars()
+            )
+            video_ids = {evento.get("video_id") for evento in eventos}
+            videos = {
+                video.id: video
+                for video in Video.query.filter(Video.id.in_(
+                    [v for v in video_ids if isinstance(v, int)]
+                ))
+            }
+
+            resultados = []
+            vistos = set()
+            for evento_id, evento in zip(ids, eventos):
+                if not evento_id or len(evento_id) > 64:
+                    resultados.append(
+                        {"id": evento_id, "status": "recusado", "motivo": "id inválido"}
+                    )
+                    continue
+                if evento_id in existentes or evento_id in vistos:
+                    resultados.append({"id": evento_id, "status": "duplicado"})
+                    continue
+                vistos.add(evento_id)
+
+                video = videos.get(evento.get("video_id"))
+                motivo = None
+                if video is None:
+                    motivo = "Vídeo não encontrado"
+                elif not video.aprovado:
+                    motivo = "Vídeo não aprovado"
+                elif video.creditos <= 0:
+                    video.pausado = True
+                    motivo = "Vídeo sem créditos"
+                elif video.pausado:
+                    motivo = "Vídeo pausado"
+                if motivo:
+                    resultados.append(
+                        {"id": evento_id, "status": "recusado", "motivo": motivo}
+                    )
+                    continue
+
+                try:
+                    visualizado_em = datetime.fromisoformat(evento["visualizado_em"])
+                except (KeyError, TypeError, ValueError):
+                    visualizado_em = datetime.utcnow()
+                if visualizado_em.tzinfo is not None:
+                    # Gravado em UTC sem fuso, como o restante do banco
+                    visualizado_em = visualizado_em.astimezone(timezone.utc).replace(tzinfo=None)
+
+                db.session.add(
+                    LogVisualizacao(
+                        video_id=video.id,
+                        client_ip=ip_address,
+                        client_latitude=evento.get("latitude"),
+                        client_longitude=evento.get("longitude"),
+                        visualizado_em=visualizado_em,
+                        evento_id=evento_id,
+                        device_id=device_id,
+                    )
+                )
+                video.creditos -= 1
+                video.visualizacoes += 1
+                if video.creditos <= 0:
+                    video.pausado = True
+                resultados.append({"id": evento_id, "status": "ok"})
+
+            db.session.commit()
+
+            aceitos = sum(1 for r in resultados if r["status"] == "ok")
+            current_app.logger.info(
+                f"Lote de visualizações de {device_id or ip_address}: "
+                f"{aceitos}/{len(eventos)} registradas"
+            )
+            return resultados, None
+
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Erro ao registrar lote de visualizações: {str(e)}")
+            return None, f"Erro ao registrar visualizações: {str(e)}"
+
     @staticmethod
     def deletar_video(video_id):
         """Deletar vídeo e arquivo físico"""
         try:
             video = Video.query.get_or_404(video_id)
             filename = video.filename
+            arquivos = video.arquivos()
 
-            # Deletar arquivo físico
-            filepath = os.path.join(current_app.config["UPLOAD_FOLDER"], filename)
-            if os.path.exists(filepath):
-                os.remove(filepath)
-
-            # Deletar do banco
+            # Primeiro o banco: se a remoção de um arquivo falhar, sobra um
+            # arquivo órfão (removido pelo "flask verificar-armazenamento"),
+            # nunca um vídeo apontando para um arquivo que não existe
             db.session.delete(video)
             db.session.commit()
 
+            storage = StorageService.get_storage()
+            for relpath in arquivos:
+                try:
+                    storage.delete(relpath)
+                except Exception as e:
+                    current_app.logger.error(
+                        f"Arquivo {relpath} do vídeo {filename} não removido: {str(e)}"
+                    )
+
             current_app.logger.info(f"Vídeo {filename} deletado")
             return True, "Vídeo deletado com sucesso"
         except Exception as e:
@@ -249,6 +419,37 @@ class VideoService:
             current_app.logger.error(f"Erro ao deletar vídeo {video_id}: {str(e)}")
             return False, f"Erro ao deletar vídeo: {str(e)}"
 
+    @staticmethod
+    def agendar_campanha(video_id, inicio_em, fim_em=None):
+        """
+        Define (ou remove, com None) o início e o fim da campanha do vídeo.
+        Antes do início, o vídeo só aparece na lista de pré-download das
+        telas; depois do fim, sai da lista. O fim também define o ritmo de
+        exibição (PacingService).
+        """
+        if inicio_em and fim_em and fim_em <= inicio_em:
+            return False, "O fim da campanha deve ser depois do início"
+        try:
+            video = Video.query.get_or_404(video_id)
+            video.inicio_em = inicio_em
+            video.fim_em = fim_em
+            db.session.commit()
+            partes = []
+            if inicio_em:
+                partes.append(f"início em {inicio_em.strftime('%d/%m/%Y %H:%M')}")
+            if fim_em:
+                partes.append(f"fim em {fim_em.strftime('%d/%m/%Y %H:%M')}")
+            if partes:
+                message = f"Campanha agendada: {', '.join(partes)} (UTC)"
+            else:
+                message = "Agendamento removido: vídeo exibido imediatamente"
+            current_app.logger.info(f"Vídeo {video.filename}: {message}")
+            return True, message
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Erro ao agendar vídeo {video_id}: {str(e)}")
+            return False, f"Erro ao agendar vídeo: {str(e)}"
+
     @staticmethod
     def get_videos_by_location(latitude, longitude):
         """
@@ -266,6 +467,10 @@ class VideoService:
         videos = (
             Video.query.filter_by(aprovado=True, pausado=False)
             .filter(Video.creditos > 0)
+            # Arquivo que a análise de mídia recusou não vai para as telas
+            .filter(db.or_(Video.media_status.is_(None), Video.media_status != MEDIA_INVALIDO))
+            .filter(db.or_(Video.inicio_em.is_(None), Video.inicio_em <= datetime.utcnow()))
+            .filter(db.or_(Video.fim_em.is_(None), Video.fim_em > datetime.utcnow()))
             .all()
         )
 
@@ -283,6 +488,35 @@ class VideoService:
 
         return videos_filtrados
 
+    @staticmethod
+    def get_prefetch_by_location(latitude, longitude, horizonte_dias):
+        """
+        Vídeos aprovados com início agendado nos próximos `horizonte_dias`,
+        para as telas baixarem antes (fora do horário de pico)
+
+        Returns:
+            list: vídeos ordenados pelo início
+        """
+        from utils.geo import is_within_radius
+
+        agora = datetime.utcnow()
+        videos = (
+            Video.query.filter_by(aprovado=True, pausado=False)
+            .filter(Video.creditos > 0)
+            .filter(db.or_(Video.media_status.is_(None), Video.media_status != MEDIA_INVALIDO))
+            .filter(Video.inicio_em > agora)
+            .filter(Video.inicio_em <= agora + timedelta(days=horizonte_dias))
+            .order_by(Video.inicio_em)
+            .all()
+        )
+        return [
+            video
+            for video in videos
+            if is_within_radius(
+                latitude, longitude, video.latitude, video.longitude, video.radius_km
+            )
+        ]
+
     @staticmethod
     def get_all_videos():
         """Retorna todos os vídeos ordenados por ID decrescente"""
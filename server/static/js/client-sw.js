@@ -0,0 +1,91 @@
+// Service worker do cliente web (/client)
+//
+// Servido na raiz por routes/main.py (/client-sw.js) para controlar /client
+// e as chamadas à API. Guarda a página do visualizador (client.html,
+// client.js, video-store.js, client.css) e a entrega do cache na hora,
+// revalidando em segundo plano: recarregar o quiosque não espera pelo
+// servidor, e uma versão nova dos arquivos vale a partir da recarga seguinte.
+//
+// Sem servidor, /api/videos responde com o último manifest guardado pela
+// página (video-store.js), marcado com X-Propaganda-Offline. Os vídeos não
+// passam por aqui: a página os lê direto do IndexedDB, e guardá-los também
+// no Cache Storage dobraria o espaço ocupado na cota do navegador.
+
+importScripts('/static/js/video-store.js');
+
+const SHELL_CACHE = 'propaganda-shell-v1';
+const SHELL_URLS = [
+    '/client',
+    '/static/css/client.css',
+    '/static/js/client.js',
+    '/static/js/video-store.js'
+];
+const MANIFEST_TIMEOUT = 5000; // ms até responder com o manifest guardado
+
+self.addEventListener('install', event => {
+    event.waitUntil(
+        caches.open(SHELL_CACHE)
+            .then(cache => cache.addAll(SHELL_URLS))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', event => {
+    // Remover caches de versões anteriores do service worker
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(keys
+                .filter(key => key.startsWith('propaganda-shell-') && key !== SHELL_CACHE)
+                .map(key => caches.delete(key))))
+            .then(() => self.clients.claim())
+    );
+});
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET') return;
+    const url = new URL(request.url);
+
+    if (url.origin === self.location.origin && SHELL_URLS.includes(url.pathname)) {
+        event.respondWith(shellResponse(event, url.pathname));
+    } else if (url.pathname.endsWith('/api/videos')) {
+        event.respondWith(manifestResponse(request));
+    }
+    // Demais requisições (admin, downloads, heartbeats) seguem direto para a rede
+});
+
+// Página do visualizador: do cache na hora, atualizada em segundo plano
+async function shellResponse(event, path) {
+    const cache = await caches.open(SHELL_CACHE);
+    const update = fetch(event.request)
+        .then(response => {
+            if (response.ok) cache.put(path, response.clone());
+            return response;
+        });
+    const cached = await cache.match(path);
+    if (cached) {
+        event.waitUntil(update.catch(() => {}));
+        return cached;
+    }
+    return update;
+}
+
+// Lista de vídeos: da rede; sem resposta, o último manifest guardado pela página
+async function manifestResponse(request) {
+    try {
+        return await Promise.race([
+            fetch(request),
+            new Promise((_, reject) => setTimeout(
+                () => reject(new Error('tempo esgotado')), MANIFEST_TIMEOUT))
+        ]);
+    } catch (error) {
+        const manifest = await loadLastManifest().catch(() => undefined);
+        if (!manifest) throw error;
+        return new Response(JSON.stringify(manifest), {
+            headers: {
+                'Content-Type': 'application/json',
+                'X-Propaganda-Offline': '1'
+            }
+        });
+    }
+}
@@ -9,16 +9,74 @@ let config = {
 let currentVideoId = null;
 let currentVideoBlob = null;
 let checkTimer = null;
-let videoPlayer = null;
+let videoPlayer = null; // Player em exibição
+let standbyPlayer = null; // Player de espera, com o próximo vídeo pré-carregado
+let players = [];
+let preparedVideo = null; // Vídeo carregado no player de espera
+let pendingRevoke = new Set(); // URLs de vídeos removidos ainda em uso por um player
 let inactivityTimer = null;
 const INACTIVITY_DELAY = 3000; // 3 segundos
 let videoIndex = 0;
 let availableVideos = []; // Lista de vídeos disponíveis
-let downloadedBlobs = []; // Blobs dos vídeos baixados
+let downloadedBlobs = []; // Vídeos da playlist (object URLs dos Blobs guardados em video-store.js)
+let releaseTimer = null; // Próxima liberação escalonada de vídeo novo
+let videoWeights = {}; // Peso de cada vídeo (id -> peso) definido pelo servidor
+let schedulerCredit = {}; // Peso acumulado de cada vídeo no round-robin ponderado
+const MAX_RETRY_WAIT = 600; // Espera máxima (s) com o servidor ocupado (503)
+const DOWNLOAD_CONCURRENCY = 3; // Vídeos baixados ao mesmo tempo
+const STORE_CHUNK_SIZE = 1024 * 1024; // Bytes acumulados antes de gravar um bloco do download
+let activeDownloads = {}; // Downloads em andamento (chave do vídeo -> Promise da entrada)
+let downloadProgress = {}; // Progresso exibido na tela (arquivo -> { received, total })
+let progressRenderTimer = null;
+const CLIENT_VERSION = '1.5.0'; // Enviada nos heartbeats
+const deviceId = getDeviceId();
+let heartbeatInterval = 300; // Segundos entre heartbeats (o servidor pode pedir outro)
+let heartbeatTimer = null;
+let droppedFrames = 0; // Quadros descartados pelo navegador desde o carregamento
+let lastSync = null; // Última verificação bem-sucedida (epoch, segundos)
+
+// Identificador desta tela (liberação escalonada de vídeos novos)
+function getDeviceId() {
+    let id = localStorage.getItem('deviceId');
+    if (!id) {
+        id = (window.crypto && crypto.randomUUID)
+            ? crypto.randomUUID()
+            : Date.now().toString(36) + Math.random().toString(36).slice(2);
+        localStorage.setItem('deviceId', id);
+    }
+    return id;
+}
+
+// Cabeçalhos de identificação da tela (token recebido no registro, se houver)
+function deviceHeaders(extra = {}) {
+    const headers = Object.assign({ 'X-Device-Id': deviceId }, extra);
+    const token = localStorage.getItem('deviceToken');
+    if (token) headers['X-Device-Token'] = token;
+    return headers;
+}
+
+// fetch com o id da tela; aguarda o Retry-After enquanto o servidor responder 503
+async function fetchWithRetry(url, extraHeaders = {}) {
+    let waited = 0;
+    while (true) {
+        const response = await fetch(url, { headers: deviceHeaders(extraHeaders) });
+        if (response.status !== 503 || waited >= MAX_RETRY_WAIT) {
+            return response;
+        }
+        const retryAfter = Math.max(1, Math.min(
+            parseInt(response.headers.get('Retry-After')) || 30, MAX_RETRY_WAIT - waited));
+        console.warn(`⏳ Servidor ocupado, nova tentativa em ${retryAfter}s`);
+        await new Promise(resolve => setTimeout(resolve, retryAfter * 1000));
+        waited += retryAfter;
+    }
+}
 
 // Inicializar quando a página carregar
 window.onload = function() {
     videoPlayer = document.getElementById('video-player');
+    standbyPlayer = document.getElementById('video-player-next');
+    players = [videoPlayer, standbyPlayer];
+    registerServiceWorker();
     loadConfig();
     setupMouseInactivity();
     
@@ -29,10 +87,14 @@ window.onload = function() {
         toggleConfig();
     }
     
-    // Configurar evento de fim do vídeo
-    videoPlayer.addEventListener('ended', function() {
+    // Configurar evento de fim do vídeo (só o player em exibição avança a playlist)
+    players.forEach(player => player.addEventListener('ended', function() {
+        if (player !== videoPlayer) return;
+        if (player.getVideoPlaybackQuality) {
+            droppedFrames += player.getVideoPlaybackQuality().droppedVideoFrames;
+        }
         playNextVideo();
-    });
+    }));
     
     // Adicionar eventos de mouse
     document.addEventListener('mousemove', resetInactivityTimer);
@@ -41,6 +103,14 @@ window.onload = function() {
     document.addEventListener('touchstart', resetInactivityTimer);
 };
 
+// Service worker: página do visualizador e último manifest disponíveis sem servidor
+function registerServiceWorker() {
+    if ('serviceWorker' in navigator) {
+        navigator.serviceWorker.register('/client-sw.js')
+            .catch(error => console.warn('⚠️ Service worker não registrado:', error));
+    }
+}
+
 // Configurar sistema de inatividade do mouse
 function setupMouseInactivity() {
     // Iniciar timer de inatividade
@@ -210,6 +280,13 @@ async function startClient() {
     console.log('🚀 Iniciando cliente web...');
     hideError();
     hideLoading();
+
+    // Pedir ao navegador que não apague os vídeos guardados sob pressão de espaço
+    if (navigator.storage && navigator.storage.persist) {
+        navigator.storage.persist().catch(() => {});
+    }
+    // Voltar a exibir o que já está guardado, antes de falar com o servidor
+    await restoreStoredVideos();
     
     // Verificar imediatamente
     await checkForVideos();
@@ -217,8 +294,102 @@ async function startClient() {
     // Configurar verificação periódica
     if (checkTimer) clearInterval(checkTimer);
     checkTimer = setInterval(checkForVideos, config.checkInterval * 1000);
-    
-    updateStatus(true);
+
+    // Registro da tela e heartbeats
+    if (heartbeatTimer) clearTimeout(heartbeatTimer);
+    sendHeartbeat();
+}
+
+// Hash curto (FNV-1a de 32 bits) dos ids da playlist, igual ao do cliente desktop
+function playlistHash(ids) {
+    let h = 0x811c9dc5;
+    const text = ids.slice().sort((a, b) => a - b).join(',');
+    for (let i = 0; i < text.length; i++) {
+        h = Math.imul(h ^ text.charCodeAt(i), 0x01000193) >>> 0;
+    }
+    return h.toString(16).padStart(8, '0');
+}
+
+// Registrar a tela no servidor (uma vez; o token fica no localStorage)
+async function registerDevice() {
+    const response = await fetch(`${config.serverUrl}/api/dispositivos`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+            device_id: deviceId,
+            tipo: 'web',
+            latitude: config.latitude,
+            longitude: config.longitude
+        })
+    });
+    if (response.status === 409) {
+        console.warn('⚠️ Tela já registrada e sem token local: remova-a na página Telas do admin');
+        return false;
+    }
+    if (!response.ok) {
+        throw new Error(`Registro recusado (HTTP ${response.status})`);
+    }
+    const data = await response.json();
+    localStorage.setItem('deviceToken', data.token);
+    heartbeatInterval = data.heartbeat_interval || heartbeatInterval;
+    console.log('🆔 Tela registrada no servidor');
+    return true;
+}
+
+// Heartbeat: versão, playlist, cache, quadros descartados e última sincronização
+async function sendHeartbeat() {
+    try {
+        if (localStorage.getItem('deviceToken') || await registerDevice()) {
+            const storedBytes = await storedVideoBytes().catch(() => null);
+            const cacheBytes = storedBytes !== null
+                ? storedBytes
+                : downloadedBlobs.reduce((total, item) => total + (item.size || 0), 0);
+            const response = await fetch(`${config.serverUrl}/api/heartbeat`, {
+                method: 'POST',
+                headers: deviceHeaders({ 'Content-Type': 'application/json' }),
+                body: JSON.stringify({
+                    versao: CLIENT_VERSION,
+                    playlist: playlistHash(downloadedBlobs.map(item => item.id)),
+                    cache_bytes: cacheBytes,
+                    quadros_descartados: droppedFrames,
+                    sincronizado_em: lastSync
+                })
+            });
+            if (response.status === 401) {
+                // Tela removida no admin: registrar de novo no próximo heartbeat
+                localStorage.removeItem('deviceToken');
+            } else if (response.ok) {
+                heartbeatInterval = (await response.json()).heartbeat_interval || heartbeatInterval;
+            }
+        }
+    } catch (error) {
+        console.warn('⚠️ Falha no heartbeat:', error);
+    }
+    heartbeatTimer = setTimeout(sendHeartbeat, heartbeatInterval * 1000);
+}
+
+// Reexibir a última playlist guardada, sem rede (recarga da página, reinício do quiosque)
+async function restoreStoredVideos() {
+    if (downloadedBlobs.length > 0) return;
+    try {
+        const manifest = await loadLastManifest();
+        if (!manifest || !manifest.videos || manifest.videos.length === 0) return;
+        for (const video of manifest.videos) {
+            const entry = await storedVideoEntry(video);
+            if (entry) downloadedBlobs.push(entry);
+        }
+        if (downloadedBlobs.length === 0) return;
+
+        availableVideos = manifest.videos.filter(video =>
+            downloadedBlobs.some(item => item.id === video.id));
+        updateWeights(availableVideos);
+        console.log(`💾 ${downloadedBlobs.length} vídeo(s) restaurado(s) do armazenamento local`);
+        if (videoPlayer.paused) {
+            playVideoAtIndex(nextVideoIndex());
+        }
+    } catch (error) {
+        console.warn('⚠️ Falha ao restaurar vídeos guardados:', error);
+    }
 }
 
 // Verificar vídeos disponíveis no servidor
@@ -227,18 +398,34 @@ async function checkForVideos() {
         console.log('🔍 Verificando novos vídeos...');
         
         const url = `${config.serverUrl}/api/videos?latitude=${config.latitude}&longitude=${config.longitude}`;
-        const response = await fetch(url);
+        const response = await fetchWithRetry(url);
         
         if (!response.ok) {
             throw new Error(`Erro HTTP: ${response.status}`);
         }
 
         const data = await response.json();
-        const now = new Date();
-        document.getElementById('last-check').textContent = now.toLocaleTimeString('pt-BR');
+        // Resposta do service worker com o último manifest guardado: servidor fora do ar
+        const offline = response.headers.get('X-Propaganda-Offline') === '1';
+        if (offline) {
+            console.warn('📴 Servidor indisponível, usando o último manifest guardado');
+        } else {
+            saveLastManifest(data).catch(error => console.warn('⚠️ Falha ao guardar o manifest:', error));
+            const now = new Date();
+            lastSync = Math.floor(now.getTime() / 1000);
+            document.getElementById('last-check').textContent = now.toLocaleTimeString('pt-BR');
+        }
+
+        // Vídeo novo ainda não liberado para esta tela: verificar de novo no horário indicado
+        if (releaseTimer) clearTimeout(releaseTimer);
+        releaseTimer = null;
+        if (data.proxima_liberacao && data.proxima_liberacao < config.checkInterval) {
+            releaseTimer = setTimeout(checkForVideos, data.proxima_liberacao * 1000);
+        }
         
         if (data.videos && data.videos.length > 0) {
             console.log(`📹 ${data.videos.length} vídeo(s) encontrado(s)`);
+            updateWeights(data.videos);
             
             // Verificar se há vídeos novos ou removidos
             const hasChanges = checkVideoListChanges(data.videos);
@@ -260,17 +447,43 @@ async function checkForVideos() {
             }
         }
         
-        updateStatus(true);
+        updateStatus(!offline);
     } catch (error) {
         console.error('❌ Erro ao verificar vídeos:', error);
         updateStatus(false);
-        // Não mostrar erro se já estiver reproduzindo um vídeo
-        if (!currentVideoId) {
+        // Não mostrar erro se já estiver reproduzindo um vídeo (ex.: restaurado do armazenamento)
+        if (!currentVideoId && downloadedBlobs.length === 0) {
             showError(`Erro ao conectar ao servidor: ${error.message}`);
         }
     }
 }
 
+// Atualizar os pesos da playlist (créditos x prazo da campanha, calculados no servidor)
+function updateWeights(videos) {
+    videoWeights = {};
+    schedulerCredit = {};
+    videos.forEach(video => {
+        videoWeights[video.id] = video.peso > 0 ? video.peso : 1;
+    });
+}
+
+// Escolher o próximo vídeo: round-robin ponderado suave, sem consultar o servidor.
+// Cada vídeo acumula o seu peso; o de maior acúmulo toca e perde a soma dos pesos
+function nextVideoIndex() {
+    let best = 0;
+    let total = 0;
+    downloadedBlobs.forEach((item, i) => {
+        const weight = videoWeights[item.id] || 1;
+        total += weight;
+        schedulerCredit[item.id] = (schedulerCredit[item.id] || 0) + weight;
+        if (schedulerCredit[item.id] > schedulerCredit[downloadedBlobs[best].id]) {
+            best = i;
+        }
+    });
+    schedulerCredit[downloadedBlobs[best].id] -= total;
+    return best;
+}
+
 // Verificar se há mudanças na lista de vídeos
 function checkVideoListChanges(newVideos) {
     // Se não há vídeos baixados, há mudança
@@ -309,55 +522,49 @@ async function updateVideoList() {
             !availableVideos.some(video => video.id === blob.id)
         );
         
-        // Remover vídeos que não existem mais
+        // Vídeos atribuídos à tela: não saem do armazenamento para abrir espaço
+        const keepKeys = new Set(availableVideos.map(videoStoreKey));
+
+        // Remover vídeos que não existem mais (continuam guardados até faltar espaço)
         if (removedVideos.length > 0) {
             console.log(`🗑️ Removendo ${removedVideos.length} vídeo(s) antigo(s)...`);
             removedVideos.forEach(removed => {
                 const index = downloadedBlobs.findIndex(blob => blob.id === removed.id);
                 if (index !== -1) {
-                    URL.revokeObjectURL(downloadedBlobs[index].url);
+                    releaseVideoUrl(downloadedBlobs[index].url);
                     downloadedBlobs.splice(index, 1);
                     console.log(`   ✅ Removido: ${removed.filename}`);
                 }
             });
         }
         
-        // Baixar apenas vídeos novos
+        // Carregar apenas vídeos novos (do armazenamento local ou do servidor); a
+        // reprodução começa assim que o primeiro fica pronto
         if (newVideos.length > 0) {
-            console.log(`📥 Baixando ${newVideos.length} vídeo(s) novo(s)...`);
-            showLoading(`Baixando ${newVideos.length} vídeo(s) novo(s)...`);
-            
-            for (let i = 0; i < newVideos.length; i++) {
-                const video = newVideos[i];
-                console.log(`   📥 ${i + 1}/${newVideos.length}: ${video.original_filename}`);
-                
-                const url = `${config.serverUrl}/api/download/${video.id}`;
-                const response = await fetch(url);
-                
-                if (!response.ok) {
-                    throw new Error(`Erro ao baixar ${video.original_filename}: ${response.status}`);
-                }
-                
-                const blob = await response.blob();
-                const blobUrl = URL.createObjectURL(blob);
-                
-                downloadedBlobs.push({
-                    id: video.id,
-                    url: blobUrl,
-                    filename: video.original_filename
-                });
-                
-                console.log(`   ✅ Baixado: ${video.original_filename}`);
+            console.log(`📥 Carregando ${newVideos.length} vídeo(s) novo(s)...`);
+            if (downloadedBlobs.length === 0) {
+                showLoading(`Carregando ${newVideos.length} vídeo(s) novo(s)...`);
             }
             
+            const failures = await loadVideos(newVideos);
+            
             hideLoading();
-            console.log(`✅ ${newVideos.length} vídeo(s) novo(s) adicionado(s)`);
+            console.log(`✅ ${newVideos.length - failures} vídeo(s) novo(s) adicionado(s)`);
+            if (failures > 0) {
+                // Os que faltam são retomados na próxima verificação, do ponto em que pararam
+                const message = `${failures} vídeo(s) não baixado(s); nova tentativa na próxima verificação`;
+                if (downloadedBlobs.length === 0) {
+                    showError(message);
+                } else {
+                    console.warn(`⚠️ ${message}`);
+                }
+            }
         }
+        touchStoredVideos([...keepKeys]).catch(() => {});
         
         // Se não há vídeos tocando, iniciar reprodução
         if (videoPlayer.paused && downloadedBlobs.length > 0) {
-            videoIndex = 0;
-            playVideoAtIndex(0);
+            playVideoAtIndex(nextVideoIndex());
         }
         
         console.log(`📊 Total de vídeos em memória: ${downloadedBlobs.length}`);
@@ -372,39 +579,22 @@ async function updateVideoList() {
 // Baixar todos os vídeos disponíveis (usado apenas na primeira vez)
 async function downloadAllVideos() {
     try {
-        // Limpar blobs anteriores
+        // Limpar blobs anteriores (clearAllVideos também esvazia availableVideos)
+        const videos = availableVideos;
         clearAllVideos();
+        availableVideos = videos;
         
-        showLoading(`Baixando ${availableVideos.length} vídeo(s)...`);
+        showLoading(`Baixando ${videos.length} vídeo(s)...`);
         
-        // Baixar todos os vídeos
-        for (let i = 0; i < availableVideos.length; i++) {
-            const video = availableVideos[i];
-            console.log(`📥 Baixando vídeo ${i + 1}/${availableVideos.length}: ${video.original_filename}`);
-            
-            const url = `${config.serverUrl}/api/download/${video.id}`;
-            const response = await fetch(url);
-            
-            if (!response.ok) {
-                throw new Error(`Erro ao baixar vídeo ${video.original_filename}: ${response.status}`);
-            }
-            
-            const blob = await response.blob();
-            const blobUrl = URL.createObjectURL(blob);
-            
-            downloadedBlobs.push({
-                id: video.id,
-                url: blobUrl,
-                filename: video.original_filename
-            });
-        }
+        // Baixar todos os vídeos (os já guardados vêm do armazenamento local); a
+        // reprodução começa com o primeiro que ficar pronto
+        const failures = await loadVideos(videos);
         
         console.log(`✅ ${downloadedBlobs.length} vídeo(s) baixado(s) com sucesso`);
         hideLoading();
-        
-        // Iniciar reprodução
-        videoIndex = 0;
-        playVideoAtIndex(0);
+        if (failures > 0) {
+            throw new Error(`${failures} vídeo(s) não baixado(s)`);
+        }
         
     } catch (error) {
         console.error('❌ Erro ao baixar vídeos:', error);
@@ -413,7 +603,288 @@ async function downloadAllVideos() {
     }
 }
 
-// Reproduzir vídeo no índice especificado
+// Escolher a menor variante que cobre a resolução da tela (null = original)
+function chooseVariant(video) {
+    const ratio = window.devicePixelRatio || 1;
+    const screenWidth = window.screen.width * ratio;
+    const screenHeight = window.screen.height * ratio;
+
+    // Original sem metadados conta como "maior que qualquer variante"
+    const candidates = [{
+        width: video.largura || Infinity,
+        height: video.altura || Infinity,
+        variant: null
+    }];
+    (video.variants || []).forEach(variant => {
+        candidates.push({ width: variant.largura, height: variant.altura, variant: variant });
+    });
+    candidates.sort((a, b) => a.width * a.height - b.width * b.height);
+
+    const match = candidates.find(c => c.width >= screenWidth || c.height >= screenHeight);
+    return (match || candidates[candidates.length - 1]).variant;
+}
+
+// URL de download do vídeo (variante adequada à tela, se houver)
+function videoDownloadUrl(video) {
+    const variant = chooseVariant(video);
+    const url = `${config.serverUrl}/api/download/${video.id}`;
+    return variant ? `${url}?variant=${variant.id}` : url;
+}
+
+// Chave do vídeo no armazenamento: hash do conteúdo da versão escolhida para esta tela
+function videoStoreKey(video) {
+    const variant = chooseVariant(video);
+    const source = variant || video;
+    return source.content_hash || `video-${video.id}-${variant ? variant.id : 'original'}`;
+}
+
+// Entrada da playlist para o Blob do vídeo
+function playlistEntry(video, key, blob) {
+    return {
+        id: video.id,
+        key: key,
+        url: URL.createObjectURL(blob),
+        size: blob.size,
+        filename: video.original_filename
+    };
+}
+
+// Entrada da playlist a partir do armazenamento local (null se o vídeo não estiver guardado)
+async function storedVideoEntry(video) {
+    const key = videoStoreKey(video);
+    const stored = await getStoredVideo(key).catch(() => undefined);
+    return stored ? playlistEntry(video, key, stored.blob) : null;
+}
+
+// Executar `worker` para cada item, no máximo `limit` ao mesmo tempo
+async function runWithConcurrency(items, limit, worker) {
+    let next = 0;
+    const lanes = Array.from({ length: Math.min(limit, items.length) }, async () => {
+        while (next < items.length) {
+            await worker(items[next++]);
+        }
+    });
+    await Promise.all(lanes);
+}
+
+// Carregar vídeos, DOWNLOAD_CONCURRENCY por vez; cada um entra na playlist assim que fica
+// pronto, e uma falha não descarta os demais. Retorna quantos falharam
+async function loadVideos(videos) {
+    const keepKeys = new Set(availableVideos.map(videoStoreKey));
+    let failures = 0;
+    await runWithConcurrency(videos, DOWNLOAD_CONCURRENCY, async video => {
+        try {
+            const entry = await loadVideo(video, keepKeys);
+            if (addToPlaylist(video, entry)) {
+                hideLoading();
+                console.log(`   ✅ Pronto: ${video.original_filename}`);
+            }
+        } catch (error) {
+            failures++;
+            console.error(`   ❌ ${video.original_filename}:`, error);
+        }
+    });
+    return failures;
+}
+
+// Incluir na playlist um vídeo que ficou pronto (se ainda for atribuído à tela)
+function addToPlaylist(video, entry) {
+    const present = downloadedBlobs.find(item => item.id === video.id);
+    if (present || !availableVideos.some(item => item.id === video.id)) {
+        if (present !== entry) releaseVideoUrl(entry.url);
+        return false;
+    }
+    downloadedBlobs.push(entry);
+    // Nada em exibição ainda: começar por este, sem esperar pelos outros
+    if (videoPlayer.paused && !videoPlayer.getAttribute('src')) {
+        playVideoAtIndex(nextVideoIndex());
+    }
+    return true;
+}
+
+// Obter o vídeo do armazenamento local ou, se não estiver lá, baixar e guardar
+// (um único download por vídeo, mesmo que duas verificações peçam o mesmo)
+async function loadVideo(video, keepKeys) {
+    const stored = await storedVideoEntry(video);
+    if (stored) {
+        console.log(`   💾 Do armazenamento local: ${video.original_filename}`);
+        return stored;
+    }
+
+    const key = videoStoreKey(video);
+    if (!activeDownloads[key]) {
+        activeDownloads[key] = downloadVideo(video, key, keepKeys)
+            .finally(() => {
+                delete activeDownloads[key];
+                finishDownloadProgress(video.original_filename);
+            });
+    }
+    return activeDownloads[key];
+}
+
+// Baixar o vídeo gravando blocos de STORE_CHUNK_SIZE no armazenamento; um download
+// interrompido continua, com Range, a partir dos blocos já gravados
+async function downloadVideo(video, key, keepKeys) {
+    const name = video.original_filename;
+    const expectedSize = (chooseVariant(video) || video).file_size || 0;
+    let persistent = !!(await openVideoStore());
+    let parts = []; // Blocos mantidos em memória (sem armazenamento)
+    let received = 0;
+
+    if (persistent) {
+        const chunks = await listVideoChunks(key);
+        // Só vale a sequência contínua desde o início do arquivo
+        for (const chunk of chunks) {
+            if (chunk.offset !== received) break;
+            received += chunk.blob.size;
+        }
+        if (received !== chunks.reduce((total, chunk) => total + chunk.blob.size, 0)
+                || (expectedSize && received > expectedSize)) {
+            await deleteVideoChunks(key);
+            received = 0;
+        }
+        await evictStoredVideos(keepKeys, expectedSize - received);
+    }
+
+    let contentType = '';
+    if (!expectedSize || received < expectedSize) {
+        if (received > 0) {
+            console.log(`   ⏯️ Retomando ${name} a partir de ${received} bytes`);
+        }
+        let response = await fetchWithRetry(
+            videoDownloadUrl(video), received > 0 ? { Range: `bytes=${received}-` } : {});
+        if (received > 0 && response.status !== 206) {
+            // Servidor ignorou o Range: recomeçar do zero
+            await deleteVideoChunks(key);
+            received = 0;
+            if (!response.ok) {
+                response = await fetchWithRetry(videoDownloadUrl(video));
+            }
+        }
+        if (!response.ok) {
+            throw new Error(`Erro ao baixar ${name}: ${response.status}`);
+        }
+        contentType = response.headers.get('Content-Type') || '';
+        const total = expectedSize || received + (parseInt(response.headers.get('Content-Length')) || 0);
+
+        let persisted = received;
+        let pending = [];
+        let pendingBytes = 0;
+        const flush = async () => {
+            if (pendingBytes === 0) return;
+            const blob = new Blob(pending);
+            pending = [];
+            pendingBytes = 0;
+            if (persistent) {
+                try {
+                    await putVideoChunk(key, persisted, blob);
+                    persisted += blob.size;
+                    return;
+                } catch (error) {
+                    // Sem espaço: o restante do download fica em memória
+                    console.warn(`⚠️ Não foi possível gravar ${name} durante o download:`, error);
+                    persistent = false;
+                    parts = (await listVideoChunks(key)).map(chunk => chunk.blob);
+                }
+            }
+            parts.push(blob);
+        };
+
+        updateDownloadProgress(name, received, total);
+        const reader = response.body.getReader();
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            pending.push(value);
+            pendingBytes += value.length;
+            received += value.length;
+            updateDownloadProgress(name, received, total);
+            if (pendingBytes >= STORE_CHUNK_SIZE) {
+                await flush();
+            }
+        }
+        await flush();
+    }
+
+    const blobs = persistent ? (await listVideoChunks(key)).map(chunk => chunk.blob) : parts;
+    const blob = new Blob(blobs, { type: contentType });
+    if (expectedSize && blob.size !== expectedSize) {
+        await deleteVideoChunks(key);
+        throw new Error(`Download incompleto de ${name}`);
+    }
+    const expectedHash = (chooseVariant(video) || video).content_hash;
+    const actualHash = expectedHash ? await blobSha256(blob) : null;
+    if (actualHash && actualHash !== expectedHash) {
+        // Bloco corrompido no disco ou na rede: recomeçar do zero no próximo download
+        await deleteVideoChunks(key);
+        throw new Error(`Hash de ${name} não confere`);
+    }
+
+    const record = { key: key, id: video.id, filename: name, size: blob.size, blob: blob };
+    if (await storeVideo(record, keepKeys)) {
+        await deleteVideoChunks(key);
+        // Reabrir pelo banco: o Blob guardado fica no disco, não na memória
+        const entry = await storedVideoEntry(video);
+        if (entry) return entry;
+    }
+    return playlistEntry(video, key, blob);
+}
+
+// SHA-256 (hex) do Blob; null se o navegador não oferece crypto.subtle (só em HTTPS/localhost)
+async function blobSha256(blob) {
+    if (!(window.crypto && crypto.subtle)) return null;
+    const digest = await crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+    return Array.from(new Uint8Array(digest), byte => byte.toString(16).padStart(2, '0')).join('');
+}
+
+// Progresso dos downloads por arquivo, atualizado na tela a cada 500 ms
+function updateDownloadProgress(name, received, total) {
+    downloadProgress[name] = { received: received, total: total };
+    if (!progressRenderTimer) {
+        progressRenderTimer = setTimeout(renderDownloadProgress, 500);
+    }
+}
+
+function finishDownloadProgress(name) {
+    delete downloadProgress[name];
+    renderDownloadProgress();
+}
+
+function renderDownloadProgress() {
+    if (progressRenderTimer) clearTimeout(progressRenderTimer);
+    progressRenderTimer = null;
+    const panel = document.getElementById('download-status');
+    const names = Object.keys(downloadProgress);
+    panel.classList.toggle('hidden', names.length === 0);
+    panel.textContent = names.map(name => {
+        const { received, total } = downloadProgress[name];
+        const percent = total ? ` ${Math.floor(received * 100 / total)}%` : '';
+        return `📥 ${name}:${percent} (${(received / 1024 ** 2).toFixed(1)} MB)`;
+    }).join('\n');
+}
+
+// Trocar o vídeo de um player e liberar os URLs removidos que nenhum player usa mais
+function setPlayerSource(player, videoData) {
+    player.src = videoData.url;
+    player.load();
+    pendingRevoke.forEach(url => {
+        if (!players.some(other => other.getAttribute('src') === url)) {
+            URL.revokeObjectURL(url);
+            pendingRevoke.delete(url);
+        }
+    });
+}
+
+// Liberar o URL de um vídeo que saiu da playlist (adiado enquanto um player o usa)
+function releaseVideoUrl(url) {
+    if (players.some(player => player.getAttribute('src') === url)) {
+        pendingRevoke.add(url);
+    } else {
+        URL.revokeObjectURL(url);
+    }
+}
+
+// Reproduzir vídeo no índice especificado (sem pré-carregamento: início ou troca de playlist)
 function playVideoAtIndex(index) {
     if (downloadedBlobs.length === 0) {
         console.log('ℹ️ Nenhum vídeo disponível para reproduzir');
@@ -424,17 +895,41 @@ function playVideoAtIndex(index) {
     videoIndex = index % downloadedBlobs.length;
     
     const videoData = downloadedBlobs[videoIndex];
+    setPlayerSource(videoPlayer, videoData);
+    startPlayback(videoData);
+}
+
+// Pré-carregar no player de espera o próximo vídeo, decodificado enquanto o atual toca
+function prepareNextVideo() {
+    if (downloadedBlobs.length === 0) {
+        preparedVideo = null;
+        return;
+    }
+    preparedVideo = downloadedBlobs[nextVideoIndex()];
+    setPlayerSource(standbyPlayer, preparedVideo);
+}
+
+// Trocar os players: o de espera (já carregado) passa a ser exibido
+function swapPlayers() {
+    const previous = videoPlayer;
+    videoPlayer = standbyPlayer;
+    standbyPlayer = previous;
+    videoPlayer.classList.add('active');
+    previous.classList.remove('active');
+    previous.pause();
+}
+
+// Reproduzir o vídeo já carregado no player ativo e pré-carregar o seguinte
+function startPlayback(videoData) {
     console.log(`▶️ Reproduzindo vídeo ${videoIndex + 1}/${downloadedBlobs.length}: ${videoData.filename}`);
-    
-    videoPlayer.src = videoData.url;
-    videoPlayer.load();
+    const player = videoPlayer;
     
     // Atualizar interface
     document.getElementById('video-info').textContent = 
         `${videoData.filename} (${videoIndex + 1}/${downloadedBlobs.length})`;
     
     // Tentar reproduzir
-    const playPromise = videoPlayer.play();
+    const playPromise = player.play();
     
     if (playPromise !== undefined) {
         playPromise.then(() => {
@@ -445,7 +940,7 @@ function playVideoAtIndex(index) {
             console.warn('⚠️ Autoplay bloqueado, clique na tela para iniciar:', error);
             // Adicionar evento de clique para iniciar reprodução
             document.body.addEventListener('click', function playOnClick() {
-                videoPlayer.play().then(() => {
+                player.play().then(() => {
                     // Registrar visualização após o play manual
                     registerVisualization(videoData.id);
                 });
@@ -453,6 +948,8 @@ function playVideoAtIndex(index) {
             }, { once: true });
         });
     }
+
+    prepareNextVideo();
 }
 
 // Registrar visualização no servidor (consome crédito)
@@ -461,9 +958,9 @@ async function registerVisualization(videoId) {
         const url = `${config.serverUrl}/api/visualizacao/${videoId}`;
         const response = await fetch(url, {
             method: 'POST',
-            headers: {
+            headers: deviceHeaders({
                 'Content-Type': 'application/json'
-            },
+            }),
             body: JSON.stringify({
                 latitude: config.latitude,
                 longitude: config.longitude
@@ -493,24 +990,37 @@ function playNextVideo() {
     }
     
     console.log('⏭️ Próximo vídeo...');
-    const nextIndex = (videoIndex + 1) % downloadedBlobs.length;
-    playVideoAtIndex(nextIndex);
+    // Vídeo pré-carregado ainda na playlist: troca instantânea, sem tela preta
+    const index = preparedVideo ? downloadedBlobs.indexOf(preparedVideo) : -1;
+    if (index !== -1) {
+        videoIndex = index;
+        swapPlayers();
+        startPlayback(preparedVideo);
+    } else {
+        playVideoAtIndex(nextVideoIndex());
+    }
 }
 
 // Limpar todos os vídeos
 function clearAllVideos() {
+    // Parar reprodução (os players deixam de referenciar os blobs)
+    players.forEach(player => {
+        player.pause();
+        player.removeAttribute('src');
+        player.load();
+    });
+    preparedVideo = null;
+
     // Liberar todos os blobs
     downloadedBlobs.forEach(item => {
         URL.revokeObjectURL(item.url);
     });
+    pendingRevoke.forEach(url => URL.revokeObjectURL(url));
+    pendingRevoke.clear();
     
     downloadedBlobs = [];
     availableVideos = [];
     videoIndex = 0;
-    
-    // Parar reprodução
-    videoPlayer.src = '';
-    videoPlayer.pause();
 }
 
 // Baixar e reproduzir vídeo (mantido para compatibilidade, mas não é mais usado)
@@ -518,8 +1028,8 @@ async function downloadAndPlayVideo(video) {
     try {
         showLoading(`Baixando: ${video.original_filename}`);
         
-        const url = `${config.serverUrl}/api/download/${video.id}`;
-        const response = await fetch(url);
+        const url = videoDownloadUrl(video);
+        const response = await fetchWithRetry(url);
         
         if (!response.ok) {
             throw new Error(`Erro ao baixar vídeo: ${response.status}`);
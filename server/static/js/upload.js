@@ -0,0 +1,189 @@
+// Upload de vídeos em partes (resumível) para os formulários do admin e do cliente
+//
+// Formulários com o atributo data-chunked-upload são interceptados: o arquivo é
+// enviado em partes via /api/uploads e, se a conexão cair, o envio continua do
+// último byte confirmado pelo servidor (inclusive após recarregar a página).
+(function () {
+    const DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024;
+    const MAX_RETRIES = 8;
+    const STORAGE_PREFIX = 'upload:';
+
+    function sleep(ms) {
+        return new Promise(resolve => setTimeout(resolve, ms));
+    }
+
+    // Espera pedida pelo servidor em um 429 (segundos no Retry-After); 60 s sem o cabeçalho
+    function retryAfterMs(response) {
+        const seconds = parseInt(response.headers.get('Retry-After'), 10);
+        return (Number.isFinite(seconds) && seconds > 0 ? seconds : 60) * 1000;
+    }
+
+    // Chave para retomar o mesmo arquivo após recarregar a página
+    function uploadKey(file, fields) {
+        return STORAGE_PREFIX + [file.name, file.size, file.lastModified,
+            fields.latitude, fields.longitude, fields.radius_km].join(':');
+    }
+
+    async function requestJson(url, options) {
+        const response = await fetch(url, Object.assign({ credentials: 'same-origin' }, options));
+        let data = {};
+        try {
+            data = await response.json();
+        } catch (e) {
+            // Resposta sem JSON (ex: erro de proxy)
+        }
+        return { response, data };
+    }
+
+    async function iniciarOuRetomar(file, fields) {
+        const key = uploadKey(file, fields);
+        const savedId = localStorage.getItem(key);
+
+        if (savedId) {
+            const { response, data } = await requestJson(`/api/uploads/${savedId}`);
+            if (response.ok) {
+                console.log(`↩️ Retomando upload ${savedId} a partir de ${data.offset} bytes`);
+                return data;
+            }
+            localStorage.removeItem(key);
+        }
+
+        const { response, data } = await requestJson('/api/uploads', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(Object.assign({ filename: file.name, size: file.size }, fields))
+        });
+        if (!response.ok) {
+            throw new Error(data.error || `Erro HTTP: ${response.status}`);
+        }
+        localStorage.setItem(key, data.upload_id);
+        return data;
+    }
+
+    async function enviarPartes(file, upload, onProgress) {
+        const chunkSize = upload.chunk_size || DEFAULT_CHUNK_SIZE;
+        let offset = upload.offset;
+        let retries = 0;
+
+        onProgress(offset, file.size);
+
+        while (offset < file.size) {
+            const chunk = file.slice(offset, offset + chunkSize);
+            try {
+                const { response, data } = await requestJson(
+                    `/api/uploads/${upload.upload_id}?offset=${offset}`,
+                    {
+                        method: 'PUT',
+                        headers: { 'Content-Type': 'application/octet-stream' },
+                        body: chunk
+                    }
+                );
+                // 429: aguardar o Retry-After do servidor sem gastar tentativas
+                if (response.status === 429) {
+                    await sleep(retryAfterMs(response));
+                    continue;
+                }
+                // 409: o servidor informa o offset correto para continuar
+                if (!response.ok && response.status !== 409) {
+                    throw new Error(data.error || `Erro HTTP: ${response.status}`);
+                }
+                // 409 no mesmo offset: uma parte anterior ainda está sendo gravada
+                if (response.status === 409 && data.offset === offset) {
+                    await sleep(1000);
+                }
+                offset = data.offset;
+                retries = 0;
+                onProgress(offset, file.size);
+            } catch (error) {
+                if (++retries > MAX_RETRIES) {
+                    throw error;
+                }
+                const delay = Math.min(30000, 1000 * Math.pow(2, retries - 1));
+                console.warn(`⚠️ Falha ao enviar parte (tentativa ${retries}), nova tentativa em ${delay / 1000}s:`, error);
+                await sleep(delay);
+
+                // Sincronizar com o que o servidor realmente gravou
+                const { response, data } = await requestJson(`/api/uploads/${upload.upload_id}`);
+                if (response.ok) {
+                    offset = data.offset;
+                }
+            }
+        }
+    }
+
+    function formatBytes(bytes) {
+        if (bytes >= 1024 * 1024 * 1024) return (bytes / (1024 * 1024 * 1024)).toFixed(2) + ' GB';
+        if (bytes >= 1024 * 1024) return (bytes / (1024 * 1024)).toFixed(1) + ' MB';
+        return (bytes / 1024).toFixed(0) + ' KB';
+    }
+
+    function criarBarraProgresso(form) {
+        let container = form.querySelector('.upload-progress');
+        if (!container) {
+            container = document.createElement('div');
+            container.className = 'upload-progress mt-3';
+            container.innerHTML =
+                '<div class="progress"><div class="progress-bar progress-bar-striped progress-bar-animated" role="progressbar" style="width: 0%">0%</div></div>' +
+                '<small class="text-muted upload-progress-text"></small>';
+            form.appendChild(container);
+        }
+        const bar = container.querySelector('.progress-bar');
+        const text = container.querySelector('.upload-progress-text');
+        return function (sent, total) {
+            const percent = total ? Math.floor(sent * 100 / total) : 100;
+            bar.style.width = percent + '%';
+            bar.textContent = percent + '%';
+            text.textContent = `${formatBytes(sent)} de ${formatBytes(total)}`;
+        };
+    }
+
+    async function handleSubmit(event) {
+        const form = event.target;
+        const fileInput = form.querySelector('input[type="file"]');
+        const file = fileInput && fileInput.files[0];
+        if (!file) {
+            return; // Deixar a validação normal do formulário agir
+        }
+        event.preventDefault();
+
+        const fields = {
+            latitude: form.elements['latitude'].value,
+            longitude: form.elements['longitude'].value,
+            radius_km: form.elements['radius_km'].value
+        };
+        const submitButton = form.querySelector('button[type="submit"]');
+        if (submitButton) submitButton.disabled = true;
+        const onProgress = criarBarraProgresso(form);
+
+        try {
+            const upload = await iniciarOuRetomar(file, fields);
+            await enviarPartes(file, upload, onProgress);
+
+            const { response, data } = await requestJson(`/api/uploads/${upload.upload_id}/finalizar`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({})
+            });
+            if (!response.ok) {
+                throw new Error(data.error || `Erro HTTP: ${response.status}`);
+            }
+
+            localStorage.removeItem(uploadKey(file, fields));
+            alert(`✅ Vídeo "${file.name}" enviado com sucesso!`);
+            window.location.reload();
+        } catch (error) {
+            console.error('❌ Erro no upload:', error);
+            alert(`❌ Erro no upload: ${error.message}\nEnvie novamente o mesmo arquivo para continuar de onde parou.`);
+            if (submitButton) submitButton.disabled = false;
+        }
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        if (!window.fetch || !window.File || !File.prototype.slice) {
+            return; // Navegador antigo: usa o envio tradicional do formulário
+        }
+        document.querySelectorAll('form[data-chunked-upload]').forEach(form => {
+            form.addEventListener('submit', handleSubmit);
+        });
+    });
+})();
@@ -0,0 +1,169 @@
+// Armazenamento persistente dos vídeos do cliente web (IndexedDB)
+//
+// Cada vídeo fica guardado pelo hash SHA-256 do conteúdo informado pelo
+// servidor: recarregar a página, reiniciar o navegador ou o quiosque não
+// baixa nada de novo, e os vídeos ficam no disco em vez de na memória.
+// Vídeos que saíram da playlist continuam guardados (podem voltar quando a
+// campanha recebe créditos) até faltar espaço na cota do navegador; aí saem
+// primeiro os usados há mais tempo. O último manifest (/api/videos) também
+// fica guardado, para a tela voltar a exibir sem esperar pelo servidor.
+//
+// Durante o download, os bytes recebidos são gravados em blocos (object
+// store "chunks"); se a página fechar ou a rede cair no meio, o download
+// continua do último bloco gravado. Ao terminar, os blocos viram um único
+// registro em "videos".
+//
+// Não usa o DOM: também pode ser carregado por um service worker.
+
+const VIDEO_DB_NAME = 'propaganda';
+const VIDEO_DB_VERSION = 2;
+const STORAGE_QUOTA_FRACTION = 0.8; // Fração da cota usada pelos vídeos (folga para o navegador)
+let videoDbPromise = null;
+
+// Abrir o banco (uma vez); null se o navegador não tiver IndexedDB
+function openVideoStore() {
+    if (!videoDbPromise) {
+        videoDbPromise = new Promise(resolve => {
+            if (!self.indexedDB) {
+                resolve(null);
+                return;
+            }
+            const request = indexedDB.open(VIDEO_DB_NAME, VIDEO_DB_VERSION);
+            request.onupgradeneeded = event => {
+                const db = request.result;
+                if (event.oldVersion < 1) {
+                    db.createObjectStore('videos', { keyPath: 'key' }); // key = hash do conteúdo
+                    db.createObjectStore('meta'); // último manifest
+                }
+                if (event.oldVersion < 2) {
+                    db.createObjectStore('chunks', { keyPath: ['key', 'offset'] }); // downloads parciais
+                }
+            };
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => {
+                console.warn('⚠️ IndexedDB indisponível, vídeos só em memória:', request.error);
+                resolve(null);
+            };
+        });
+    }
+    return videoDbPromise;
+}
+
+// Executar uma operação em um object store; resolve com o resultado quando a transação termina
+async function storeRequest(storeName, mode, operation) {
+    const db = await openVideoStore();
+    if (!db) return undefined;
+    return new Promise((resolve, reject) => {
+        const transaction = db.transaction(storeName, mode);
+        const request = operation(transaction.objectStore(storeName));
+        transaction.oncomplete = () => resolve(request ? request.result : undefined);
+        transaction.onabort = () => reject(transaction.error);
+    });
+}
+
+// Registro guardado ({ key, id, filename, size, blob, lastUsed }) ou undefined
+function getStoredVideo(key) {
+    return storeRequest('videos', 'readonly', store => store.get(key));
+}
+
+// Todos os registros (os Blobs vêm como referências ao disco, não são lidos)
+async function listStoredVideos() {
+    return (await storeRequest('videos', 'readonly', store => store.getAll())) || [];
+}
+
+function deleteStoredVideo(key) {
+    return storeRequest('videos', 'readwrite', store => store.delete(key));
+}
+
+// Bytes ocupados pelos vídeos guardados (null sem IndexedDB)
+async function storedVideoBytes() {
+    if (!await openVideoStore()) return null;
+    return (await listStoredVideos()).reduce((total, record) => total + (record.size || 0), 0);
+}
+
+// Marcar os vídeos da playlist como usados agora (ordem de remoção LRU)
+function touchStoredVideos(keys) {
+    const now = Date.now();
+    return storeRequest('videos', 'readwrite', store => {
+        keys.forEach(key => {
+            const request = store.get(key);
+            request.onsuccess = () => {
+                if (request.result) {
+                    request.result.lastUsed = now;
+                    store.put(request.result);
+                }
+            };
+        });
+    });
+}
+
+// Blocos de um download parcial, na ordem do arquivo ({ key, offset, blob })
+function chunkRange(key) {
+    return IDBKeyRange.bound([key, 0], [key, Infinity]);
+}
+
+async function listVideoChunks(key) {
+    return (await storeRequest('chunks', 'readonly', store => store.getAll(chunkRange(key)))) || [];
+}
+
+function putVideoChunk(key, offset, blob) {
+    return storeRequest('chunks', 'readwrite', store => store.put({ key: key, offset: offset, blob: blob }));
+}
+
+function deleteVideoChunks(key) {
+    return storeRequest('chunks', 'readwrite', store => store.delete(chunkRange(key)));
+}
+
+// Abrir espaço para `bytesNeeded` dentro da cota: saem primeiro os downloads parciais de
+// vídeos fora de `keepKeys`, depois os vídeos fora de `keepKeys` usados há mais tempo
+async function evictStoredVideos(keepKeys, bytesNeeded) {
+    if (!self.navigator || !navigator.storage || !navigator.storage.estimate) return;
+    const { usage, quota } = await navigator.storage.estimate();
+    let excess = usage + bytesNeeded - quota * STORAGE_QUOTA_FRACTION;
+    if (excess <= 0) return;
+
+    const partials = {};
+    ((await storeRequest('chunks', 'readonly', store => store.getAll())) || [])
+        .filter(chunk => !keepKeys.has(chunk.key))
+        .forEach(chunk => { partials[chunk.key] = (partials[chunk.key] || 0) + chunk.blob.size; });
+    for (const key of Object.keys(partials)) {
+        await deleteVideoChunks(key);
+        excess -= partials[key];
+    }
+    if (excess <= 0) return;
+
+    const candidates = (await listStoredVideos())
+        .filter(record => !keepKeys.has(record.key))
+        .sort((a, b) => a.lastUsed - b.lastUsed);
+    for (const record of candidates) {
+        if (excess <= 0) break;
+        await deleteStoredVideo(record.key);
+        excess -= record.size || 0;
+        console.log(`🗑️ Removido do armazenamento: ${record.filename}`);
+    }
+    if (excess > 0) {
+        console.warn('⚠️ Cota do navegador insuficiente para os vídeos da playlist');
+    }
+}
+
+// Guardar um vídeo baixado; false se não coube (o vídeo segue só em memória)
+async function storeVideo(record, keepKeys) {
+    try {
+        await evictStoredVideos(keepKeys, record.size);
+        await storeRequest('videos', 'readwrite', store => store.put(
+            Object.assign({ lastUsed: Date.now() }, record)));
+        return true;
+    } catch (error) {
+        console.warn(`⚠️ Não foi possível guardar ${record.filename}:`, error);
+        return false;
+    }
+}
+
+// Último manifest recebido de /api/videos
+function saveLastManifest(data) {
+    return storeRequest('meta', 'readwrite', store => store.put(data, 'manifest'));
+}
+
+function loadLastManifest() {
+    return storeRequest('meta', 'readonly', store => store.get('manifest'));
+}
@@ -22,6 +22,7 @@ class TestConfig(Config):
     UPLOAD_FOLDER = 'test_uploads'
     SECRET_KEY = 'test-secret-key'
     ADMIN_PASSWORD = 'admin123'
+    MEDIA_PIPELINE_ENABLED = False  # Processamento de mídia chamado explicitamente nos testes
 
 
 @pytest.fixture
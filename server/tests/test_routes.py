@@ -3,7 +3,7 @@ Testes de integração para as rotas
 """
 import pytest
 import json
-from models import db, Video
+from models import db, Video, LogVisualizacao
 
 
 class TestAdminRoutes:
@@ -210,6 +210,539 @@ class TestAPIRoutes:
         assert 'error' in data
 
 
+class TestUploadRoutes:
+    """Testes para o upload em partes (resumível)"""
+
+    def _iniciar(self, client, conteudo, filename='video.mp4'):
+        return client.post('/api/uploads', json={
+            'filename': filename,
+            'size': len(conteudo),
+            'latitude': -23.5505,
+            'longitude': -46.6333,
+            'radius_km': 10
+        })
+
+    def test_upload_sem_autenticacao(self, client):
+        """Testa que o upload exige login"""
+        response = self._iniciar(client, b'abc')
+        assert response.status_code == 401
+
+    def test_upload_completo_em_partes(self, authenticated_admin_client, app, tmp_path):
+        """Testa init, envio de partes e finalização"""
+        import hashlib
+        app.config['UPLOAD_FOLDER'] = str(tmp_path)
+        conteudo = b'0123456789' * 1000
+
+        response = self._iniciar(authenticated_admin_client, conteudo)
+        assert response.status_code == 201
+        upload_id = response.get_json()['upload_id']
+
+        for offset in range(0, len(conteudo), 4096):
+            response = authenticated_admin_client.put(
+                f'/api/uploads/{upload_id}?offset={offset}',
+                data=conteudo[offset:offset + 4096]
+            )
+            assert response.status_code == 200
+            assert response.get_json()['offset'] == min(offset + 4096, len(conteudo))
+
+        response = authenticated_admin_client.get(f'/api/uploads/{upload_id}')
+        assert response.get_json()['progresso'] == 100.0
+
+        response = authenticated_admin_client.post(
+            f'/api/uploads/{upload_id}/finalizar',
+            json={'sha256': hashlib.sha256(conteudo).hexdigest()}
+        )
+        assert response.status_code == 201
+        video = response.get_json()['video']
+        assert video['file_size'] == len(conteudo)
+        assert video['content_hash'] == hashlib.sha256(conteudo).hexdigest()
+
+        with open(tmp_path / video['filename'], 'rb') as f:
+            assert f.read() == conteudo
+
+    def test_partes_fora_do_limite_global(self, authenticated_admin_client, app, tmp_path):
+        """Testa que um upload com mais partes que o limite por hora do IP chega ao fim"""
+        app.config['UPLOAD_FOLDER'] = str(tmp_path)
+        conteudo = b'0123456789' * 60
+        upload_id = self._iniciar(authenticated_admin_client, conteudo).get_json()['upload_id']
+
+        for offset in range(0, len(conteudo), 10):
+            response = authenticated_admin_client.put(
+                f'/api/uploads/{upload_id}?offset={offset}', data=conteudo[offset:offset + 10]
+            )
+            assert response.status_code == 200
+            assert authenticated_admin_client.get(f'/api/uploads/{upload_id}').status_code == 200
+
+        response = authenticated_admin_client.post(f'/api/uploads/{upload_id}/finalizar', json={})
+        assert response.status_code == 201
+
+    def test_upload_offset_invalido_retorna_offset_atual(self, authenticated_admin_client, app, tmp_path):
+        """Testa que um offset fora de ordem informa de onde retomar"""
+        app.config['UPLOAD_FOLDER'] = str(tmp_path)
+        conteudo = b'x' * 100
+        upload_id = self._iniciar(authenticated_admin_client, conteudo).get_json()['upload_id']
+
+        authenticated_admin_client.put(f'/api/uploads/{upload_id}?offset=0', data=conteudo[:40])
+        response = authenticated_admin_client.put(f'/api/uploads/{upload_id}?offset=80', data=conteudo[80:])
+        assert response.status_code == 409
+        assert response.get_json()['offset'] == 40
+
+    def test_finalizar_upload_incompleto(self, authenticated_admin_client, app, tmp_path):
+        """Testa que não é possível finalizar antes de receber tudo"""
+        app.config['UPLOAD_FOLDER'] = str(tmp_path)
+        upload_id = self._iniciar(authenticated_admin_client, b'x' * 100).get_json()['upload_id']
+
+        response = authenticated_admin_client.post(f'/api/uploads/{upload_id}/finalizar', json={})
+        assert response.status_code == 409
+
+
+class TestManifestRoutes:
+    """Testes para o manifest de blocos"""
+
+    def test_manifest_com_hashes_por_bloco(self, client, app, tmp_path):
+        """Testa manifest e download de um bloco com Range"""
+        import hashlib
+        app.config['UPLOAD_FOLDER'] = str(tmp_path)
+        app.config['MANIFEST_CHUNK_SIZE'] = 1000
+        conteudo = bytes(range(256)) * 10  # 2560 bytes -> 3 blocos
+        (tmp_path / 'spot.mp4').write_bytes(conteudo)
+        with app.app_context():
+            video = Video(filename='spot.mp4', original_filename='spot.mp4',
+                          latitude=0, longitude=0, radius_km=1)
+            db.session.add(video)
+            db.session.commit()
+            video_id = video.id
+
+        response = client.get(f'/api/manifest/{video_id}')
+        assert response.status_code == 200
+        manifest = response.get_json()
+        assert manifest['size'] == len(conteudo)
+        assert manifest['sha256'] == hashlib.sha256(conteudo).hexdigest()
+        assert manifest['chunks'] == [
+            hashlib.sha256(conteudo[i:i + 1000]).hexdigest() for i in range(0, len(conteudo), 1000)
+        ]
+
+        response = client.get(f'/api/download/{video_id}', headers={'Range': 'bytes=2000-2559'})
+        assert response.status_code == 206
+        assert hashlib.sha256(response.data).hexdigest() == manifest['chunks'][2]
+
+    def test_manifest_arquivo_ausente(self, client, app, tmp_path):
+        """Testa manifest de vídeo cujo arquivo sumiu"""
+        app.config['UPLOAD_FOLDER'] = str(tmp_path)
+        with app.app_context():
+            video = Video(filename='sumiu.mp4', original_filename='sumiu.mp4',
+                          latitude=0, longitude=0, radius_km=1)
+            db.session.add(video)
+            db.session.commit()
+            video_id = video.id
+
+        response = client.get(f'/api/manifest/{video_id}')
+        assert response.status_code == 404
+
+
+class TestRolloutRoutes:
+    """Testes para a liberação escalonada e o limite de downloads"""
+
+    def _criar_video(self, app, **kwargs):
+        with app.app_context():
+            video = Video(filename='spot.mp4', original_filename='spot.mp4', latitude=0,
+                          longitude=0, radius_km=10, aprovado=True, pago=True,
+                          creditos=10, **kwargs)
+            db.session.add(video)
+            db.session.commit()
+            return video.id
+
+    def test_video_recem_aprovado_escalonado_por_tela(self, client, app):
+        """Testa que cada tela recebe o vídeo novo em um momento diferente da janela"""
+        from datetime import datetime
+        app.config['ROLLOUT_WINDOW'] = 3600
+        self._criar_video(app, liberado_em=datetime.utcnow())
+
+        liberados = 0
+        for tela in range(20):
+            response = client.get('/api/videos?latitude=0&longitude=0',
+                                  headers={'X-Device-Id': f'tela-{tela}'})
+            data = response.get_json()
+            if data['count']:
+                liberados += 1
+            else:
+                assert 0 < data['proxima_liberacao'] <= 3601
+        assert liberados < 20
+
+        # Mesma tela, mesma resposta
+        primeira = client.get('/api/videos?latitude=0&longitude=0',
+                              headers={'X-Device-Id': 'tela-1'}).get_json()
+        segunda = client.get('/api/videos?latitude=0&longitude=0',
+                             headers={'X-Device-Id': 'tela-1'}).get_json()
+        assert primeira['count'] == segunda['count']
+
+        app.config['ROLLOUT_WINDOW'] = 0
+        data = client.get('/api/videos?latitude=0&longitude=0',
+                          headers={'X-Device-Id': 'tela-1'}).get_json()
+        assert data['count'] == 1
+        assert data['proxima_liberacao'] is None
+
+    def test_download_saturado_retorna_503(self, client, app, tmp_path):
+        """Testa 503 com Retry-After quando todos os slots de download estão ocupados"""
+        from services import RolloutService
+        app.config['UPLOAD_FOLDER'] = str(tmp_path)
+        app.config['DOWNLOAD_MAX_CONCURRENT'] = 1
+        (tmp_path / 'spot.mp4').write_bytes(b'0123456789')
+        video_id = self._criar_video(app)
+
+        with app.app_context():
+            slots = RolloutService.download_slots()
+        assert slots.adquirir()
+
+        response = client.get(f'/api/download/{video_id}')
+        assert response.status_code == 503
+        assert int(response.headers['Retry-After']) >= app.config['DOWNLOAD_RETRY_AFTER']
+
+        slots.liberar()
+        response = client.get(f'/api/download/{video_id}')
+        assert response.status_code == 200
+        assert response.data == b'0123456789'
+        response.close()
+        assert slots.ativos == 0
+
+
+class TestPrefetchRoutes:
+    """Testes para campanhas com início agendado"""
+
+    def test_video_agendado_vai_para_prefetch(self, client, app):
+        """Testa que o vídeo futuro aparece só no pré-download, com o início como próxima liberação"""
+        from datetime import datetime, timedelta
+        app.config['ROLLOUT_WINDOW'] = 0
+        with app.app_context():
+            db.session.add_all([
+                Video(filename='agora.mp4', original_filename='agora.mp4', latitude=0, longitude=0,
+                      radius_km=10, aprovado=True, pago=True, creditos=10),
+                Video(filename='amanha.mp4', original_filename='amanha.mp4', latitude=0, longitude=0,
+                      radius_km=10, aprovado=True, pago=True, creditos=10,
+                      inicio_em=datetime.utcnow() + timedelta(days=1)),
+                Video(filename='longe.mp4', original_filename='longe.mp4', latitude=0, longitude=0,
+                      radius_km=10, aprovado=True, pago=True, creditos=10,
+                      inicio_em=datetime.utcnow() + timedelta(days=30)),
+            ])
+            db.session.commit()
+
+        data = client.get('/api/videos?latitude=0&longitude=0').get_json()
+        assert [v['filename'] for v in data['videos']] == ['agora.mp4']
+        assert [v['filename'] for v in data['prefetch']] == ['amanha.mp4']
+        assert data['prefetch'][0]['inicio_em']
+        assert 86000 < data['proxima_liberacao'] <= 86401
+
+    def test_admin_agenda_inicio(self, authenticated_admin_client, app):
+        """Testa agendar e remover o início de um vídeo"""
+        with app.app_context():
+            video = Video(filename='spot.mp4', original_filename='spot.mp4', latitude=0,
+                          longitude=0, radius_km=10)
+            db.session.add(video)
+            db.session.commit()
+            video_id = video.id
+
+        authenticated_admin_client.post(f'/admin/agendar/{video_id}',
+                                        data={'inicio_em': '2030-01-02T08:30'})
+        with app.app_context():
+            assert db.session.get(Video, video_id).inicio_em.isoformat() == '2030-01-02T08:30:00'
+
+        authenticated_admin_client.post(f'/admin/agendar/{video_id}',
+                                        data={'inicio_em': '2030-01-02T08:30',
+                                              'fim_em': '2030-01-01T00:00'})
+        with app.app_context():
+            assert db.session.get(Video, video_id).fim_em is None  # fim antes do início
+
+        authenticated_admin_client.post(f'/admin/agendar/{video_id}',
+                                        data={'inicio_em': '', 'fim_em': '2030-02-01T00:00'})
+        with app.app_context():
+            video = db.session.get(Video, video_id)
+            assert video.inicio_em is None
+            assert video.fim_em.isoformat() == '2030-02-01T00:00:00'
+
+    def test_pesos_e_fim_de_campanha(self, client, app):
+        """Testa pesos na lista, vídeo encerrado fora dela e a próxima mudança no fim"""
+        from datetime import datetime, timedelta
+        app.config['ROLLOUT_WINDOW'] = 0
+        with app.app_context():
+            db.session.add_all([
+                Video(filename='urgente.mp4', original_filename='urgente.mp4', latitude=0,
+                      longitude=0, radius_km=10, aprovado=True, pago=True, creditos=100,
+                      fim_em=datetime.utcnow() + timedelta(hours=2)),
+                Video(filename='normal.mp4', original_filename='normal.mp4', latitude=0,
+                      longitude=0, radius_km=10, aprovado=True, pago=True, creditos=100),
+                Video(filename='encerrado.mp4', original_filename='encerrado.mp4', latitude=0,
+                      longitude=0, radius_km=10, aprovado=True, pago=True, creditos=100,
+                      fim_em=datetime.utcnow() - timedelta(hours=1)),
+            ])
+            db.session.commit()
+
+        data = client.get('/api/videos?latitude=0&longitude=0').get_json()
+        videos = {v['filename']: v for v in data['videos']}
+        assert set(videos) == {'urgente.mp4', 'normal.mp4'}
+        assert videos['urgente.mp4']['peso'] == 1.0
+        assert videos['normal.mp4']['peso'] < videos['urgente.mp4']['peso']
+        assert 7000 < data['proxima_liberacao'] <= 7201
+
+    def test_proxima_liberacao_nunca_negativa(self, client, app, monkeypatch):
+        """Testa que um fim de campanha que passou durante a requisição vale como imediato"""
+        from datetime import datetime, timedelta
+        from routes import api
+
+        app.config['ROLLOUT_WINDOW'] = 0
+        with app.app_context():
+            db.session.add(Video(filename='fim.mp4', original_filename='fim.mp4', latitude=0,
+                                 longitude=0, radius_km=10, aprovado=True, pago=True,
+                                 creditos=100, fim_em=datetime.utcnow() + timedelta(hours=1)))
+            db.session.commit()
+
+        class Depois(datetime):
+            @classmethod
+            def utcnow(cls):
+                return datetime.utcnow() + timedelta(hours=2)
+
+        # O relógio da rota já passou do fim; o da consulta ainda não
+        monkeypatch.setattr(api, 'datetime', Depois)
+        data = client.get('/api/videos?latitude=0&longitude=0').get_json()
+        assert [v['filename'] for v in data['videos']] == ['fim.mp4']
+        assert data['proxima_liberacao'] == 1
+
+
+class TestVisualizacoesLoteRoutes:
+    """Testes para o envio de exibições em lote pelas telas"""
+
+    def _video(self, app, creditos=10):
+        with app.app_context():
+            video = Video(filename='spot.mp4', original_filename='spot.mp4', latitude=0,
+                          longitude=0, radius_km=10, aprovado=True, pago=True, creditos=creditos)
+            db.session.add(video)
+            db.session.commit()
+            return video.id
+
+    def _tela(self, client, device_id='tela-1'):
+        """Registra uma tela e devolve os cabeçalhos autenticados dela"""
+        token = client.post('/api/dispositivos', json={'device_id': device_id}).get_json()['token']
+        return {'X-Device-Id': device_id, 'X-Device-Token': token}
+
+    def test_lote_idempotente(self, client, app):
+        """Testa que reenviar o mesmo lote não consome crédito de novo"""
+        video_id = self._video(app)
+        eventos = [
+            {'id': 'e1', 'video_id': video_id, 'visualizado_em': '2025-01-02T03:04:05'},
+            {'id': 'e2', 'video_id': video_id},
+            {'id': 'e3', 'video_id': 9999},
+        ]
+
+        headers = self._tela(client)
+        response = client.post('/api/visualizacoes', json={'eventos': eventos}, headers=headers)
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['aceitos'] == 2
+        assert [r['status'] for r in data['resultados']] == ['ok', 'ok', 'recusado']
+
+        data = client.post('/api/visualizacoes', json={'eventos': eventos},
+                           headers=headers).get_json()
+        assert data['aceitos'] == 0
+        assert [r['status'] for r in data['resultados']] == ['duplicado', 'duplicado', 'recusado']
+
+        with app.app_context():
+            video = db.session.get(Video, video_id)
+            assert video.creditos == 8
+            assert video.visualizacoes == 2
+            log = LogVisualizacao.query.filter_by(evento_id='e1').one()
+            assert log.device_id == 'tela-1'
+            assert log.visualizado_em.isoformat() == '2025-01-02T03:04:05'
+
+    def test_lote_converte_horario_com_fuso_para_utc(self, client, app):
+        """Testa que horários com fuso são gravados em UTC"""
+        video_id = self._video(app)
+        eventos = [
+            {'id': 'e1', 'video_id': video_id, 'visualizado_em': '2025-01-02T03:04:05-03:00'},
+            {'id': 'e2', 'video_id': video_id, 'visualizado_em': '2025-01-02T03:04:05Z'},
+        ]
+
+        data = client.post('/api/visualizacoes', json={'eventos': eventos},
+                           headers=self._tela(client)).get_json()
+        assert data['aceitos'] == 2
+        with app.app_context():
+            log = LogVisualizacao.query.filter_by(evento_id='e1').one()
+            assert log.visualizado_em.isoformat() == '2025-01-02T06:04:05'
+            log = LogVisualizacao.query.filter_by(evento_id='e2').one()
+            assert log.visualizado_em.isoformat() == '2025-01-02T03:04:05'
+
+    def test_lote_para_nos_creditos(self, client, app):
+        """Testa que o lote recusa as exibições além dos créditos e pausa o vídeo"""
+        video_id = self._video(app, creditos=1)
+        eventos = [{'id': f'e{i}', 'video_id': video_id} for i in range(3)]
+
+        data = client.post('/api/visualizacoes', json={'eventos': eventos},
+                           headers=self._tela(client)).get_json()
+        assert [r['status'] for r in data['resultados']] == ['ok', 'recusado', 'recusado']
+        with app.app_context():
+            assert db.session.get(Video, video_id).pausado
+
+    def test_lote_invalido(self, client, app):
+        """Testa corpo inválido e lote acima do limite"""
+        headers = self._tela(client)
+        assert client.post('/api/visualizacoes', json={}, headers=headers).status_code == 400
+        app.config['VISUALIZACOES_LOTE_MAX'] = 2
+        eventos = [{'id': f'e{i}', 'video_id': 1} for i in range(3)]
+        response = client.post('/api/visualizacoes', json={'eventos': eventos}, headers=headers)
+        assert response.status_code == 413
+
+    def test_lote_exige_token(self, client, app):
+        """Testa que lotes sem token válido são recusados sem consumir créditos"""
+        video_id = self._video(app)
+        eventos = [{'id': 'e1', 'video_id': video_id}]
+        headers = self._tela(client)
+
+        assert client.post('/api/visualizacoes', json={'eventos': eventos}).status_code == 401
+        response = client.post('/api/visualizacoes', json={'eventos': eventos},
+                               headers={'X-Device-Id': 'tela-1', 'X-Device-Token': 'x'})
+        assert response.status_code == 401
+        with app.app_context():
+            assert db.session.get(Video, video_id).creditos == 10
+
+        response = client.post('/api/visualizacoes', json={'eventos': eventos}, headers=headers)
+        assert response.status_code == 200
+
+    def test_limite_por_tela(self, client, app):
+        """Testa que o limite de lotes conta por tela, não pelo IP"""
+        app.config['VISUALIZACOES_LOTE_LIMITE'] = '2 per hour'
+        tela_a = self._tela(client, 'tela-limite-a')
+        tela_b = self._tela(client, 'tela-limite-b')
+
+        status = [client.post('/api/visualizacoes', json={'eventos': []}, headers=tela_a).status_code
+                  for _ in range(3)]
+        assert status == [200, 200, 429]
+        assert client.post('/api/visualizacoes', json={'eventos': []},
+                           headers=tela_b).status_code == 200
+
+
+
+class TestDispositivoRoutes:
+    """Testes para o registro de telas, heartbeats e a visão da frota"""
+
+    def test_registro_heartbeat_e_frota(self, client, app):
+        """Testa registro, heartbeat autenticado e telemetria na visão do admin"""
+        app.config['HEARTBEAT_FLUSH_INTERVAL'] = 0
+        response = client.post('/api/dispositivos', json={'device_id': 'tela-1', 'tipo': 'desktop'})
+        assert response.status_code == 201
+        token = response.get_json()['token']
+
+        assert client.post('/api/dispositivos', json={'device_id': 'tela-1'}).status_code == 409
+
+        headers = {'X-Device-Id': 'tela-1', 'X-Device-Token': token}
+        response = client.post('/api/heartbeat', headers=headers, json={
+            'versao': '1.2', 'playlist': 'abcdef123456', 'cache_bytes': 5 * 1024 ** 3,
+            'quadros_descartados': 7,
+        })
+        assert response.status_code == 200
+        assert response.get_json()['heartbeat_interval'] == app.config['HEARTBEAT_INTERVAL']
+
+        response = client.post('/api/heartbeat', json={},
+                               headers={'X-Device-Id': 'tela-1', 'X-Device-Token': 'x'})
+        assert response.status_code == 401
+
+        with client.session_transaction() as session:
+            session['admin_logged_in'] = True
+        html = client.get('/admin/telas').get_data(as_text=True)
+        assert 'tela-1' in html
+        assert 'abcdef12' in html
+        assert '5.0 GB' in html
+
+    def test_chave_de_registro(self, client, app):
+        """Testa que, com DEVICE_REGISTRATION_KEY, o registro exige a chave"""
+        app.config['DEVICE_REGISTRATION_KEY'] = 'segredo'
+        assert client.post('/api/dispositivos', json={'device_id': 'tela-1'}).status_code == 403
+        response = client.post('/api/dispositivos', json={'device_id': 'tela-1'},
+                               headers={'X-Registration-Key': 'segredo'})
+        assert response.status_code == 201
+
+    def test_heartbeat_tem_limite_por_tela(self, client, app):
+        """Testa que telas atrás do mesmo IP não dividem o limite de heartbeats"""
+        app.config['HEARTBEAT_LIMITE'] = '2 per hour'
+        telas = []
+        for device_id in ('tela-nat-a', 'tela-nat-b'):
+            token = client.post('/api/dispositivos', json={'device_id': device_id}).get_json()['token']
+            telas.append({'X-Device-Id': device_id, 'X-Device-Token': token})
+
+        status = [client.post('/api/heartbeat', json={}, headers=telas[0]).status_code
+                  for _ in range(3)]
+        assert status == [200, 200, 429]
+        assert client.post('/api/heartbeat', json={}, headers=telas[1]).status_code == 200
+
+    def test_limite_por_tela_so_com_chave_de_registro(self, client, app):
+        """Testa que, com registro livre, o rate limit continua por IP"""
+        from app import chave_limite
+
+        token = client.post('/api/dispositivos', json={'device_id': 'tela-1'}).get_json()['token']
+        headers = {'X-Device-Id': 'tela-1', 'X-Device-Token': token}
+        with app.test_request_context(headers=headers):
+            assert chave_limite() == '127.0.0.1'
+            app.config['DEVICE_REGISTRATION_KEY'] = 'segredo'
+            assert chave_limite() == 'tela:tela-1'
+
+    def test_remover_tela_revoga_token(self, authenticated_admin_client, app):
+        """Testa que a tela removida perde o acesso e pode se registrar de novo"""
+        client = authenticated_admin_client
+        token = client.post('/api/dispositivos', json={'device_id': 'tela-1'}).get_json()['token']
+        with app.app_context():
+            from models import Dispositivo
+            dispositivo_id = Dispositivo.query.one().id
+
+        client.post(f'/admin/telas/{dispositivo_id}/remover')
+        response = client.post('/api/heartbeat', json={},
+                               headers={'X-Device-Id': 'tela-1', 'X-Device-Token': token})
+        assert response.status_code == 401
+        assert client.post('/api/dispositivos', json={'device_id': 'tela-1'}).status_code == 201
+
+
+class TestPreviewRoutes:
+    """Testes para o preview de revisão do admin"""
+
+    def test_preview_suporta_range(self, authenticated_admin_client, app, tmp_path):
+        """Testa que o proxy é servido inline com HTTP Range"""
+        app.config['UPLOAD_FOLDER'] = str(tmp_path)
+        (tmp_path / 'previews').mkdir()
+        (tmp_path / 'previews' / 'spot.mp4').write_bytes(bytes(range(256)) * 4)
+        with app.app_context():
+            video = Video(filename='spot.mp4', original_filename='spot.mp4',
+                          latitude=0, longitude=0, radius_km=1, preview='previews/spot.mp4')
+            db.session.add(video)
+            db.session.commit()
+            video_id = video.id
+
+        response = authenticated_admin_client.get(
+            f'/admin/preview/{video_id}', headers={'Range': 'bytes=10-19'}
+        )
+        assert response.status_code == 206
+        assert response.data == bytes(range(10, 20))
+        assert 'attachment' not in response.headers.get('Content-Disposition', '')
+
+    def test_preview_sem_autenticacao(self, client):
+        """Testa que o preview exige login de admin"""
+        response = client.get('/admin/preview/1')
+        assert response.status_code == 302
+
+
+class TestClienteWebRoutes:
+    """Testes para o visualizador web (/client)"""
+
+    def test_client_page(self, client):
+        """Testa a página do visualizador com o armazenamento de vídeos"""
+        response = client.get('/client')
+        assert response.status_code == 200
+        assert b'video-store.js' in response.data
+
+    def test_service_worker(self, client):
+        """Testa o service worker servido na raiz, sem cache HTTP"""
+        response = client.get('/client-sw.js')
+        assert response.status_code == 200
+        assert response.mimetype == 'application/javascript'
+        assert response.headers['Cache-Control'] == 'no-cache'
+        assert b'/api/videos' in response.data
+
+
 class TestErrorHandlers:
     """Testes para error handlers"""
     
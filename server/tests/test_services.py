@@ -2,7 +2,7 @@
 Testes para os services
 """
 import pytest
-from services import VideoService, ClienteService, AuthService
+from services import VideoService, ClienteService, AuthService, UploadService, MediaService
 from models import db, Video, Cliente
 
 
@@ -143,6 +143,20 @@ class TestVideoService:
             videos = VideoService.get_videos_by_location(0, 0)
             assert len(videos) == 0
 
+    def test_get_videos_by_location_ignora_midia_invalida(self, app):
+        """Testa que vídeos com mídia inválida ficam fora da playlist"""
+        with app.app_context():
+            for filename, media_status in [('ok.mp4', 'ok'), ('antigo.mp4', None),
+                                           ('invalido.mp4', 'invalido')]:
+                db.session.add(Video(filename=filename, original_filename=filename,
+                                     latitude=0, longitude=0, radius_km=10, aprovado=True,
+                                     pago=True, pausado=False, creditos=10,
+                                     media_status=media_status))
+            db.session.commit()
+
+            videos = VideoService.get_videos_by_location(0, 0)
+            assert sorted(v.filename for v in videos) == ['antigo.mp4', 'ok.mp4']
+
 
 class TestClienteService:
     """Testes para ClienteService"""
@@ -297,3 +311,527 @@ class TestAuthService:
         
         assert AuthService.verify_password(senha, hash_senha) == True
         assert AuthService.verify_password('outra_senha', hash_senha) == False
+
+
+class TestUploadService:
+    """Testes para UploadService"""
+
+    def test_hash_reconstruido_apos_reinicio(self, app, tmp_path):
+        """Testa que o hash é reconstruído do arquivo parcial se o estado em memória se perder"""
+        import hashlib
+        import io
+        from services import upload_service
+
+        with app.app_context():
+            app.config['UPLOAD_FOLDER'] = str(tmp_path)
+            conteudo = b'abcdef' * 500
+            upload, error = UploadService.iniciar_upload('spot.mp4', len(conteudo), 0, 0, 5)
+            assert error is None
+
+            success, _ = UploadService.receber_parte(upload, 0, io.BytesIO(conteudo[:1000]))
+            assert success
+
+            # Simular reinício do processo
+            upload_service._hashers.clear()
+
+            success, _ = UploadService.receber_parte(upload, 1000, io.BytesIO(conteudo[1000:]))
+            assert success
+
+            video, error = UploadService.finalizar_upload(upload)
+            assert error is None
+            assert video.content_hash == hashlib.sha256(conteudo).hexdigest()
+
+    def test_conexao_interrompida_no_meio_da_parte(self, app, tmp_path):
+        """Testa que os bytes recebidos antes da queda contam e o hash final confere"""
+        import hashlib
+        import io
+
+        class StreamInterrompido:
+            def __init__(self, data):
+                self.data = data
+
+            def read(self, size=-1):
+                if not self.data:
+                    raise IOError('conexão encerrada pelo cliente')
+                data, self.data = self.data, b''
+                return data
+
+        with app.app_context():
+            app.config['UPLOAD_FOLDER'] = str(tmp_path)
+            conteudo = b'0123456789' * 400
+            upload, error = UploadService.iniciar_upload('spot.mp4', len(conteudo), 0, 0, 5)
+            assert error is None
+
+            with pytest.raises(IOError):
+                UploadService.receber_parte(upload, 0, StreamInterrompido(conteudo[:1500]))
+            assert upload.bytes_recebidos == 1500
+
+            success, _ = UploadService.receber_parte(upload, 1500, io.BytesIO(conteudo[1500:]))
+            assert success
+
+            video, error = UploadService.finalizar_upload(
+                upload, sha256=hashlib.sha256(conteudo).hexdigest()
+            )
+            assert error is None
+            assert video.content_hash == hashlib.sha256(conteudo).hexdigest()
+
+    def test_uma_parte_por_vez(self, app, tmp_path):
+        """Testa que uma parte enviada durante outra do mesmo upload é recusada"""
+        import io
+
+        with app.app_context():
+            app.config['UPLOAD_FOLDER'] = str(tmp_path)
+            upload, _ = UploadService.iniciar_upload('spot.mp4', 100, 0, 0, 5)
+
+            lock = UploadService._lock_parte(upload.id)
+            with lock:
+                success, error = UploadService.receber_parte(upload, 0, io.BytesIO(b'x' * 100))
+            assert not success
+            assert 'Outra parte' in error
+            assert upload.bytes_recebidos == 0
+
+            success, _ = UploadService.receber_parte(upload, 0, io.BytesIO(b'x' * 100))
+            assert success
+
+    def test_uploads_do_mesmo_arquivo_nao_compartilham_destino(self, app, tmp_path):
+        """Testa que dois uploads do mesmo nome, no mesmo segundo, têm arquivos distintos"""
+        with app.app_context():
+            app.config['UPLOAD_FOLDER'] = str(tmp_path)
+            primeiro, _ = UploadService.iniciar_upload('spot.mp4', 100, 0, 0, 5)
+            segundo, _ = UploadService.iniciar_upload('spot.mp4', 100, 0, 0, 5)
+            assert primeiro.filename != segundo.filename
+
+    def test_iniciar_upload_extensao_invalida(self, app, tmp_path):
+        """Testa validação de extensão no início do upload"""
+        with app.app_context():
+            app.config['UPLOAD_FOLDER'] = str(tmp_path)
+            upload, error = UploadService.iniciar_upload('arquivo.exe', 100, 0, 0, 5)
+            assert upload is None
+            assert 'não permitido' in error
+
+
+def _gerar_video(path, frames=30, size=(320, 240), fps=25):
+    """Gera um vídeo sintético com OpenCV"""
+    cv2 = pytest.importorskip('cv2')
+    import numpy as np
+
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), fps, size)
+    for i in range(frames):
+        writer.write(np.full((size[1], size[0], 3), (i * 8) % 256, np.uint8))
+    writer.release()
+
+
+class TestMediaService:
+    """Testes para MediaService (probe e thumbnails)"""
+
+    def _criar_video(self, filename):
+        video = Video(filename=filename, original_filename=filename,
+                      latitude=0, longitude=0, radius_km=10)
+        db.session.add(video)
+        db.session.commit()
+        return video
+
+    def test_processar_video_valido(self, app, tmp_path):
+        """Testa extração de metadados e thumbnails"""
+        _gerar_video(tmp_path / 'ok.avi', frames=50, fps=25)
+        with app.app_context():
+            app.config['UPLOAD_FOLDER'] = str(tmp_path)
+            video = self._criar_video('ok.avi')
+
+            status = MediaService.processar_video(video.id)
+
+            assert status == 'ok'
+            assert (video.largura, video.altura) == (320, 240)
+            assert video.fps == 25
+            assert video.total_frames == 50
+            assert video.duracao == 2.0
+            assert (tmp_path / video.thumbnail).exists()
+
+    def test_container_sem_total_de_frames(self, app, tmp_path, monkeypatch):
+        """Testa thumbnails de um container que informa 0 frames (total contado pelo probe)"""
+        import types
+        from services import media_service
+
+        _gerar_video(tmp_path / 'sem_total.avi', frames=40, fps=20)
+        cv2 = media_service.cv2
+
+        class CaptureSemTotal:
+            def __init__(self, path):
+                self.cap = cv2.VideoCapture(path)
+
+            def get(self, prop):
+                return 0 if prop == cv2.CAP_PROP_FRAME_COUNT else self.cap.get(prop)
+
+            def __getattr__(self, nome):
+                return getattr(self.cap, nome)
+
+        falso = types.SimpleNamespace(**{n: getattr(cv2, n) for n in dir(cv2) if not n.startswith('_')})
+        falso.VideoCapture = CaptureSemTotal
+        monkeypatch.setattr(media_service, 'cv2', falso)
+
+        with app.app_context():
+            app.config['UPLOAD_FOLDER'] = str(tmp_path)
+            app.config['PREVIEW_ENABLED'] = False
+            video = self._criar_video('sem_total.avi')
+
+            assert MediaService.processar_video(video.id) == 'ok'
+            assert video.total_frames == 40
+            assert video.thumbnail and (tmp_path / video.thumbnail).exists()
+
+    def test_processar_video_corrompido(self, app, tmp_path):
+        """Testa que um arquivo que não decodifica é marcado como inválido"""
+        pytest.importorskip('cv2')
+        (tmp_path / 'ruim.mp4').write_bytes(b'nao sou um video' * 100)
+        with app.app_context():
+            app.config['UPLOAD_FOLDER'] = str(tmp_path)
+            video = self._criar_video('ruim.mp4')
+
+            assert MediaService.processar_video(video.id) == 'invalido'
+
+            success, message = VideoService.aprovar_video(video.id)
+            assert success == False
+            assert 'inválido' in message.lower()
+
+    def test_resolucao_acima_do_limite(self, app, tmp_path):
+        """Testa validação de resolução máxima"""
+        _gerar_video(tmp_path / 'grande.avi', size=(640, 480))
+        with app.app_context():
+            app.config['UPLOAD_FOLDER'] = str(tmp_path)
+            app.config['MEDIA_MAX_WIDTH'] = 320
+            video = self._criar_video('grande.avi')
+
+            assert MediaService.processar_video(video.id) == 'invalido'
+            assert 'Resolução' in video.media_erro
+
+    def test_parse_ladder(self):
+        """Testa interpretação da escada de transcode"""
+        degraus = MediaService.parse_ladder('1080p:1920x1080@30:6000, 720p:1280x720@25:3000')
+        assert degraus[1] == {
+            'label': '720p', 'largura': 1280, 'altura': 720, 'fps': 25.0, 'bitrate_kbps': 3000
+        }
+        with pytest.raises(ValueError):
+            MediaService.parse_ladder('720p:1280')
+
+    def test_transcode_gera_variantes_menores(self, app, tmp_path):
+        """Testa geração de variantes (fallback OpenCV) sem aumentar a resolução"""
+        _gerar_video(tmp_path / 'hd.avi', frames=20, size=(640, 360), fps=30)
+        with app.app_context():
+            app.config['UPLOAD_FOLDER'] = str(tmp_path)
+            app.config['TRANSCODE_ENABLED'] = True
+            app.config['TRANSCODE_FFMPEG'] = 'ffmpeg-inexistente'
+            app.config['TRANSCODE_LADDER'] = '720p:1280x720@30:3000,180p:320x180@15:300'
+            video = self._criar_video('hd.avi')
+
+            assert MediaService.processar_video(video.id) == 'ok'
+
+            assert [v.label for v in video.variants] == ['180p']
+            variant = video.variants[0]
+            assert (variant.largura, variant.altura) == (320, 180)
+            assert variant.content_hash
+            assert (tmp_path / variant.filename).exists()
+            assert video.to_dict()['variants'][0]['label'] == '180p'
+
+    def test_gerar_preview_e_sprite(self, app, tmp_path):
+        """Testa geração do proxy de revisão e do sprite em grade"""
+        cv2 = pytest.importorskip('cv2')
+        _gerar_video(tmp_path / 'revisao.avi', frames=30, size=(640, 360))
+        with app.app_context():
+            app.config['UPLOAD_FOLDER'] = str(tmp_path)
+            app.config['TRANSCODE_FFMPEG'] = 'ffmpeg-inexistente'
+            app.config['SPRITE_FRAMES'] = 7
+            app.config['SPRITE_COLUMNS'] = 3
+            video = self._criar_video('revisao.avi')
+
+            assert MediaService.processar_video(video.id) == 'ok'
+
+            assert video.sprite_frames == 7
+            sprite = cv2.imread(str(tmp_path / video.sprite))
+            tile_w = 90 * 640 // 360
+            assert sprite.shape[:2] == (3 * 90, 3 * tile_w)
+
+            cap = cv2.VideoCapture(str(tmp_path / video.preview))
+            assert cap.get(cv2.CAP_PROP_FRAME_WIDTH) == 480
+            cap.release()
+
+
+    def test_preview_proxy_vazio(self, app, tmp_path):
+        """Testa que PREVIEW_PROXY vazio gera só o sprite e não invalida o vídeo"""
+        _gerar_video(tmp_path / 'sem_proxy.avi', frames=20)
+        with app.app_context():
+            app.config['UPLOAD_FOLDER'] = str(tmp_path)
+            app.config['PREVIEW_PROXY'] = ''
+            video = self._criar_video('sem_proxy.avi')
+
+            assert MediaService.processar_video(video.id) == 'ok'
+            assert video.sprite
+            assert video.preview is None
+
+class TestStorageService:
+    """Testes para os backends de armazenamento"""
+
+    def test_local_save_range_delete(self, tmp_path):
+        """Testa gravação com hash, leitura de intervalo e remoção no disco local"""
+        import hashlib
+        import io
+        from services.storage_service import LocalStorage
+
+        storage = LocalStorage(str(tmp_path))
+        conteudo = bytes(range(256)) * 100
+        hasher = hashlib.sha256()
+
+        assert storage.save('variants/v.mp4', io.BytesIO(conteudo), hasher) == len(conteudo)
+        assert hasher.hexdigest() == hashlib.sha256(conteudo).hexdigest()
+        assert storage.size('variants/v.mp4') == len(conteudo)
+        assert b''.join(storage.read_range('variants/v.mp4', 100, 4099)) == conteudo[100:4100]
+
+        storage.delete('variants/v.mp4')
+        assert not storage.exists('variants/v.mp4')
+
+    def test_output_file_atomico(self, tmp_path):
+        """Testa que o arquivo só aparece na chave se a geração terminar sem erro"""
+        from services.storage_service import LocalStorage
+
+        storage = LocalStorage(str(tmp_path))
+        with pytest.raises(RuntimeError):
+            with storage.output_file('previews/p.mp4') as path:
+                open(path, 'wb').write(b'parcial')
+                raise RuntimeError('falhou')
+        assert not storage.exists('previews/p.mp4')
+        assert list((tmp_path / 'previews').iterdir()) == []
+
+        with storage.output_file('previews/p.mp4') as path:
+            assert path.endswith('.mp4')
+            open(path, 'wb').write(b'ok')
+        assert (tmp_path / 'previews' / 'p.mp4').read_bytes() == b'ok'
+
+    def test_send_generico_com_range(self, app, tmp_path):
+        """Testa o envio por streaming (usado pelos backends remotos) com Range"""
+        from services.storage_service import LocalStorage, StorageBackend
+
+        storage = LocalStorage(str(tmp_path))
+        (tmp_path / 'v.mp4').write_bytes(b'0123456789')
+
+        with app.test_request_context(headers={'Range': 'bytes=2-5'}):
+            response = StorageBackend.send(storage, 'v.mp4', download_name='spot.mp4')
+            assert response.status_code == 206
+            assert response.headers['Content-Range'] == 'bytes 2-5/10'
+            assert b''.join(response.response) == b'2345'
+            assert 'spot.mp4' in response.headers['Content-Disposition']
+
+        with app.test_request_context(headers={'Range': 'bytes=20-30'}):
+            assert StorageBackend.send(storage, 'v.mp4').status_code == 416
+
+    def test_s3_compativel(self, app, tmp_path):
+        """Testa o backend S3 contra um bucket simulado pelo moto (sem rede)"""
+        import io
+        import os
+        import boto3
+        from moto import mock_aws
+        from services.storage_service import S3Storage
+
+        with mock_aws():
+            boto3.client('s3', region_name='us-east-1').create_bucket(Bucket='propaganda-test')
+            storage = S3Storage(
+                bucket='propaganda-test',
+                region='us-east-1',
+                access_key='teste',
+                secret_key='teste',
+                prefix='pytest',
+            )
+
+            assert storage.save('v.mp4', io.BytesIO(b'0123456789')) == 10
+            assert storage.exists('v.mp4')
+            assert not storage.exists('outro.mp4')
+            assert storage.size('v.mp4') == 10
+            assert b''.join(storage.read_range('v.mp4', 2, 5)) == b'2345'
+            with app.test_request_context():
+                assert 'X-Amz-Signature' in storage.url('v.mp4', download_name='spot.mp4')
+
+            arquivo = tmp_path / 'novo.mp4'
+            arquivo.write_bytes(b'abc')
+            storage.put_file('variants/novo_720p.mp4', str(arquivo))
+            assert not arquivo.exists()
+            storage.move('v.mp4', 'quarentena/v.mp4')
+            assert sorted((chave, tamanho) for chave, tamanho, _ in storage.iter_files()) == [
+                (os.path.join('quarentena', 'v.mp4'), 10),
+                (os.path.join('variants', 'novo_720p.mp4'), 3),
+            ]
+
+            with storage.local_file('variants/novo_720p.mp4') as path:
+                with open(path, 'rb') as f:
+                    assert f.read() == b'abc'
+
+            storage.delete('quarentena/v.mp4')
+            assert not storage.exists('quarentena/v.mp4')
+
+
+class TestConsistencyService:
+    """Testes para ConsistencyService"""
+
+    def test_orfaos_ausentes_e_divergentes(self, app, tmp_path):
+        """Testa o relatório de consistência e a quarentena de órfãos"""
+        import hashlib
+        from services import ConsistencyService
+
+        with app.app_context():
+            app.config['UPLOAD_FOLDER'] = str(tmp_path)
+            (tmp_path / 'ok.mp4').write_bytes(b'conteudo')
+            (tmp_path / 'curto.mp4').write_bytes(b'abc')
+            (tmp_path / 'variants').mkdir()
+            (tmp_path / 'variants' / 'orfao_720p.mp4').write_bytes(b'orfao')
+
+            db.session.add_all([
+                Video(filename='ok.mp4', original_filename='ok.mp4', latitude=0,
+                      longitude=0, radius_km=5, file_size=8,
+                      content_hash=hashlib.sha256(b'conteudo').hexdigest()),
+                Video(filename='curto.mp4', original_filename='curto.mp4', latitude=0,
+                      longitude=0, radius_km=5, file_size=10),
+                Video(filename='sumiu.mp4', original_filename='sumiu.mp4', latitude=0,
+                      longitude=0, radius_km=5),
+            ])
+            db.session.commit()
+
+            relatorio = ConsistencyService.verificar(verificar_hash=True, idade_minima=0)
+            assert [o['arquivo'] for o in relatorio['orfaos']] == ['variants/orfao_720p.mp4']
+            assert [a['arquivo'] for a in relatorio['ausentes']] == ['sumiu.mp4']
+            assert [d['arquivo'] for d in relatorio['divergentes']] == ['curto.mp4']
+
+            # Arquivos recentes não contam como órfãos
+            assert ConsistencyService.verificar(idade_minima=3600)['orfaos'] == []
+
+            movidos, destino = ConsistencyService.quarentenar(relatorio['orfaos'])
+            assert movidos == 1
+            assert (tmp_path / destino / 'variants' / 'orfao_720p.mp4').exists()
+            assert ConsistencyService.verificar(idade_minima=0)['orfaos'] == []
+
+
+class TestPacingService:
+    """Testes para PacingService"""
+
+    def test_peso_proporcional_a_creditos_e_prazo(self, app):
+        """Testa meta de ritmo (créditos / horas até o fim) e peso relativo"""
+        from datetime import datetime, timedelta
+        from services import PacingService
+
+        agora = datetime(2025, 1, 1)
+        app.config['PACING_HORIZON_HOURS'] = 100
+        app.config['PACING_MIN_WEIGHT'] = 0.05
+        with app.app_context():
+            videos = [
+                Video(id=1, creditos=1000, fim_em=agora + timedelta(hours=10)),
+                Video(id=2, creditos=1000),
+                Video(id=3, creditos=1),
+            ]
+            pacing = PacingService.calcular(videos, agora)
+
+        assert pacing[1] == {'peso': 1.0, 'meta_hora': 100.0}
+        assert pacing[2] == {'peso': 0.1, 'meta_hora': 10.0}
+        assert pacing[3]['peso'] == 0.05  # mínimo
+
+
+class TestDispositivoService:
+    """Testes para DispositivoService"""
+
+    def test_registro_e_autenticacao(self, app):
+        """Testa token devolvido no registro, guardado só como hash"""
+        from services import DispositivoService
+        from models import Dispositivo
+
+        with app.app_context():
+            token, error = DispositivoService.registrar('tela-1', tipo='desktop')
+            assert error is None
+            assert Dispositivo.query.one().token_hash != token
+
+            _, error = DispositivoService.registrar('tela-1')
+            assert error == 'Dispositivo já registrado'
+
+            assert DispositivoService.autenticar('tela-1', token)
+            assert DispositivoService.autenticar('tela-1', 'errado') is None
+            assert DispositivoService.autenticar('tela-2', token) is None
+
+    def test_heartbeats_agrupados_por_intervalo(self, app):
+        """Testa que heartbeats ficam no buffer e a gravação junta os campos de cada tela"""
+        from services import DispositivoService
+        from models import Dispositivo
+
+        app.config['HEARTBEAT_FLUSH_INTERVAL'] = 3600
+        with app.app_context():
+            DispositivoService.registrar('tela-1')
+            token, _ = DispositivoService.registrar('tela-2')
+            id_1 = Dispositivo.query.filter_by(device_id='tela-1').one().id
+            id_2 = DispositivoService.autenticar('tela-2', token)
+
+            DispositivoService.receber_heartbeat(id_1, {'versao': '1.0', 'cache_bytes': 10})
+            DispositivoService.receber_heartbeat(id_1, {'versao': '1.1', 'quadros_descartados': 3})
+            DispositivoService.receber_heartbeat(id_2, {'playlist': 'abc', 'sincronizado_em': 1735689600})
+            assert db.session.get(Dispositivo, id_1).ultimo_contato is None  # Ainda no buffer
+
+            assert DispositivoService.descarregar() == 2
+            db.session.expire_all()
+            tela_1 = db.session.get(Dispositivo, id_1)
+            assert tela_1.versao == '1.1'
+            assert tela_1.quadros_descartados == 3
+            assert tela_1.cache_bytes == 10  # Enviado só no primeiro heartbeat do intervalo
+            tela_2 = db.session.get(Dispositivo, id_2)
+            assert tela_2.playlist_hash == 'abc'
+            assert tela_2.ultima_sincronizacao.isoformat() == '2025-01-01T00:00:00'
+
+            # Campos ausentes no heartbeat seguinte mantêm o valor anterior
+            DispositivoService.receber_heartbeat(id_2, {'versao': '2.0'})
+            DispositivoService.descarregar()
+            db.session.expire_all()
+            assert db.session.get(Dispositivo, id_2).playlist_hash == 'abc'
+            assert DispositivoService.descarregar() == 0
+
+
+    def test_heartbeats_voltam_ao_buffer_se_a_gravacao_falhar(self, app, monkeypatch):
+        """Testa que uma falha na gravação não perde os heartbeats do intervalo"""
+        from services import DispositivoService
+        from models import Dispositivo
+
+        app.config['HEARTBEAT_FLUSH_INTERVAL'] = 3600
+        with app.app_context():
+            token, _ = DispositivoService.registrar('tela-1')
+            dispositivo_id = DispositivoService.autenticar('tela-1', token)
+            DispositivoService.receber_heartbeat(dispositivo_id, {'versao': '1.0', 'cache_bytes': 10})
+
+            def falhar(*args, **kwargs):
+                raise RuntimeError('banco indisponível')
+
+            with monkeypatch.context() as m:
+                m.setattr(db.session, 'execute', falhar)
+                assert DispositivoService.descarregar() == 0
+
+            DispositivoService.receber_heartbeat(dispositivo_id, {'versao': '1.1'})
+            assert DispositivoService.descarregar() == 1
+            db.session.expire_all()
+            tela = db.session.get(Dispositivo, dispositivo_id)
+            assert tela.versao == '1.1'
+            assert tela.cache_bytes == 10
+
+class TestAtualizacaoEsquema:
+    """Testes para a atualização do esquema de bancos existentes"""
+
+    def test_adiciona_colunas_e_indices_ausentes(self, app, runner):
+        """Testa que um banco anterior às colunas novas é atualizado (e só uma vez)"""
+        from sqlalchemy import inspect, text
+
+        with app.app_context():
+            with db.engine.begin() as conn:
+                conn.execute(text('DROP INDEX ix_logs_visualizacao_evento_id'))
+                conn.execute(text('ALTER TABLE logs_visualizacao DROP COLUMN evento_id'))
+                conn.execute(text('ALTER TABLE videos DROP COLUMN content_hash'))
+
+            result = runner.invoke(args=['atualizar-banco'])
+            assert result.exit_code == 0
+            assert 'videos.content_hash: coluna adicionada' in result.output
+            assert 'logs_visualizacao.evento_id: coluna adicionada' in result.output
+
+            inspector = inspect(db.engine)
+            indice = [i for i in inspector.get_indexes('logs_visualizacao')
+                      if i['name'] == 'ix_logs_visualizacao_evento_id']
+            assert indice and indice[0]['unique']
+            assert Video.query.count() == 0
+
+            result = runner.invoke(args=['atualizar-banco'])
+            assert '0 alteração(ões)' in result.output
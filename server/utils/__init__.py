@@ -4,6 +4,7 @@ Utilitários do sistema de propaganda
 from .geo import is_within_radius, get_videos_for_location
 from .decorators import admin_required, cliente_required, api_auth_required, admin_or_owner_required
 from .validators import CPF_CNPJ, TelefoneBR, Latitude, Longitude, PositiveNumber
+from .files import stream_to_file, hash_file, file_size
 
 __all__ = [
     'is_within_radius',
@@ -16,5 +17,8 @@ __all__ = [
     'TelefoneBR',
     'Latitude',
     'Longitude',
-    'PositiveNumber'
+    'PositiveNumber',
+    'stream_to_file',
+    'hash_file',
+    'file_size'
 ]
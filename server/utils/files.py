@@ -0,0 +1,67 @@
+"""
+Utilitários para manipulação de arquivos grandes
+"""
+
+import hashlib
+import os
+
+# Tamanho do buffer de leitura/escrita (1 MB)
+BUFFER_SIZE = 1024 * 1024
+
+
+def stream_to_file(stream, fh, hasher=None, buffer_size=BUFFER_SIZE):
+    """
+    Copia um stream para um arquivo aberto, atualizando o hash em paralelo
+
+    Cada byte é lido uma vez, escrito uma vez e passado ao hasher,
+    sem arquivo temporário intermediário.
+
+    Args:
+        stream: objeto com read(n) (ex: request.stream, FileStorage.stream)
+        fh: arquivo aberto em modo binário de escrita
+        hasher: objeto hashlib (opcional)
+        buffer_size: int
+
+    Returns:
+        int: bytes escritos
+    """
+    written = 0
+    while True:
+        chunk = stream.read(buffer_size)
+        if not chunk:
+            break
+        fh.write(chunk)
+        if hasher is not None:
+            hasher.update(chunk)
+        written += len(chunk)
+    return written
+
+
+def hash_file(filepath, limit=None, hasher=None, buffer_size=BUFFER_SIZE):
+    """
+    Calcula o SHA-256 de um arquivo (ou dos primeiros `limit` bytes)
+
+    Returns:
+        hashlib object (use .hexdigest() para o valor)
+    """
+    if hasher is None:
+        hasher = hashlib.sha256()
+    remaining = limit
+    with open(filepath, "rb") as f:
+        while remaining is None or remaining > 0:
+            size = buffer_size if remaining is None else min(buffer_size, remaining)
+            chunk = f.read(size)
+            if not chunk:
+                break
+            hasher.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+    return hasher
+
+
+def file_size(filepath):
+    """Tamanho do arquivo em bytes (0 se não existir)"""
+    try:
+        return os.path.getsize(filepath)
+    except OSError:
+        return 0
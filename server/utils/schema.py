@@ -0,0 +1,50 @@
+"""
+Atualização do esquema de bancos já existentes
+
+db.create_all() cria as tabelas que faltam, mas não altera as que já
+existem: uma instalação anterior ficaria sem as colunas novas (ex:
+videos.content_hash) e falharia na primeira consulta. atualizar_esquema()
+compara as tabelas do banco com os modelos e adiciona as colunas e os
+índices ausentes. Pode ser executada várias vezes (só cria o que falta).
+"""
+from sqlalchemy import inspect, text
+
+
+def atualizar_esquema(engine, metadata):
+    """
+    Adiciona colunas e índices dos modelos ausentes em tabelas existentes
+
+    As colunas são adicionadas sem NOT NULL (as linhas antigas ficam com
+    NULL). Colunas únicas ganham um índice único, já que o SQLite não aceita
+    ADD CONSTRAINT.
+
+    Returns:
+        list: descrição das alterações feitas
+    """
+    alteracoes = []
+    inspector = inspect(engine)
+    tabelas = set(inspector.get_table_names())
+    preparer = engine.dialect.identifier_preparer
+
+    with engine.begin() as conn:
+        for tabela in metadata.sorted_tables:
+            if tabela.name not in tabelas:
+                continue  # Criada por db.create_all()
+            existentes = {coluna["name"] for coluna in inspector.get_columns(tabela.name)}
+            for coluna in tabela.columns:
+                if coluna.name in existentes:
+                    continue
+                tipo = coluna.type.compile(dialect=engine.dialect)
+                conn.execute(text(
+                    f"ALTER TABLE {preparer.format_table(tabela)} "
+                    f"ADD COLUMN {preparer.format_column(coluna)} {tipo}"
+                ))
+                alteracoes.append(f"{tabela.name}.{coluna.name}: coluna adicionada")
+
+            indices = {indice["name"] for indice in inspector.get_indexes(tabela.name)}
+            for indice in tabela.indexes:
+                if indice.name in indices:
+                    continue
+                indice.create(conn, checkfirst=True)
+                alteracoes.append(f"{tabela.name}: índice {indice.name} criado")
+    return alteracoes